@@ -0,0 +1,34 @@
+from discord import app_commands
+import hashlib
+import json
+import traceback
+
+
+def get_command_fingerprint(tree: app_commands.CommandTree) -> str:
+    """Calculates a hash over the names, descriptions, parameters and choices of all registered slash commands"""
+    commandData = []
+    for command in sorted(tree.get_commands(), key=lambda cmd: cmd.name):
+        parameters = [
+            [parameter.name, parameter.description, int(parameter.type.value), parameter.required,
+             [[choice.name, choice.value] for choice in parameter.choices]]
+            for parameter in getattr(command, "parameters", [])
+        ]
+        commandData.append([command.name, command.description, parameters])
+    return hashlib.sha256(json.dumps(commandData).encode("utf-8")).hexdigest()
+
+
+async def sync_command_tree(tree: app_commands.CommandTree, persistenceDataMapper, force=False):
+    """Syncs the command tree with discord, unless the commands did not change since the last sync"""
+    fingerprint = get_command_fingerprint(tree)
+    if not force and fingerprint == persistenceDataMapper.load_command_fingerprint():
+        print("[INFO ] [CommandSync] Slash commands are unchanged. Skipping tree sync")
+        return True
+    print("[INFO ] [CommandSync] Waiting for tree sync")
+    try:
+        await tree.sync()
+        persistenceDataMapper.store_command_fingerprint(fingerprint)
+        print("[INFO ] [CommandSync] Tree is now synched")
+        return True
+    except Exception:
+        print(f"[INFO ] [CommandSync] Failed waiting for tree sync: {traceback.format_exc()}")
+        return False
@@ -1,20 +1,31 @@
 from threading import Lock
-from fs22.fs22server import FS22ServerConfig
-from fs22.servertracker import ServerTracker
+from fs22.fs22server import FS22ServerConfig, FS22ServerStatus
+from fs22.servertracker import ServerTracker, ServerTrackerEvents
 from discord.infopanelhandler import InfoPanelHandler
 from discord.playerstatushandler import PlayerStatusHandler
 from discord.serverstatushandler import ServerStatusHandler
 from discord.summaryhandler import SummaryHandler
 from stats.statstracker import OnlineTimeTracker
-from stats.playertracker import PlayerTracker
+from stats.playertracker import PlayerTracker, PlayerTrackerEvents
 from stats.statsreporter import StatsReporter
+from stats.timeseries import TimeSeriesStore
+from stats.heatmap import HeatmapTracker, render_heatmap
+from stats.availability import AvailabilityTracker, render_availability
+from stats.export import export_online_times
+from stats.merge import load_snapshot, parse_server_id_map, validate_tracker, merge_tracker, merge_into_copy, \
+    get_total_minutes, get_fingerprint
+from stats.snapshotformat import to_binary
+from stats.sqlitetracker import SqliteTimeTracker
+from eventbus import EventBus
+import asyncio
+import datetime
 import discord
 import traceback
 
 
 class CommandHandler:
 
-    def __init__(self, infoPanelHandler, playerStatusHandler, serverStatusHandler, summaryHandler, statsReporter):
+    def __init__(self, infoPanelHandler, playerStatusHandler, serverStatusHandler, summaryHandler, statsReporter, eventBus):
         self.lock = Lock()
         self.serverConfigs: dict[int, FS22ServerConfig] = {}
         self.serverTrackers = {}
@@ -25,11 +36,50 @@ class CommandHandler:
         self.summaryHandler: SummaryHandler = summaryHandler
         self.statsReporter: StatsReporter = statsReporter
         self.playerTracker: PlayerTracker = None
+        self.timeSeries: TimeSeriesStore = None
+        self.heatmaps: HeatmapTracker = None
+        self.availability: AvailabilityTracker = None
+        self.importedSnapshots: set[str] = set()  # The fingerprints of all imported snapshots, see get_fingerprint
+        self.importInProgress = False
+        self.eventBus: EventBus = eventBus
+        self.subscribe_handlers()
+
+    def subscribe_handlers(self):
+        """Subscribes the handlers to the events of all server trackers. Each handler receives the events through a queue of its own.
+        The handlers only display the most recent state, so they may drop events if they fall behind. Everything which
+        records the events subscribes losslessly instead."""
+        self.eventBus.create_subscriber("InfoPanelHandler").subscribe(
+            ServerTrackerEvents.changes, self.infoPanelHandler.on_changes)
+        self.eventBus.create_subscriber("SummaryHandler").subscribe(
+            ServerTrackerEvents.changes, self.summaryHandler.on_changes)
+        self.eventBus.create_subscriber("PlayerStatusHandler").subscribe(
+            ServerTrackerEvents.changes, self.playerStatusHandler.on_changes)
+        self.eventBus.create_subscriber("ServerStatusHandler").subscribe(
+            ServerTrackerEvents.changes, self.serverStatusHandler.on_changes)
 
     def set_player_tracker(self, playerTracker: PlayerTracker):
         if playerTracker:
             self.playerTracker = playerTracker
             self.statsReporter.set_time_tracker(playerTracker.timeTracker)
+            self.eventBus.create_subscriber("PlayerTracker", lossless=True).subscribe(
+                ServerTrackerEvents.changes, playerTracker.on_changes)
+            self.eventBus.create_subscriber("StatsReporter", lossless=True).subscribe(
+                PlayerTrackerEvents.stats_updated, self.statsReporter.on_stats_updated)
+
+    def set_time_series(self, timeSeries: TimeSeriesStore):
+        self.timeSeries = timeSeries
+        self.eventBus.create_subscriber("TimeSeriesStore", lossless=True).subscribe(
+            ServerTrackerEvents.changes, timeSeries.on_changes)
+
+    def set_heatmaps(self, heatmaps: HeatmapTracker):
+        self.heatmaps = heatmaps
+        self.eventBus.create_subscriber("HeatmapTracker", lossless=True).subscribe(
+            ServerTrackerEvents.changes, heatmaps.on_changes)
+
+    def set_availability(self, availability: AvailabilityTracker):
+        self.availability = availability
+        self.eventBus.create_subscriber("AvailabilityTracker", lossless=True).subscribe(
+            ServerTrackerEvents.changes, availability.on_changes)
 
     def restore_servers(self, serverConfigs: dict[int, FS22ServerConfig]):
         with self.lock:
@@ -38,7 +88,13 @@ class CommandHandler:
                 if (id >= self.nextServerId):
                     self.nextServerId = id + 1
                 self.add_tracker(serverConfig)
-            self.statsReporter.update_guild_to_server_map(self.get_guild_to_server_map(serverConfigs))
+            self.update_guild_to_server_map()
+
+    def update_guild_to_server_map(self):
+        guildToServerMap = self.get_guild_to_server_map(self.serverConfigs)
+        self.statsReporter.update_guild_to_server_map(guildToServerMap)
+        if self.heatmaps is not None:
+            self.heatmaps.update_guild_to_server_map(guildToServerMap)
 
     def get_guild_to_server_map(self, serverConfigs: dict[int, FS22ServerConfig]):
         guild_to_server_mapping: dict[int, list[int]] = {}
@@ -49,6 +105,19 @@ class CommandHandler:
             guild_to_server_mapping[guildId].append(id)
         return guild_to_server_mapping
 
+    def get_last_known_status(self) -> dict[int, FS22ServerStatus]:
+        with self.lock:
+            return {serverId: tracker.lastknownServerData for serverId, tracker in self.serverTrackers.items()}
+
+    def warm_up_handlers(self, statusPerServer: dict[int, FS22ServerStatus]):
+        """Provides the last known status of each server to the handlers so they can display data before the first poll"""
+        with self.lock:
+            for serverId, serverData in statusPerServer.items():
+                if serverId not in self.serverConfigs:
+                    continue
+                self.infoPanelHandler.on_initial_event(serverId, serverData)
+                self.summaryHandler.on_updated(serverId, serverData)
+
     def get_configs(self):
         with self.lock:
             return {serverId: self.serverConfigs[serverId] for serverId in self.serverConfigs}
@@ -174,16 +243,212 @@ class CommandHandler:
             await interaction.response.send_message(content="Failed updating icon")
             print(traceback.format_exc())
 
-    async def set_stats_channel(self, interaction: discord.Interaction):
+    async def set_stats_channel(self, interaction: discord.Interaction, window: str):
         if not await self.check_admin_permission(interaction):
             return
         try:
-            await self.statsReporter.add_embed(interaction)
+            await self.statsReporter.add_embed(interaction, window)
             await interaction.response.send_message(content="Stats panel registered on current channel", ephemeral=True, delete_after=10)
         except Exception:
             await interaction.response.send_message(content="Failed setting up stats channel")
             print(traceback.format_exc())
 
+    async def set_stats_window(self, interaction: discord.Interaction, window: str):
+        if not await self.check_admin_permission(interaction):
+            return
+        numEmbeds = self.statsReporter.set_window(interaction.guild, window)
+        await interaction.response.send_message(
+            content=f"Changed the window of {numEmbeds} stats panel(s). Changes will be visible with the next update",
+            ephemeral=True, delete_after=10)
+
+    async def show_heatmap(self, interaction: discord.Interaction, id: int = None):
+        """Displays the busy hours of a single server, or of all servers of the guild if no server was given"""
+        with self.lock:
+            if id is not None and (id not in self.serverConfigs or str(self.serverConfigs[id].guildId) != str(interaction.guild_id)):
+                await interaction.response.send_message(
+                    content=f"There is no server with ID {id} in this guild", ephemeral=True, delete_after=10)
+                return
+            if id is None:
+                title = "Busy hours of all servers"
+                heatmap = self.heatmaps.guilds.get(interaction.guild_id) if self.heatmaps is not None else None
+            else:
+                title = f"Busy hours of {self.serverConfigs[id].title}"
+                heatmap = self.heatmaps.servers.get(id) if self.heatmaps is not None else None
+        if heatmap is None:
+            await interaction.response.send_message(content="No data", ephemeral=True, delete_after=10)
+            return
+        embed = discord.Embed(title=title, description=render_heatmap(heatmap))
+        embed.set_footer(text="Average concurrent players per hour of the week, in the time zone of the bot")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    async def show_uptime(self, interaction: discord.Interaction, id: int = None):
+        """Displays the availability of a single server, or of all servers of the guild if no server was given"""
+        with self.lock:
+            serverConfigs = [
+                serverConfig for serverId, serverConfig in self.serverConfigs.items()
+                if str(serverConfig.guildId) == str(interaction.guild_id) and (id is None or serverId == id)]
+        if not serverConfigs or self.availability is None:
+            await interaction.response.send_message(content="No data", ephemeral=True, delete_after=10)
+            return
+        embed = discord.Embed(title="Server availability")
+        for serverConfig in serverConfigs[:25]:
+            embed.add_field(
+                name=f"{serverConfig.icon} {serverConfig.title}",
+                value=render_availability(self.availability, serverConfig.id), inline=False)
+        embed.set_footer(text="Times in which the bot was offline are not counted")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+    async def set_stats_page_size(self, interaction: discord.Interaction, pageSize: int):
+        if not await self.check_admin_permission(interaction):
+            return
+        numEmbeds = self.statsReporter.set_page_size(interaction.guild, pageSize)
+        await interaction.response.send_message(
+            content=f"Changed the page size of {numEmbeds} stats panel(s). Changes will be visible with the next update",
+            ephemeral=True, delete_after=10)
+
+    async def export_stats(
+            self, interaction: discord.Interaction, exportFormat: str, id: int = None, start: str = None, end: str = None):
+        """Sends the daily online times of the servers of this guild as a compressed file"""
+        if not await self.check_admin_permission(interaction):
+            return
+        try:
+            startDate = datetime.date.fromisoformat(start) if start else None
+            endDate = datetime.date.fromisoformat(end) if end else None
+        except ValueError:
+            await interaction.response.send_message(
+                content="Dates must be given as YYYY-MM-DD", ephemeral=True, delete_after=10)
+            return
+        with self.lock:
+            serverIds = {
+                serverId for serverId, serverConfig in self.serverConfigs.items()
+                if str(serverConfig.guildId) == str(interaction.guild_id) and (id is None or serverId == id)}
+        if not serverIds or self.playerTracker is None:
+            await interaction.response.send_message(content="No data", ephemeral=True, delete_after=10)
+            return
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            exportFile, numRows = await export_online_times(
+                self.playerTracker.timeTracker, exportFormat, serverIds, startDate, endDate)
+        except Exception:
+            print(f"[WARN ] [CommandHandler] Failed exporting stats: {traceback.format_exc()}")
+            await interaction.followup.send(content="Failed exporting stats", ephemeral=True)
+            return
+        with exportFile:
+            fileSize = exportFile.seek(0, 2)
+            exportFile.seek(0)
+            if interaction.guild is not None and fileSize > interaction.guild.filesize_limit:
+                await interaction.followup.send(
+                    content=f"The export is too large ({fileSize} bytes). Please choose a shorter period of time",
+                    ephemeral=True)
+                return
+            await interaction.followup.send(
+                content=f"Exported {numRows} online times",
+                file=discord.File(exportFile, filename=f"fssb-stats.{exportFormat}.gz"),
+                ephemeral=True)
+
+    async def import_stats(
+            self, interaction: discord.Interaction, attachment: discord.Attachment, serverIdMap: str = None) -> bool:
+        """Merges a time tracker snapshot, e.g. of another bot instance or a backup, into the online times.
+        Every server of the snapshot must be mapped to a server of this guild. Snapshots which were imported before are
+        rejected, since their minutes would be counted twice. Returns True if data were merged."""
+        if not await self.check_admin_permission(interaction):
+            return False
+        if self.importInProgress:
+            await interaction.response.send_message(
+                content="Another import is in progress, please try again later", ephemeral=True, delete_after=10)
+            return False
+        self.importInProgress = True
+        try:
+            return await self.import_snapshot(interaction, attachment, serverIdMap)
+        finally:
+            self.importInProgress = False
+
+    async def import_snapshot(
+            self, interaction: discord.Interaction, attachment: discord.Attachment, serverIdMap: str) -> bool:
+        try:
+            serverIds = parse_server_id_map(serverIdMap or "")
+        except ValueError:
+            await interaction.response.send_message(
+                content="Server IDs must be mapped as old:new, separated by commas", ephemeral=True, delete_after=10)
+            return False
+        with self.lock:
+            guildServerIds = {
+                serverId for serverId, serverConfig in self.serverConfigs.items()
+                if str(serverConfig.guildId) == str(interaction.guild_id)}
+        if not guildServerIds or self.playerTracker is None:
+            await interaction.response.send_message(content="No servers registered", ephemeral=True, delete_after=10)
+            return False
+
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        try:
+            source = await asyncio.to_thread(load_snapshot, await attachment.read())
+            problems = await asyncio.to_thread(validate_tracker, source)
+            fingerprint = await asyncio.to_thread(get_fingerprint, source)
+        except Exception:
+            print(f"[WARN ] [CommandHandler] Failed loading stats for import: {traceback.format_exc()}")
+            await interaction.followup.send(content="The file is not a time tracker snapshot", ephemeral=True)
+            return False
+        if problems:
+            print(f"[WARN ] [CommandHandler] Rejected inconsistent stats: {problems}")
+            await interaction.followup.send(content="The snapshot is inconsistent and was not imported", ephemeral=True)
+            return False
+        foreignServerIds = {serverIds.get(serverId, serverId) for serverId in source.allTime.servers} - guildServerIds
+        if foreignServerIds:
+            await interaction.followup.send(
+                content=f"The servers {', '.join(map(str, sorted(foreignServerIds)))} do not belong to this discord " +
+                        "server. Please map them to your servers as old:new", ephemeral=True)
+            return False
+        if fingerprint in self.importedSnapshots:
+            await interaction.followup.send(
+                content="This snapshot was imported already. Importing it again would count its minutes twice",
+                ephemeral=True)
+            return False
+
+        timeTracker = self.playerTracker.timeTracker
+        if isinstance(timeTracker, SqliteTimeTracker):
+            # The database is changed within a single transaction, so a failed import leaves nothing behind
+            remappedTracker = OnlineTimeTracker.create_new(source.numDays)
+            numMinutes = await asyncio.to_thread(merge_tracker, remappedTracker, source, serverIds)
+            problems = await asyncio.to_thread(validate_tracker, remappedTracker, get_total_minutes(source))
+            if problems:
+                print(f"[WARN ] [CommandHandler] Discarded inconsistent stats after merging: {problems}")
+                await interaction.followup.send(
+                    content="The merged stats were inconsistent, nothing was imported", ephemeral=True)
+                return False
+            try:
+                await asyncio.to_thread(timeTracker.import_tracker, remappedTracker)
+            except Exception:
+                print(f"[WARN ] [CommandHandler] Failed importing stats into the database: {traceback.format_exc()}")
+                await interaction.followup.send(content="Failed importing the stats, nothing was imported", ephemeral=True)
+                return False
+        else:
+            # The live tracker is copied on the loop, so the copy is consistent. Online times which are credited while
+            # the copy is merged in a worker thread are added to it before it replaces the live tracker.
+            expectedMinutes = get_total_minutes(timeTracker) + get_total_minutes(source)
+            snapshotData = to_binary(timeTracker, compress=False)
+            self.playerTracker.start_recording_credits()
+            try:
+                mergedTracker, numMinutes, problems = await asyncio.to_thread(
+                    merge_into_copy, snapshotData, source, serverIds, expectedMinutes)
+            except Exception:
+                self.playerTracker.stop_recording_credits()
+                raise
+            if problems:
+                self.playerTracker.stop_recording_credits()
+                print(f"[WARN ] [CommandHandler] Discarded inconsistent stats after merging: {problems}")
+                await interaction.followup.send(
+                    content="The merged stats were inconsistent, nothing was imported", ephemeral=True)
+                return False
+            self.playerTracker.replace_time_tracker(mergedTracker)
+            self.statsReporter.set_time_tracker(mergedTracker)
+        self.importedSnapshots.add(fingerprint)
+        self.statsReporter.invalidate_cache()
+        print(f"[INFO ] [CommandHandler] Imported {numMinutes} minutes of {len(source.playerNames)} players")
+        await interaction.followup.send(
+            content=f"Imported {numMinutes} minutes of {len(source.playerNames)} players", ephemeral=True)
+        return True
+
     async def set_bot_status_channel(self, interaction):
         if not await self.check_parameters(interaction, id):
             return
@@ -198,7 +463,7 @@ class CommandHandler:
                 serverId, ip, port, apiCode, icon, title, color, interaction.guild_id)
             self.serverConfigs[serverId] = serverConfig
             self.add_tracker(serverConfig)            
-            self.statsReporter.update_guild_to_server_map(self.get_guild_to_server_map(self.serverConfigs))
+            self.update_guild_to_server_map()
         await interaction.response.send_message(content=f"Successfully registered the server. Your server ID for {title} ({ip}:{port}) is {serverId}. " +
                                                 "Please write that down (or pin this message if in an admin-only channel), " +
                                                 "since you will need it for all further commands")
@@ -213,27 +478,29 @@ class CommandHandler:
             self.playerStatusHandler.remove_config(id)
             self.serverStatusHandler.remove_config(id)
             self.summaryHandler.remove_config(id)
+            if self.timeSeries is not None:
+                self.timeSeries.remove_server(id)
+            if self.heatmaps is not None:
+                self.heatmaps.remove_server(id)
+            if self.availability is not None:
+                self.availability.remove_server(id)
             del self.serverConfigs[id]
-            self.statsReporter.update_guild_to_server_map(self.get_guild_to_server_map(self.serverConfigs))
+            self.update_guild_to_server_map()
         await interaction.response.send_message(content=f"Successfully removed server with ID {id}", ephemeral=True)
 
     def add_tracker(self, serverConfig):
-        tracker = ServerTracker(serverConfig)
-        tracker.events.initial += self.infoPanelHandler.on_initial_event
-        tracker.events.updated += self.infoPanelHandler.on_updated
-        tracker.events.updated += self.summaryHandler.on_updated
-        tracker.events.playerWentOnline += self.playerStatusHandler.on_player_online
-        tracker.events.playerWentOffline += self.playerStatusHandler.on_player_offline
-        tracker.events.playerAdminStateChanged += self.playerStatusHandler.on_player_admin
-        tracker.events.serverStatusChanged += self.serverStatusHandler.on_server_status_changed
-
-        if self.playerTracker:
-            tracker.events.playerWentOffline += self.playerTracker.on_player_offline
-            tracker.events.updated += self.playerTracker.on_updated
-
+        tracker = ServerTracker(serverConfig, self.eventBus)
         tracker.start_tracker()
         self.serverTrackers[serverConfig.id] = tracker
 
+    async def stop_trackers(self):
+        """Stops all server trackers in parallel, cancelling any requests which are currently in progress"""
+        with self.lock:
+            trackers = list(self.serverTrackers.values())
+        for tracker in trackers:
+            tracker.stop_tracker()
+        await asyncio.gather(*(tracker.wait_for_completion() for tracker in trackers))
+
     def remove_tracker(self, id):
         if id in self.serverTrackers:
             self.serverTrackers[id].stop_tracker()
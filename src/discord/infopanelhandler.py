@@ -1,5 +1,7 @@
 from threading import Lock
 from fs22.fs22server import FS22ServerConfig
+from fs22.servertracker import ServerStatusChanges
+from discord.objectresolver import get_partial_message
 import asyncio
 import discord
 import datetime
@@ -11,14 +13,15 @@ import time
 class InfoPanelConfig:
     """This class stores the fixed information about an info panel which doesn't change for a server usually."""
 
-    def __init__(self, ip, port, icon, title, channel, embed, color):
+    def __init__(self, ip, port, icon, title, channelId, embedId, color):
         self.ip = ip
         self.port = port
         self.icon = icon
         self.title = title
         self.color = color
-        self.channel = channel
-        self.embed = embed
+        self.channelId = channelId
+        self.embedId = embedId
+        self.embed = None  # Resolved on first use
 
 
 class InfoPanelHandler:
@@ -33,7 +36,6 @@ class InfoPanelHandler:
         # Stores the current data which needs to be published for each server ID
         self.pendingServerData = {}
         self.lock = Lock()
-        self.enabled = True
         self.task = None
         self.discordClient = discordClient
         self.debug = False
@@ -56,7 +58,7 @@ class InfoPanelHandler:
         embed = discord.Embed(title="Pending...", color=int(color, 16))
         message = await interaction.channel.send(embed=embed)
         panelInfoConfig = InfoPanelConfig(
-            ip, port, icon, title, interaction.channel, message, color)
+            ip, port, icon, title, interaction.channel.id, message.id, color)
         self.add_config(serverId, panelInfoConfig)
 
     def update_icon(self, serverId, icon):
@@ -67,76 +69,76 @@ class InfoPanelHandler:
 
     def start(self):
         if self.task is None:
-            self.enabled = True
             self.task = asyncio.create_task(self.update_panels())
 
     def stop(self):
         if self.task is not None:
-            self.enabled = False
+            self.task.cancel()
 
     async def wait_for_completion(self):
-        counter = 0
-        while counter < 70 and not self.task.done():
-            await asyncio.sleep(1)
-            counter += 1
-        self.task = None
+        if self.task is not None:
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
 
     ### Discord update ###
 
     async def update_panels(self):
         self.debugPrint("Processing has started")
-        while self.enabled == True:
-            # Sleep 60 seconds, but abort at any time when requested
-            for _ in range(1, 60):
-                await asyncio.sleep(1)
-                if self.enabled == False:
-                    return
-
-            self.debugPrint("Waking up")
-            with self.lock:
-                configsCopy = {serverId: self.configs[serverId] for serverId in self.configs}
-                pendingDataCopy = {}
-                for serverId in self.pendingServerData:
-                    pendingDataCopy[serverId] = copy.deepcopy(self.pendingServerData[serverId])
-                    self.pendingServerData[serverId] = None
-            self.debugPrint(f"Copied data: {len(configsCopy)} configs with {len(pendingDataCopy)} pending entries")
-            for serverId, config in configsCopy.items():
-                if serverId in pendingDataCopy and pendingDataCopy[serverId] is not None:
-                    self.debugPrint(f"Found updated data for server ID {serverId}")
-                    data = pendingDataCopy[serverId]
-                    # Build the text to be displayed
-                    try:
-                        self.debugPrint("Retrieving text")
-                        embedText = self.getText(config, data)
-                    except Exception:
-                        print(
-                            f"[WARN ] [InfoPanelHandler] Failed creating embed text: {traceback.format_exc()}",
-                            flush=True
-                        )
-                        continue
-
-                    # Update the embed
-                    try:
-                        self.debugPrint("Updating embed")
-                        embed = discord.Embed(
-                            title=f"{config.icon} {data.serverName}",
-                            description=embedText,
-                            color=int(config.color, 16),
-                        )
-                        self.debugPrint("Adding last update field")
-                        embed.add_field(name="Last Update", value=f"{datetime.datetime.now()}")
-                        self.debugPrint("Updating embed")
-                        await config.embed.edit(embed=embed)
-                    except Exception:
-                        print(
-                            f"[WARN ] [InfoPanelHandler] Could not update embed for server {config.title} (ID {serverId}): {traceback.format_exc()}",
-                            flush=True
-                        )
-
-                    # don't spam discord
-                    await asyncio.sleep(3)
-
-        print("[INFO ] [InfoPanelHandler] InfoPanelHandler was aborted", flush=True)
+        try:
+            while True:
+                await self.update_all_panels()
+                await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            print("[INFO ] [InfoPanelHandler] InfoPanelHandler was aborted", flush=True)
+            raise
+
+    async def update_all_panels(self):
+        """Updates the embed of every server which received new data since the last update"""
+        self.debugPrint("Waking up")
+        with self.lock:
+            configsCopy = {serverId: self.configs[serverId] for serverId in self.configs}
+            pendingDataCopy = {}
+            for serverId in self.pendingServerData:
+                pendingDataCopy[serverId] = copy.deepcopy(self.pendingServerData[serverId])
+                self.pendingServerData[serverId] = None
+        self.debugPrint(f"Copied data: {len(configsCopy)} configs with {len(pendingDataCopy)} pending entries")
+        for serverId, config in configsCopy.items():
+            if serverId in pendingDataCopy and pendingDataCopy[serverId] is not None:
+                self.debugPrint(f"Found updated data for server ID {serverId}")
+                data = pendingDataCopy[serverId]
+                # Build the text to be displayed
+                try:
+                    self.debugPrint("Retrieving text")
+                    embedText = self.getText(config, data)
+                except Exception:
+                    print(
+                        f"[WARN ] [InfoPanelHandler] Failed creating embed text: {traceback.format_exc()}",
+                        flush=True
+                    )
+                    continue
+
+                # Update the embed
+                try:
+                    self.debugPrint("Updating embed")
+                    embed = discord.Embed(
+                        title=f"{config.icon} {data.serverName}",
+                        description=embedText,
+                        color=int(config.color, 16),
+                    )
+                    self.debugPrint("Adding last update field")
+                    embed.add_field(name="Last Update", value=f"{datetime.datetime.now()}")
+                    self.debugPrint("Updating embed")
+                    if config.embed is None:
+                        config.embed = get_partial_message(self.discordClient, config.channelId, config.embedId)
+                    await config.embed.edit(embed=embed)
+                except Exception:
+                    print(
+                        f"[WARN ] [InfoPanelHandler] Could not update embed for server {config.title} (ID {serverId}): {traceback.format_exc()}",
+                        flush=True
+                    )
+
+                # don't spam discord
+                await asyncio.sleep(3)
 
     ### Event listeners ###
 
@@ -144,13 +146,13 @@ class InfoPanelHandler:
         with self.lock:
             self.pendingServerData[serverId] = serverData
 
-    def on_updated(self, serverId, serverData):
+    def on_changes(self, changes: ServerStatusChanges):
         """Queues the current server data for being sent to discord on each update.
         The discord embed will be updated at fixed time intervals."""
         with self.lock:
-            if serverId not in self.pendingServerData:
-                self.debugPrint(f"Adding pending data for server ID {serverId}")
-            self.pendingServerData[serverId] = serverData
+            if changes.serverId not in self.pendingServerData:
+                self.debugPrint(f"Adding pending data for server ID {changes.serverId}")
+            self.pendingServerData[changes.serverId] = changes.serverData
 
     def getText(self, serverConfig, serverData):
         message = (
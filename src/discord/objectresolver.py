@@ -0,0 +1,23 @@
+import discord
+
+
+def get_messageable(discordClient: discord.Client, channelId: int):
+    """Retrieves an object which messages can be sent to for the given channel ID.
+    The channel cache is used if possible, otherwise a partial messageable is created, so no REST call is required."""
+    channel = discordClient.get_channel(channelId)
+    if channel is None:
+        channel = discordClient.get_partial_messageable(channelId)
+    return channel
+
+
+def get_partial_message(discordClient: discord.Client, channelId: int, messageId: int) -> discord.PartialMessage:
+    """Retrieves a message which can be edited without fetching it from discord first"""
+    return get_messageable(discordClient, channelId).get_partial_message(messageId)
+
+
+async def get_channel(discordClient: discord.Client, channelId: int):
+    """Retrieves the full channel object. The channel is only fetched from discord if it is not in the cache."""
+    channel = discordClient.get_channel(channelId)
+    if channel is None:
+        channel = await discordClient.fetch_channel(channelId)
+    return channel
@@ -1,4 +1,6 @@
 from threading import Lock
+from discord.objectresolver import get_messageable
+from fs22.servertracker import ServerStatusChanges
 import asyncio
 import discord
 import traceback
@@ -8,11 +10,12 @@ import time
 class PlayerStatusConfig:
     """This class stores the fixed information about a player status reporting channel"""
 
-    def __init__(self, title, icon, color, channel):
+    def __init__(self, title, icon, color, channelId):
         self.title = title
         self.icon = icon
         self.color = color
-        self.channel = channel
+        self.channelId = channelId
+        self.channel = None  # Resolved on first use
 
 class PlayerStatusMessage:
     """Stores a message to be published in the player status message channel"""
@@ -38,7 +41,6 @@ class PlayerStatusHandler:
         self.configs: dict[str, PlayerStatusConfig] = {} # Stores a configuration object for every tracked server
         self.pendingData = {} # Stores a list of messages for every tracked server to be posted
         self.lock = Lock()
-        self.enabled = True
         self.task = None
         self.discordClient = discordClient
         self.debug = False
@@ -59,7 +61,7 @@ class PlayerStatusHandler:
 
     async def track_server(self, serverId, interaction, title, icon, color):
         # TOOD: Status message about the server being tracked
-        playerStatusConfig = PlayerStatusConfig(title, icon, color, interaction.channel)
+        playerStatusConfig = PlayerStatusConfig(title, icon, color, interaction.channel.id)
         self.add_config(serverId, playerStatusConfig)
     
     def update_icon(self, serverId, icon):
@@ -70,60 +72,65 @@ class PlayerStatusHandler:
 
     def start(self):
         if self.task is None:
-            self.enabled = True
             self.task = asyncio.create_task(self.post_pending_messages())
 
     def stop(self):
         if self.task is not None:
-            self.enabled = False
+            self.task.cancel()
 
     async def wait_for_completion(self):
-        counter = 0
-        while counter < 70 and not self.task.done():
-            await asyncio.sleep(1)
-            counter += 1
-        self.task = None
+        if self.task is not None:
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
 
     ### Discord update ###
 
     async def post_pending_messages(self):
-        while self.enabled == True:
-            # Sleep 60 seconds, but abort at any time when requested
-            for _ in range(1, 60):
-                await asyncio.sleep(1)
-                if self.enabled == False:
-                    return
-            self.debugPrint("Waking up")
-            # Copy configs and pending data (keep the lock short)
-            with self.lock:
-                configsCopy = {serverId: self.configs[serverId] for serverId in self.configs}
-                pendingDataCopy = {}
-                for serverId in self.pendingData:
-                    pendingDataCopy[serverId] = copy.deepcopy(self.pendingData[serverId])
-                    self.pendingData[serverId] = []
-            self.debugPrint("Copied data")
-            # Process copied data now
-            for serverId, config in configsCopy.items():
-                if len(pendingDataCopy[serverId]) > 0:
-                    self.debugPrint(f"Processing messages for server ID {serverId}")
-                    data = pendingDataCopy[serverId]
-
-                    # Create a new embed for each message
-                    for entry in data:
-                        overrideColor, indicator, statusPart = self.get_entry_dependent_settings(entry, config)
-
-                        try:
-                            message = f"{indicator} **{entry.player}** is {statusPart} on {config.icon} **{config.title}**"
-                            embed = discord.Embed(description=message, color=int(overrideColor,16))
-                            await config.channel.send(embed=embed)
-                        except Exception:
-                            print(f"[WARN ] [PlayerStatusHandler] Failed creating a player status embed: {traceback.format_exc()}",
-                            flush=True)
-
-                        # don't spam messages
-                        await asyncio.sleep(1)
-
-        print("[INFO ] [PlayerStatusHandler] PlayerStatusHandler was aborted", flush=True)
+        try:
+            while True:
+                await asyncio.sleep(60)
+                await self.post_all_pending_messages()
+        except asyncio.CancelledError:
+            print("[INFO ] [PlayerStatusHandler] PlayerStatusHandler was aborted", flush=True)
+            raise
+
+    async def flush(self):
+        """Posts all pending messages right away, without delays between the messages"""
+        await self.post_all_pending_messages(messageDelay=0)
+
+    async def post_all_pending_messages(self, messageDelay=1):
+        """Posts all messages which are currently pending"""
+        self.debugPrint("Waking up")
+        # Copy configs and pending data (keep the lock short)
+        with self.lock:
+            configsCopy = {serverId: self.configs[serverId] for serverId in self.configs}
+            pendingDataCopy = {}
+            for serverId in self.pendingData:
+                pendingDataCopy[serverId] = copy.deepcopy(self.pendingData[serverId])
+                self.pendingData[serverId] = []
+        self.debugPrint("Copied data")
+        # Process copied data now
+        for serverId, config in configsCopy.items():
+            if len(pendingDataCopy[serverId]) > 0:
+                self.debugPrint(f"Processing messages for server ID {serverId}")
+                data = pendingDataCopy[serverId]
+
+                # Create a new embed for each message
+                for entry in data:
+                    overrideColor, indicator, statusPart = self.get_entry_dependent_settings(entry, config)
+
+                    try:
+                        message = f"{indicator} **{entry.player}** is {statusPart} on {config.icon} **{config.title}**"
+                        embed = discord.Embed(description=message, color=int(overrideColor,16))
+                        if config.channel is None:
+                            config.channel = get_messageable(self.discordClient, config.channelId)
+                        await config.channel.send(embed=embed)
+                    except Exception:
+                        print(f"[WARN ] [PlayerStatusHandler] Failed creating a player status embed: {traceback.format_exc()}",
+                        flush=True)
+
+                    # don't spam messages
+                    await asyncio.sleep(messageDelay)
 
     def get_entry_dependent_settings(self, entry, config):
         if entry.isOnlineMessage:
@@ -141,7 +148,15 @@ class PlayerStatusHandler:
         return overrideColor, indicator, statusPart
 
     ### Event listeners ###
-    
+
+    def on_changes(self, changes: ServerStatusChanges):
+        for playerName in changes.leftPlayers:
+            self.on_player_offline(changes.serverId, playerName)
+        for playerName in changes.joinedPlayers:
+            self.on_player_online(changes.serverId, playerName)
+        for playerName in changes.newAdmins:
+            self.on_player_admin(changes.serverId, playerName)
+
     def on_player_online(self, serverId, playerName):
         with self.lock:
             if serverId in self.pendingData:
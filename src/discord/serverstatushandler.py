@@ -1,5 +1,7 @@
 from threading import Lock
 from fs22.fs22server import OnlineState
+from fs22.servertracker import ServerStatusChanges
+from discord.objectresolver import get_messageable
 import asyncio
 import discord
 import traceback
@@ -9,11 +11,12 @@ import time
 class ServerStatusConfig:
     """This class stores the fixed information about a server status reporting channel"""
 
-    def __init__(self, title, icon, color, channel):
+    def __init__(self, title, icon, color, channelId):
         self.title = title
         self.icon = icon
         self.color = color
-        self.channel = channel
+        self.channelId = channelId
+        self.channel = None  # Resolved on first use
 
 class ServerStatusMessage:
     """Stores a message to be published in the server status message channel"""
@@ -34,7 +37,6 @@ class ServerStatusHandler:
         self.configs: dict[str, ServerStatusConfig] = {} # Stores a configuration object for every tracked server
         self.pendingData = {} # Stores a list of messages for every tracked server to be posted
         self.lock = Lock()
-        self.enabled = True
         self.task = None
         self.discordClient = discordClient
         self.debug = False
@@ -50,7 +52,7 @@ class ServerStatusHandler:
 
     async def track_server(self, serverId, interaction, title, icon, color):
         # TOOD: Status message about the server being tracked
-        serverStatusConfig = ServerStatusConfig(title, icon, color, interaction.channel)
+        serverStatusConfig = ServerStatusConfig(title, icon, color, interaction.channel.id)
         self.add_config(serverId, serverStatusConfig)
 
     def update_icon(self, serverId, icon):
@@ -61,12 +63,11 @@ class ServerStatusHandler:
 
     def start(self):
         if self.task is None:
-            self.enabled = True
             self.task = asyncio.create_task(self.post_pending_messages())
 
     def stop(self):
         if self.task is not None:
-            self.enabled = False
+            self.task.cancel()
 
     def remove_config(self, serverId):
         with self.lock:
@@ -74,64 +75,74 @@ class ServerStatusHandler:
             del self.pendingData[serverId]
 
     async def wait_for_completion(self):
-        counter = 0
-        while counter < 70 and not self.task.done():
-            await asyncio.sleep(1)
-            counter += 1
-        self.task = None
+        if self.task is not None:
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
 
     ### Discord update ###
 
     async def post_pending_messages(self):
-        while self.enabled == True:
-            # Sleep 60 seconds, but abort at any time when requested
-            for _ in range(1, 60):
-                await asyncio.sleep(1)
-                if self.enabled == False:
-                    return
-            self.debugPrint("Waking up")
-            # Copy configs and pending data (keep the lock short)
-            with self.lock:
-                configsCopy = {serverId: self.configs[serverId] for serverId in self.configs}
-                pendingDataCopy = {}
-                for serverId in self.pendingData:
-                    pendingDataCopy[serverId] = copy.deepcopy(self.pendingData[serverId])
-                    self.pendingData[serverId] = []
-            self.debugPrint("Copied data")
-            # Process copied data now
-            for serverId, config in configsCopy.items():
-                if len(pendingDataCopy[serverId]) > 0:
-                    self.debugPrint(f"Processing messages for server ID {serverId}")
-                    data = pendingDataCopy[serverId]
-
-                    # Create a new embed for each message
-                    for entry in data:
-                        if entry.isOnlineMessage:
-                            indicator = "🟢"
-                            statusPart = "now online"
-                        elif entry.isOfflineMessage:
-                            indicator = "🔴"
-                            statusPart = "now offline"
-                        elif entry.isUnreachableMessage:
-                            indicator = "🔴"
-                            statusPart = "now unreachable (host offline)"
-
-                        try:
-                            message = f"{indicator} {config.icon} **{config.title}** is {statusPart}"
-                            embed = discord.Embed(description=message, color=int(config.color,16))
-                            await config.channel.send(embed=embed)
-                        except Exception:
-                            print(
-                                f"[WARN ] [ServerStatusHandler] Failed creating a server status embed: {traceback.format_exc()}"
-                            )
-
-                        # don't spam messages
-                        await asyncio.sleep(1)
-
-        print("[INFO ] [ServerStatusHandler] ServerStatusHandler was aborted")
+        try:
+            while True:
+                await asyncio.sleep(60)
+                await self.post_all_pending_messages()
+        except asyncio.CancelledError:
+            print("[INFO ] [ServerStatusHandler] ServerStatusHandler was aborted")
+            raise
+
+    async def flush(self):
+        """Posts all pending messages right away, without delays between the messages"""
+        await self.post_all_pending_messages(messageDelay=0)
+
+    async def post_all_pending_messages(self, messageDelay=1):
+        """Posts all messages which are currently pending"""
+        self.debugPrint("Waking up")
+        # Copy configs and pending data (keep the lock short)
+        with self.lock:
+            configsCopy = {serverId: self.configs[serverId] for serverId in self.configs}
+            pendingDataCopy = {}
+            for serverId in self.pendingData:
+                pendingDataCopy[serverId] = copy.deepcopy(self.pendingData[serverId])
+                self.pendingData[serverId] = []
+        self.debugPrint("Copied data")
+        # Process copied data now
+        for serverId, config in configsCopy.items():
+            if len(pendingDataCopy[serverId]) > 0:
+                self.debugPrint(f"Processing messages for server ID {serverId}")
+                data = pendingDataCopy[serverId]
+
+                # Create a new embed for each message
+                for entry in data:
+                    if entry.isOnlineMessage:
+                        indicator = "🟢"
+                        statusPart = "now online"
+                    elif entry.isOfflineMessage:
+                        indicator = "🔴"
+                        statusPart = "now offline"
+                    elif entry.isUnreachableMessage:
+                        indicator = "🔴"
+                        statusPart = "now unreachable (host offline)"
+
+                    try:
+                        message = f"{indicator} {config.icon} **{config.title}** is {statusPart}"
+                        embed = discord.Embed(description=message, color=int(config.color,16))
+                        if config.channel is None:
+                            config.channel = get_messageable(self.discordClient, config.channelId)
+                        await config.channel.send(embed=embed)
+                    except Exception:
+                        print(
+                            f"[WARN ] [ServerStatusHandler] Failed creating a server status embed: {traceback.format_exc()}"
+                        )
+
+                    # don't spam messages
+                    await asyncio.sleep(messageDelay)
 
     ### Event listeners ###
 
+    def on_changes(self, changes: ServerStatusChanges):
+        if changes.statusChanged:
+            self.on_server_status_changed(changes.serverId, changes.serverData)
+
     def on_server_status_changed(self, serverId, serverData):
         with self.lock:
             if serverId in self.pendingData:
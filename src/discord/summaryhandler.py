@@ -1,5 +1,7 @@
 from threading import Lock
 from fs22.fs22server import OnlineState
+from fs22.servertracker import ServerStatusChanges
+from discord.objectresolver import get_channel
 import asyncio
 import discord
 import traceback
@@ -11,9 +13,10 @@ import time
 class SummaryConfig:
     """This class stores the fixed information about a summary reporting channel"""
 
-    def __init__(self, shortName, channel):
+    def __init__(self, shortName, channelId):
         self.shortName = shortName
-        self.channel = channel
+        self.channelId = channelId
+        self.channel = None  # Resolved on first use
 
 
 class SummaryStatus:
@@ -50,7 +53,6 @@ class SummaryHandler:
         self.pendingData = {}  # Stores a SummaryStatus update to be processed as soon as allowed
         self.currentData = {}  # Stores the current SummaryStatus state
         self.lock = Lock()
-        self.enabled = True
         self.task = None
         self.discordClient = discordClient
         self.debug = False
@@ -74,7 +76,7 @@ class SummaryHandler:
             del self.currentData[serverId]
 
     async def track_server(self, serverId, interaction, shortName):
-        summaryConfig = SummaryConfig(shortName, interaction.channel)
+        summaryConfig = SummaryConfig(shortName, interaction.channel.id)
         self.add_config(serverId, summaryConfig)
 
     async def update_short_name(self, serverId, interaction, shortName):
@@ -86,65 +88,67 @@ class SummaryHandler:
 
     def start(self):
         if self.task is None:
-            self.enabled = True
             self.task = asyncio.create_task(self.process_updates())
 
     def stop(self):
         if self.task is not None:
-            self.enabled = False
+            self.task.cancel()
 
     async def wait_for_completion(self):
-        counter = 0
-        while counter < 70 and not self.task.done():
-            await asyncio.sleep(1)
-            counter += 1
-        self.task = None
+        if self.task is not None:
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
 
     ### Discord update ###
 
     async def process_updates(self):
-        while self.enabled == True:
-            # Sleep 60 seconds, but abort at any time when requested
-            for _ in range(1, 60):
-                await asyncio.sleep(1)
-                if self.enabled == False:
-                    return
-            self.debugPrint("Waking up")
-            # Copy configs and pending data (keep the lock short)
-            with self.lock:
-                configsCopy = {
-                    serverId: self.configs[serverId] for serverId in self.configs}
-                pendingDataCopy = {
-                    serverId: self.pendingData[serverId] for serverId in self.pendingData}
-                currentDataCopy = {
-                    serverId: self.currentData[serverId] for serverId in self.currentData}
-            self.debugPrint("Copied data")
-
-            # Process copied data now
-            for serverId, configCopy in configsCopy.items():
-                pending = pendingDataCopy[serverId]
-                if pending is not None:
-                    current = currentDataCopy[serverId]
-
-                    if not self.update_is_necessary(serverId, pending, current):
-                        continue
-
-                    onlineSign = "🟢" if pending.onlineState == OnlineState.Online else "🔴"
-                    try:
-                        channelName = f"{onlineSign} {configCopy.shortName}: {pending.onlinePlayers}/{pending.maxPlayers}"
-                        self.debugPrint(f"Renaming channel to >>{channelName}<<")
-                        await configCopy.channel.edit(name=channelName)
-                    except Exception:
-                        print(f"[WARN ] [SummaryHandler] Failed renaming the channel: {traceback.format_exc()}")
-
-                    self.debugPrint(
-                        "Updating current data and resetting pending data")
-                    with self.lock:
-                        self.currentData[serverId] = SummaryStatus(
-                            pending.onlinePlayers, pending.maxPlayers, pending.onlineState, datetime.datetime.now())
-                        self.pendingData[serverId] = None
-
-        print("[INFO ] [SummaryHandler] SummaryHandler was aborted")
+        try:
+            while True:
+                await self.update_all_channels()
+                await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            print("[INFO ] [SummaryHandler] SummaryHandler was aborted")
+            raise
+
+    async def update_all_channels(self):
+        """Renames the channel of every server whose summary changed, as far as the rate limit allows"""
+        self.debugPrint("Waking up")
+        # Copy configs and pending data (keep the lock short)
+        with self.lock:
+            configsCopy = {
+                serverId: self.configs[serverId] for serverId in self.configs}
+            pendingDataCopy = {
+                serverId: self.pendingData[serverId] for serverId in self.pendingData}
+            currentDataCopy = {
+                serverId: self.currentData[serverId] for serverId in self.currentData}
+        self.debugPrint("Copied data")
+
+        # Process copied data now
+        for serverId, configCopy in configsCopy.items():
+            pending = pendingDataCopy[serverId]
+            if pending is not None:
+                current = currentDataCopy[serverId]
+
+                if not self.update_is_necessary(serverId, pending, current):
+                    continue
+
+                onlineSign = "🟢" if pending.onlineState == OnlineState.Online else "🔴"
+                try:
+                    channelName = f"{onlineSign} {configCopy.shortName}: {pending.onlinePlayers}/{pending.maxPlayers}"
+                    self.debugPrint(f"Renaming channel to >>{channelName}<<")
+                    if configCopy.channel is None:
+                        # Renaming requires the full channel object rather than a partial one
+                        configCopy.channel = await get_channel(self.discordClient, configCopy.channelId)
+                    await configCopy.channel.edit(name=channelName)
+                except Exception:
+                    print(f"[WARN ] [SummaryHandler] Failed renaming the channel: {traceback.format_exc()}")
+
+                self.debugPrint(
+                    "Updating current data and resetting pending data")
+                with self.lock:
+                    self.currentData[serverId] = SummaryStatus(
+                        pending.onlinePlayers, pending.maxPlayers, pending.onlineState, datetime.datetime.now())
+                    self.pendingData[serverId] = None
 
     def update_is_necessary(self, serverId, pending, current):
         self.debugPrint(
@@ -169,6 +173,11 @@ class SummaryHandler:
 
     ### Event listeners ###
 
+    def on_changes(self, changes: ServerStatusChanges):
+        """Updates the pending summary only if anything which is displayed in the channel name changed"""
+        if changes.isInitial or changes.statusChanged or changes.playerCountDelta != 0 or changes.maxPlayersChanged:
+            self.on_updated(changes.serverId, changes.serverData)
+
     def on_updated(self, serverId, serverData):
         with self.lock:
             self.pendingData[serverId] = SummaryStatus(
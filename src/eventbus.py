@@ -0,0 +1,134 @@
+import asyncio
+import inspect
+import time
+import traceback
+
+
+class SubscriberMetrics:
+    """This class stores statistics about the events processed by a single subscriber"""
+
+    def __init__(self):
+        self.received = 0  # Events which were put into the queue
+        self.processed = 0  # Events which were taken from the queue and handed to the callbacks
+        self.dropped = 0  # Events which were discarded because the queue was full
+        self.maxQueued = 0  # The most events which were waiting in the queue at once
+        self.failed = 0  # Callback invocations which raised an exception
+        self.lastLag = 0.0  # Seconds between publishing and processing the most recent event
+        self.maxLag = 0.0
+        self.totalLag = 0.0
+
+    def average_lag(self) -> float:
+        return self.totalLag / self.processed if self.processed > 0 else 0.0
+
+
+class Subscriber:
+    """Receives the events of the subscribed topics through a queue and processes them in a task of its own.
+    A slow subscriber therefore neither delays the publisher nor any other subscriber.
+    The queue of a lossless subscriber is unbounded, since the events it records must never be dropped. Any other
+    subscriber only displays the most recent state, so its queue is bounded and drops the oldest event when full."""
+
+    def __init__(self, name: str, maxQueueSize: int, lossless: bool = False):
+        self.name = name
+        self.callbacks: dict[str, list] = {}
+        self.lossless = lossless
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=0 if lossless else maxQueueSize)
+        self.metrics = SubscriberMetrics()
+        self.task: asyncio.Task = None
+
+    def subscribe(self, topic: str, callback):
+        """Registers a callback for the given topic. Callbacks may be plain functions or coroutine functions."""
+        if topic not in self.callbacks:
+            self.callbacks[topic] = []
+        self.callbacks[topic].append(callback)
+
+    def enqueue(self, topic: str, args: tuple):
+        if self.queue.full():
+            # Drop the oldest event rather than making the publisher wait
+            self.queue.get_nowait()
+            self.queue.task_done()
+            self.metrics.dropped += 1
+        self.queue.put_nowait((topic, args, time.monotonic()))
+        self.metrics.received += 1
+        self.metrics.maxQueued = max(self.metrics.maxQueued, self.queue.qsize())
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.process_events())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    async def wait_for_completion(self):
+        if self.task is not None:
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def process_events(self):
+        while True:
+            topic, args, timestamp = await self.queue.get()
+            try:
+                lag = time.monotonic() - timestamp
+                self.metrics.processed += 1
+                self.metrics.lastLag = lag
+                self.metrics.totalLag += lag
+                self.metrics.maxLag = max(self.metrics.maxLag, lag)
+                for callback in self.callbacks.get(topic, []):
+                    try:
+                        result = callback(*args)
+                        if inspect.isawaitable(result):
+                            await result
+                    except Exception:
+                        self.metrics.failed += 1
+                        print(f"[WARN ] [EventBus] Subscriber {self.name} failed processing {topic}: {traceback.format_exc()}")
+            finally:
+                self.queue.task_done()
+
+
+class EventBus:
+    """Distributes published events to the queues of all subscribers of the respective topic.
+    Publishing never blocks and never waits for a subscriber."""
+
+    def __init__(self):
+        self.subscribers: list[Subscriber] = []
+        self.started = False
+
+    def create_subscriber(self, name: str, maxQueueSize: int = 1000, lossless: bool = False) -> Subscriber:
+        """Creates a subscriber for display handlers, or a lossless one for consumers which record the events"""
+        subscriber = Subscriber(name, maxQueueSize, lossless)
+        self.subscribers.append(subscriber)
+        if self.started:
+            subscriber.start()
+        return subscriber
+
+    def remove_subscriber(self, subscriber: Subscriber):
+        if subscriber in self.subscribers:
+            self.subscribers.remove(subscriber)
+            subscriber.stop()
+
+    def publish(self, topic: str, *args):
+        for subscriber in self.subscribers:
+            if topic in subscriber.callbacks:
+                subscriber.enqueue(topic, args)
+
+    def get_metrics(self) -> dict[str, SubscriberMetrics]:
+        return {subscriber.name: subscriber.metrics for subscriber in self.subscribers}
+
+    ### Threading ###
+
+    def start(self):
+        self.started = True
+        for subscriber in self.subscribers:
+            subscriber.start()
+
+    async def drain(self):
+        """Waits until every subscriber processed all events which are currently queued"""
+        await asyncio.gather(*(subscriber.queue.join() for subscriber in self.subscribers if subscriber.task is not None))
+
+    def stop(self):
+        self.started = False
+        for subscriber in self.subscribers:
+            subscriber.stop()
+
+    async def wait_for_completion(self):
+        await asyncio.gather(*(subscriber.wait_for_completion() for subscriber in self.subscribers))
@@ -0,0 +1,204 @@
+"""Benchmarks the poll path: parsing the status feed of a server and detecting what changed since the previous poll.
+
+The feeds in fs22/fixtures cover the shapes a server can deliver:
+    empty.xml    16 free slots
+    full.xml     all 64 slots used
+    modded.xml   10 of 32 slots used, with hundreds of vehicles, mods and farmlands which the bot does not use
+    offline.xml  the host is online, but the game server is not
+
+Reported for every feed:
+    feeds/s for xmltodict.parse followed by parse_xml_data (the full poll), and for parse_xml_data alone
+    memory blocks and KiB which are retained per parsed feed, and the peak KiB while parsing a feed
+Reported for typical transitions between two polls:
+    µs per get_changes (the diff) and per send_events (the diff plus publishing to the usual amount of subscribers)
+
+Run from the src directory: python -m fs22.bench_fs22server [--output results.json] [--compare baseline.json]
+"""
+from eventbus import EventBus
+from fs22.fs22server import FS22ServerAccess, FS22ServerConfig, FS22ServerStatus, FS22PlayerStatus
+from fs22.servertracker import ServerTracker, ServerTrackerEvents
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+import xmltodict
+
+FIXTURE_FOLDER = os.path.join(os.path.dirname(__file__), "fixtures")
+FIXTURES = ["empty", "full", "modded", "offline"]
+NUM_SUBSCRIBERS = 8  # The handlers and trackers which the bot subscribes to the changes of every server
+EVENTS_PER_BATCH = 500  # Stays below the queue size of the subscribers, so no event is dropped while measuring
+TRACEMALLOC_FILTER = tracemalloc.Filter(False, tracemalloc.__file__)
+
+
+class BenchmarkResult:
+    """A single measured value"""
+
+    def __init__(self, subject: str, operation: str, value: float, unit: str):
+        self.subject = subject  # The feed or transition
+        self.operation = operation
+        self.value = value
+        self.unit = unit
+
+    def get_key(self) -> tuple[str, str]:
+        return self.subject, self.operation
+
+    def format(self, baseline=None) -> str:
+        line = f"{self.subject:<24} {self.operation:<26} {self.value:14.2f} {self.unit}"
+        if baseline is not None and baseline.value:
+            line += f"  {self.value / baseline.value:6.2f}x"
+        return line
+
+
+def load_fixture(name: str) -> bytes:
+    with open(os.path.join(FIXTURE_FOLDER, f"{name}.xml"), "rb") as file:
+        return file.read()
+
+
+def measure_rate(func, minDuration: float = 0.5) -> float:
+    """Calls the function repeatedly for at least the given amount of seconds and returns the calls per second"""
+    numCalls = 0
+    start = time.perf_counter()
+    while True:
+        for _ in range(100):
+            func()
+        numCalls += 100
+        elapsed = time.perf_counter() - start
+        if elapsed >= minDuration:
+            return numCalls / elapsed
+
+
+def measure_allocations(func, numCalls: int = 100) -> tuple[float, float, float]:
+    """Returns the memory blocks and KiB which are retained per call, as well as the peak KiB during a single call"""
+    results = [None] * numCalls
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot().filter_traces([TRACEMALLOC_FILTER])
+        for index in range(numCalls):
+            results[index] = func()
+        after = tracemalloc.take_snapshot().filter_traces([TRACEMALLOC_FILTER])
+        differences = after.compare_to(before, "filename")
+        numBlocks = sum(statistic.count_diff for statistic in differences)
+        numBytes = sum(statistic.size_diff for statistic in differences)
+
+        current, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return numBlocks / numCalls, numBytes / numCalls / 1024, (peak - current) / 1024
+
+
+def benchmark_parsing(serverAccess: FS22ServerAccess) -> list[BenchmarkResult]:
+    results = []
+    for name in FIXTURES:
+        feed = load_fixture(name)
+        xmlData = xmltodict.parse(feed)
+        subject = name
+        results.append(BenchmarkResult(subject, "feed size", len(feed) / 1024, "KiB"))
+        results.append(BenchmarkResult(
+            subject, "xml + parse_xml_data", measure_rate(lambda: serverAccess.parse_xml_data(xmltodict.parse(feed))),
+            "feeds/s"))
+        results.append(BenchmarkResult(
+            subject, "parse_xml_data", measure_rate(lambda: serverAccess.parse_xml_data(xmlData)), "feeds/s"))
+        numBlocks, retainedKiB, peakKiB = measure_allocations(
+            lambda: serverAccess.parse_xml_data(xmltodict.parse(feed)))
+        results.append(BenchmarkResult(subject, "retained blocks per feed", numBlocks, "blocks"))
+        results.append(BenchmarkResult(subject, "retained memory per feed", retainedKiB, "KiB"))
+        results.append(BenchmarkResult(subject, "peak memory per feed", peakKiB, "KiB"))
+    return results
+
+
+def copy_with_swapped_players(serverData: FS22ServerStatus, numPlayers: int) -> FS22ServerStatus:
+    """Copies the status and replaces the given amount of players by new ones, as if they left and others joined"""
+    result = FS22ServerStatus.from_snapshot(serverData.to_snapshot())
+    for playerName in list(result.onlinePlayers)[:numPlayers]:
+        del result.onlinePlayers[playerName]
+        newPlayerName = f"New {playerName}"
+        result.onlinePlayers[newPlayerName] = FS22PlayerStatus(newPlayerName, "1", "false")
+    return result
+
+
+def create_tracker(eventBus: EventBus, previousData: FS22ServerStatus) -> ServerTracker:
+    tracker = ServerTracker(FS22ServerConfig(0, "localhost", 8080, "code", "", "Benchmark", "FFFFFF", 0), eventBus)
+    tracker.lastknownServerData = previousData
+    return tracker
+
+
+def measure_send_events(eventBus: EventBus, tracker: ServerTracker, currentData: FS22ServerStatus) -> float:
+    """Returns the µs per call. The queues are emptied between batches without being measured.
+    Changes of the online state are logged on every call, so the log is discarded while measuring."""
+    fastest = float("inf")
+    with open(os.devnull, "w") as devNull, contextlib.redirect_stdout(devNull):
+        for _ in range(10):
+            for subscriber in eventBus.subscribers:
+                subscriber.queue = asyncio.Queue(maxsize=subscriber.queue.maxsize)
+            start = time.perf_counter()
+            for _ in range(EVENTS_PER_BATCH):
+                tracker.send_events(currentData)
+            fastest = min(fastest, time.perf_counter() - start)
+    return fastest / EVENTS_PER_BATCH * 1_000_000
+
+
+def benchmark_diffs(serverAccess: FS22ServerAccess) -> list[BenchmarkResult]:
+    statuses = {name: serverAccess.parse_xml_data(xmltodict.parse(load_fixture(name))) for name in FIXTURES}
+    full = statuses["full"]
+    transitions = [
+        ("full, unchanged", full, serverAccess.parse_xml_data(xmltodict.parse(load_fixture("full")))),
+        ("full, 8 players swapped", full, copy_with_swapped_players(full, 8)),
+        ("empty to full", statuses["empty"], full),
+        ("full to offline", full, statuses["offline"]),
+    ]
+    eventBus = EventBus()
+    for index in range(NUM_SUBSCRIBERS):
+        eventBus.create_subscriber(f"Subscriber {index}").subscribe(ServerTrackerEvents.changes, lambda changes: None)
+
+    results = []
+    for subject, previousData, currentData in transitions:
+        tracker = create_tracker(eventBus, previousData)
+        callsPerSecond = measure_rate(lambda: tracker.get_changes(currentData))
+        results.append(BenchmarkResult(subject, "get_changes", 1_000_000 / callsPerSecond, "µs"))
+        results.append(BenchmarkResult(
+            subject, f"send_events ({NUM_SUBSCRIBERS} subscribers)", measure_send_events(eventBus, tracker, currentData),
+            "µs"))
+    return results
+
+
+def load_baseline(filePath: str) -> dict[tuple[str, str], BenchmarkResult]:
+    with open(filePath, "r") as file:
+        data = json.load(file)
+    baseline = {}
+    for resultData in data["results"]:
+        result = BenchmarkResult(**resultData)
+        baseline[result.get_key()] = result
+    return baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks parsing server feeds and detecting changes")
+    parser.add_argument("--output", help="Writes the results to the given JSON file")
+    parser.add_argument("--compare", help="Compares the results to those in the given JSON file")
+    args = parser.parse_args()
+
+    baseline = load_baseline(args.compare) if args.compare else {}
+    serverAccess = FS22ServerAccess(FS22ServerConfig(0, "localhost", 8080, "code", "", "Benchmark", "FFFFFF", 0))
+    results = benchmark_parsing(serverAccess) + benchmark_diffs(serverAccess)
+    for result in results:
+        print(result.format(baseline.get(result.get_key())))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "xmltodict": getattr(xmltodict, "__version__", None),
+                "results": [result.__dict__ for result in results]
+            }, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
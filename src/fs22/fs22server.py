@@ -1,5 +1,5 @@
 from enum import Enum
-import urllib3
+import aiohttp
 import xmltodict
 import traceback
 
@@ -56,6 +56,31 @@ class FS22ServerStatus:
         self.dayTime = "0"
         self.version = "pending"
 
+    def to_snapshot(self) -> dict:
+        """Converts the status into a compact dictionary which can be stored as JSON"""
+        return {
+            "status": self.status.value,
+            "serverName": self.serverName,
+            "mapName": self.mapName,
+            "maxPlayers": self.maxPlayers,
+            "dayTime": self.dayTime,
+            "version": self.version,
+            "players": [[player.playerName, player.onlineTime, player.isAdmin] for player in self.onlinePlayers.values()]
+        }
+
+    @classmethod
+    def from_snapshot(cls, data: dict):
+        result = cls()
+        result.status = OnlineState(data["status"])
+        result.serverName = data["serverName"]
+        result.mapName = data["mapName"]
+        result.maxPlayers = data["maxPlayers"]
+        result.dayTime = data["dayTime"]
+        result.version = data["version"]
+        for playerName, onlineTime, isAdmin in data["players"]:
+            result.onlinePlayers[playerName] = FS22PlayerStatus(playerName, onlineTime, isAdmin)
+        return result
+
 
 class FS22ServerAccess:
     """Handles retrieval of the server status from a FS22 server status XML"""
@@ -63,31 +88,39 @@ class FS22ServerAccess:
     def __init__(self, serverConfig):
         self.serverXmlUrl = serverConfig.status_xml_url()
         self.serverConfig = serverConfig
+        self.session: aiohttp.ClientSession = None
 
-    def get_current_status(self):
+    async def get_current_status(self):
         """Retrieves the current server status from the XML file"""
 
-        xmlData = self.get_xml_from_server()
+        xmlData = await self.get_xml_from_server()
         return self.parse_xml_data(xmlData)
 
-    def get_xml_from_server(self):
-        """Tries retrieving the current XML data from the server. XML data are returned as a nested dictionary."""
-        http = urllib3.PoolManager()
+    async def get_xml_from_server(self):
+        """Tries retrieving the current XML data from the server. XML data are returned as a nested dictionary.
+        The request can be cancelled at any time."""
+        if self.session is None:
+            self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=2))
         try:
-            response = http.request(
-                "GET", self.serverXmlUrl, timeout=urllib3.util.Timeout(2))
-            if response.status == 200:
-                try:
-                    return xmltodict.parse(response.data)
-                except Exception:
-                    print(f"[WARN ] [FS22Server] Could not parse data of server {self.serverConfig.id}: {traceback.format_exc()}")
-            else:
-                print(f"[WARN ] [FS22Server] Reached server {self.serverConfig.id}, but failed reading XML: HTTP Response Code {response.status}")
+            async with self.session.get(self.serverXmlUrl) as response:
+                if response.status == 200:
+                    try:
+                        return xmltodict.parse(await response.read())
+                    except Exception:
+                        print(f"[WARN ] [FS22Server] Could not parse data of server {self.serverConfig.id}: {traceback.format_exc()}")
+                else:
+                    print(f"[WARN ] [FS22Server] Reached server {self.serverConfig.id}, but failed reading XML: HTTP Response Code {response.status}")
         except Exception:
             print(f"[INFO ] [FS22Server] Server {self.serverConfig.id} unreachable")
 
         return None
 
+    async def close(self):
+        """Releases the HTTP connections to the server"""
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
     def parse_xml_data(self, xmlData):
         """Parses the XML data of the server and transforms it into an FS22ServerStatus object"""
 
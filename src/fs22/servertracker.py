@@ -1,84 +1,126 @@
-from events import Events
-from fs22.fs22server import FS22ServerAccess, FS22ServerStatus, FS22ServerConfig, OnlineState
-from queue import Queue
+from eventbus import EventBus
+from fs22.fs22server import FS22ServerAccess, FS22ServerStatus, OnlineState
+from dataclasses import dataclass
 import asyncio
 import traceback
 
 
-class ServerTrackerEvents(Events):
-    """Defines events to be subscribed to"""
-    __events__ = ('playerWentOffline', 'playerWentOnline', 'serverStatusChanged',
-                  'playerAdminStateChanged', 'playerCountChanged', 'updated', 'initial')
+class ServerTrackerEvents:
+    """Defines the topics which are published by server trackers"""
+    changes = "changes"
+
+
+@dataclass(frozen=True)
+class ServerStatusChanges:
+    """Describes everything which changed on a server since the previous poll.
+    A single instance is published per poll, so consumers only need to process the changes."""
+
+    serverId: int
+    serverData: FS22ServerStatus  # The full current status for consumers which display it
+    isInitial: bool  # True for the first poll after tracking started
+    previousStatus: OnlineState
+    joinedPlayers: tuple[str, ...] = ()
+    leftPlayers: tuple[str, ...] = ()
+    newAdmins: tuple[str, ...] = ()
+    playerCountDelta: int = 0
+    previousMapName: str = None
+    previousVersion: str = None
+    previousMaxPlayers: str = None
+
+    @property
+    def statusChanged(self) -> bool:
+        return self.previousStatus != self.serverData.status
+
+    @property
+    def mapChanged(self) -> bool:
+        return self.previousMapName != self.serverData.mapName
+
+    @property
+    def versionChanged(self) -> bool:
+        return self.previousVersion != self.serverData.version
+
+    @property
+    def maxPlayersChanged(self) -> bool:
+        return self.previousMaxPlayers != self.serverData.maxPlayers
+
+    @property
+    def playerCount(self) -> int:
+        return len(self.serverData.onlinePlayers)
 
 
 class ServerTracker:
     """Tracks a single FS22 server and sends events whenever something changes"""
 
-    def __init__(self, serverConfig):
-        self.events = ServerTrackerEvents()
+    def __init__(self, serverConfig, eventBus: EventBus):
+        self.eventBus = eventBus
         self.lastknownServerData = FS22ServerStatus()
         self.serverId = serverConfig.id
         self.serverAccess = FS22ServerAccess(serverConfig)
         self.task = None
-        self.cancelled = False
 
     def start_tracker(self):
-        self.cancelled = False
         self.task = asyncio.create_task(self.track_server_status())
 
     def stop_tracker(self):
-        self.cancelled = True
+        """Stops tracking immediately, including any request which is currently in progress"""
+        if self.task is not None:
+            self.task.cancel()
+
+    async def wait_for_completion(self):
+        if self.task is not None:
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
 
     async def track_server_status(self):
         firstTime = True
         print("[ServerTracker] Server tracking has started")
-        while not self.cancelled:
-            try:
-                currentData = self.serverAccess.get_current_status()
-
-                # Send a single initial update when tracking starts
-                if firstTime:
-                    self.events.initial(self.serverId, currentData)
-                    firstTime = False
-
-                # Send other events for every update
-                if currentData is not None:
-                    self.send_events(currentData)
-                    self.lastknownServerData = currentData
-                else:
-                    print("[ServerTracker] No status")
-            except Exception:
-                print(f"[ServerTracker] Error: {traceback.format_exc()}")
-            await asyncio.sleep(5)
-
-        print("[ServerTracker] Server tracking has stopped")
-
-    def send_events(self, currentData):
-
-        # Handle players which are now offline first, in case the server went down or they logged on another server
-        for playerName in self.lastknownServerData.onlinePlayers:
-            if playerName not in currentData.onlinePlayers:
-                self.events.playerWentOffline(self.serverId, playerName)
-
-        # Handle server state changes and send full data in that case
-        if self.lastknownServerData.status != currentData.status:
+        try:
+            while True:
+                try:
+                    currentData = await self.serverAccess.get_current_status()
+
+                    # Send a single batch of changes for every update
+                    if currentData is not None:
+                        self.send_events(currentData, firstTime)
+                        self.lastknownServerData = currentData
+                        firstTime = False
+                    else:
+                        print("[ServerTracker] No status")
+                except Exception:
+                    print(f"[ServerTracker] Error: {traceback.format_exc()}")
+                await asyncio.sleep(5)
+        finally:
+            await self.serverAccess.close()
+            print("[ServerTracker] Server tracking has stopped")
+
+    def send_events(self, currentData: FS22ServerStatus, isInitial: bool = False):
+        changes = self.get_changes(currentData, isInitial)
+        if changes.statusChanged:
             print(f"[INFO ] [ServerTracker] Server {self.serverId} is now {currentData.status}")
-            self.events.serverStatusChanged(self.serverId, currentData)
-
-        # Handle recently logged in players now
-        for playerName in currentData.onlinePlayers:
-            if playerName not in self.lastknownServerData.onlinePlayers:
-                self.events.playerWentOnline(self.serverId, playerName)
-
-            if ((playerName not in self.lastknownServerData.onlinePlayers or
-                    self.lastknownServerData.onlinePlayers[playerName].isAdmin == "false")
-                    and currentData.onlinePlayers[playerName].isAdmin == "true"):
-                self.events.playerAdminStateChanged(self.serverId, playerName)
-
-        # Send a single event whenever the player count changed, for listeners which do not need to know which players are online
-        if len(self.lastknownServerData.onlinePlayers) != len(currentData.onlinePlayers):
-            self.events.playerCountChanged(
-                self.serverId, len(currentData.onlinePlayers))
-
-        # Send an update event with full data to handle any remaining case in the listener
-        self.events.updated(self.serverId, currentData)
+        self.eventBus.publish(ServerTrackerEvents.changes, changes)
+
+    def get_changes(self, currentData: FS22ServerStatus, isInitial: bool = False) -> ServerStatusChanges:
+        """Compares the current data to the last known data of the server"""
+        lastKnownPlayers = self.lastknownServerData.onlinePlayers
+        currentPlayers = currentData.onlinePlayers
+
+        # Players which are now offline are listed first, in case the server went down or they logged on another server
+        leftPlayers = tuple(playerName for playerName in lastKnownPlayers if playerName not in currentPlayers)
+        joinedPlayers = tuple(playerName for playerName in currentPlayers if playerName not in lastKnownPlayers)
+        newAdmins = tuple(
+            playerName for playerName, playerData in currentPlayers.items()
+            if playerData.isAdmin == "true" and
+            (playerName not in lastKnownPlayers or lastKnownPlayers[playerName].isAdmin == "false"))
+
+        return ServerStatusChanges(
+            serverId=self.serverId,
+            serverData=currentData,
+            isInitial=isInitial,
+            previousStatus=self.lastknownServerData.status,
+            joinedPlayers=joinedPlayers,
+            leftPlayers=leftPlayers,
+            newAdmins=newAdmins,
+            playerCountDelta=len(currentPlayers) - len(lastKnownPlayers),
+            previousMapName=self.lastknownServerData.mapName,
+            previousVersion=self.lastknownServerData.version,
+            previousMaxPlayers=self.lastknownServerData.maxPlayers)
@@ -0,0 +1,114 @@
+from eventbus import EventBus
+from fs22.fs22server import FS22ServerAccess, FS22ServerConfig, FS22ServerStatus, FS22PlayerStatus, OnlineState
+from fs22.servertracker import ServerTracker, ServerTrackerEvents
+import dataclasses
+import os
+import unittest
+import xmltodict
+
+FIXTURE_FOLDER = os.path.join(os.path.dirname(__file__), "fixtures")
+SERVER_ID = 3
+
+
+def load_status(name: str) -> FS22ServerStatus:
+    with open(os.path.join(FIXTURE_FOLDER, f"{name}.xml"), "rb") as file:
+        xmlData = xmltodict.parse(file.read())
+    return FS22ServerAccess(create_config()).parse_xml_data(xmlData)
+
+
+def create_config() -> FS22ServerConfig:
+    return FS22ServerConfig(SERVER_ID, "localhost", 8080, "code", "", "Test", "FFFFFF", 0)
+
+
+class TestServerTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.sut = ServerTracker(create_config(), EventBus())
+        self.full = load_status("full")
+
+    def test_unchanged(self):
+        self.sut.lastknownServerData = self.full
+
+        changes = self.sut.get_changes(load_status("full"))
+
+        self.assertEqual(changes.serverId, SERVER_ID)
+        self.assertFalse(changes.isInitial)
+        self.assertFalse(changes.statusChanged)
+        self.assertFalse(changes.mapChanged)
+        self.assertFalse(changes.versionChanged)
+        self.assertFalse(changes.maxPlayersChanged)
+        self.assertEqual(changes.joinedPlayers, ())
+        self.assertEqual(changes.leftPlayers, ())
+        self.assertEqual(changes.newAdmins, ())
+        self.assertEqual(changes.playerCountDelta, 0)
+        self.assertEqual(changes.playerCount, 64)
+
+    def test_swappedPlayers(self):
+        self.sut.lastknownServerData = self.full
+        currentData = FS22ServerStatus.from_snapshot(self.full.to_snapshot())
+        leavingPlayers = list(currentData.onlinePlayers)[:2]
+        for playerName in leavingPlayers:
+            del currentData.onlinePlayers[playerName]
+        currentData.onlinePlayers["New Admin"] = FS22PlayerStatus("New Admin", "1", "true")
+        currentData.onlinePlayers["New Player"] = FS22PlayerStatus("New Player", "1", "false")
+        currentData.onlinePlayers["Landwirt 2"].isAdmin = "true"
+
+        changes = self.sut.get_changes(currentData)
+
+        self.assertFalse(changes.statusChanged)
+        self.assertEqual(changes.leftPlayers, tuple(leavingPlayers))
+        self.assertEqual(changes.joinedPlayers, ("New Admin", "New Player"))
+        self.assertEqual(changes.newAdmins, ("Landwirt 2", "New Admin"))
+        self.assertEqual(changes.playerCountDelta, 0)
+
+    def test_emptyToFull(self):
+        self.sut.lastknownServerData = load_status("empty")
+
+        changes = self.sut.get_changes(self.full)
+
+        self.assertFalse(changes.statusChanged)
+        self.assertEqual(changes.joinedPlayers, tuple(self.full.onlinePlayers))
+        self.assertEqual(changes.leftPlayers, ())
+        self.assertEqual(changes.newAdmins, ("Farmer 0", "Bäuerin 1"))
+        self.assertEqual(changes.playerCountDelta, 64)
+
+    def test_fullToOffline(self):
+        self.sut.lastknownServerData = self.full
+
+        changes = self.sut.get_changes(load_status("offline"))
+
+        self.assertTrue(changes.statusChanged)
+        self.assertEqual(changes.previousStatus, OnlineState.Online)
+        self.assertEqual(changes.serverData.status, OnlineState.Offline)
+        self.assertTrue(changes.mapChanged)
+        self.assertEqual(changes.previousMapName, "Elmcreek")
+        self.assertEqual(changes.leftPlayers, tuple(self.full.onlinePlayers))
+        self.assertEqual(changes.joinedPlayers, ())
+        self.assertEqual(changes.playerCountDelta, -64)
+        self.assertEqual(changes.playerCount, 0)
+
+    def test_initialPoll(self):
+        changes = self.sut.get_changes(self.full, isInitial=True)
+
+        self.assertTrue(changes.isInitial)
+        self.assertEqual(changes.previousStatus, OnlineState.Unknown)
+        self.assertEqual(changes.joinedPlayers, tuple(self.full.onlinePlayers))
+
+    def test_changesAreImmutable(self):
+        changes = self.sut.get_changes(self.full)
+
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            changes.joinedPlayers = ()
+
+    def test_sendEventsPublishesOneChangeSet(self):
+        subscriber = self.sut.eventBus.create_subscriber("Test")
+        subscriber.subscribe(ServerTrackerEvents.changes, lambda changes: None)
+
+        self.sut.send_events(self.full)
+
+        self.assertEqual(subscriber.queue.qsize(), 1)
+        self.assertEqual(subscriber.metrics.received, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
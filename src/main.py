@@ -4,8 +4,12 @@ from discord.playerstatushandler import PlayerStatusHandler
 from discord.serverstatushandler import ServerStatusHandler
 from discord.summaryhandler import SummaryHandler
 from discord.commandhandler import CommandHandler
-from stats.statsreporter import StatsReporter
+from stats.statsreporter import StatsReporter, MAX_PAGE_SIZE
+from stats.statstracker import StatsWindows
+from stats.export import EXPORT_FORMATS
 from persistence import PersistenceDataMapper
+from eventbus import EventBus
+from commandsync import sync_command_tree
 from dotenv import load_dotenv
 import discord
 from discord import app_commands
@@ -15,6 +19,8 @@ import sys
 import traceback
 
 stopped = False
+stopEvent: asyncio.Event = None
+mainLoop: asyncio.AbstractEventLoop = None
 firstCallOfOnReady = True
 
 # Create a discord client to allow interacting with a discord server
@@ -37,7 +43,8 @@ playerStatusHandler = PlayerStatusHandler(client)
 serverStatusHandler = ServerStatusHandler(client)
 summaryHandler = SummaryHandler(client)
 statsReporter = StatsReporter(client)
-commandHandler = CommandHandler(infoPanelHandler, playerStatusHandler, serverStatusHandler, summaryHandler, statsReporter)
+eventBus = EventBus()
+commandHandler = CommandHandler(infoPanelHandler, playerStatusHandler, serverStatusHandler, summaryHandler, statsReporter, eventBus)
 persistenceDataMapper = PersistenceDataMapper(commandHandler, storageRootPath)
 
 @tree.command(name="fssb_add_embed",
@@ -98,14 +105,50 @@ async def fssb_set_bot_status_channel(interaction):
     await commandHandler.set_bot_status_channel(interaction)
     persistenceDataMapper.store_data()
 
+STATS_WINDOW_CHOICES = [
+    app_commands.Choice(name=window.description, value=window.name) for window in StatsWindows.available]
+
+
 @tree.command(name="fssb_set_stats_channel",
               description="Creates an embed in this channel which displays online time stats for players")
-@app_commands.describe()
-async def fssb_set_stats_channel(interaction):
-    await commandHandler.set_stats_channel(interaction)
+@app_commands.describe(window="The period of time to display online times for (default: last 14 days)")
+@app_commands.choices(window=STATS_WINDOW_CHOICES)
+async def fssb_set_stats_channel(interaction, window: str = StatsWindows.default.name):
+    await commandHandler.set_stats_channel(interaction, window)
+    persistenceDataMapper.store_data()
+
+
+@tree.command(name="fssb_set_stats_window",
+              description="Changes the period of time which the stats embeds of this server display online times for")
+@app_commands.describe(window="The period of time to display online times for")
+@app_commands.choices(window=STATS_WINDOW_CHOICES)
+async def fssb_set_stats_window(interaction, window: str):
+    await commandHandler.set_stats_window(interaction, window)
     persistenceDataMapper.store_data()
 
 
+@tree.command(name="fssb_set_stats_page_size",
+              description="Changes the amount of players which the stats embeds of this server display per page")
+@app_commands.describe(players=f"The amount of players per page (1-{MAX_PAGE_SIZE})")
+async def fssb_set_stats_page_size(interaction, players: app_commands.Range[int, 1, MAX_PAGE_SIZE]):
+    await commandHandler.set_stats_page_size(interaction, players)
+    persistenceDataMapper.store_data()
+
+
+@tree.command(name="fssb_show_heatmap",
+              description="Shows the hours of the week during which players are online")
+@app_commands.describe(id="The ID of the server (default: all servers of this discord server)")
+async def fssb_show_heatmap(interaction, id: int = None):
+    await commandHandler.show_heatmap(interaction, id)
+
+
+@tree.command(name="fssb_show_uptime",
+              description="Shows the uptime and outages of the FS22 servers")
+@app_commands.describe(id="The ID of the server (default: all servers of this discord server)")
+async def fssb_show_uptime(interaction, id: int = None):
+    await commandHandler.show_uptime(interaction, id)
+
+
 @tree.command(name="fssb_register_server",
               description="Register an FS22 server to be tracked by this bot. Required for other commands")
 @app_commands.describe(
@@ -141,25 +184,69 @@ async def fssb_send_message(interaction, message: str):
         ephemeral=True,
         delete_after=1)
 
-@tree.command(name="fssb_get_tracking_data", description="Retrieves the tracking data")
+@tree.command(name="fssb_export_stats",
+              description="Exports the daily online times of the servers of this discord server as a compressed file")
+@app_commands.describe(
+    format="The format of the file (default: CSV)",
+    id="The ID of the server (default: all servers of this discord server)",
+    start="The first day to export, as YYYY-MM-DD (default: the oldest tracked day)",
+    end="The last day to export, as YYYY-MM-DD (default: today)")
+@app_commands.choices(format=[
+    app_commands.Choice(name=exportFormat.upper(), value=exportFormat) for exportFormat in EXPORT_FORMATS])
+async def fssb_export_stats(interaction, format: str = "csv", id: int = None, start: str = None, end: str = None):
+    await commandHandler.export_stats(interaction, format, id, start, end)
+
+
+@tree.command(name="fssb_import_stats",
+              description="Adds the online times of another bot instance or a backup. Each file is only imported once")
+@app_commands.describe(
+    file="A timetracking.json or timetracking.bin file",
+    server_ids="Maps the server IDs of the file to the IDs of your servers, e.g. 0:3,1:4 (default: same IDs)")
+async def fssb_import_stats(interaction, file: discord.Attachment, server_ids: str = None):
+    if await commandHandler.import_stats(interaction, file, server_ids):
+        # Imported data are not journaled, so they are only safe once a snapshot was written
+        persistenceDataMapper.compact_journal(force=True)
+        persistenceDataMapper.store_imported_snapshots()
+
+
+@tree.command(name="fssb_get_bot_metrics", description="Retrieves internal metrics of the bot")
 @app_commands.describe()
-async def fssb_get_tracking_data(interaction):
+async def fssb_get_bot_metrics(interaction):
     if not interaction.permissions.administrator:
         await interaction.response.send_message(
             content="Only administrators are allowed to run commands on this bot",
             ephemeral=True,
             delete_after=10)
         return
-    trackingData = await persistenceDataMapper.get_tracking_data()
-    if trackingData:
-        await interaction.response.send_message(
-            content=trackingData,
-            ephemeral=True)
-    else:
+    lines = ["**Event subscribers**"]
+    for name, metrics in eventBus.get_metrics().items():
+        lines.append(
+            f"{name}: {metrics.processed}/{metrics.received} processed, {metrics.dropped} dropped, {metrics.failed} failed, " +
+            f"{metrics.maxQueued} queued at most, " +
+            f"lag {metrics.lastLag * 1000:.1f} ms (avg {metrics.average_lag() * 1000:.1f} ms, max {metrics.maxLag * 1000:.1f} ms)")
+    writerMetrics = persistenceDataMapper.writer.metrics
+    lines.append("**Persistence**")
+    lines.append(
+        f"{writerMetrics.writes} files written for {writerMetrics.requests} requests in {writerMetrics.flushes} batches, " +
+        f"{writerMetrics.failed} failed, flush latency {writerMetrics.lastFlushLatency * 1000:.1f} ms " +
+        f"(avg {writerMetrics.average_flush_latency() * 1000:.1f} ms, max {writerMetrics.maxFlushLatency * 1000:.1f} ms)")
+    await interaction.response.send_message(content="\n".join(lines), ephemeral=True)
+
+
+@tree.command(name="fssb_sync_commands", description="Forces synchronizing the slash commands of this bot with discord")
+@app_commands.describe()
+async def fssb_sync_commands(interaction):
+    if not interaction.permissions.administrator:
         await interaction.response.send_message(
-            content="No data",
+            content="Only administrators are allowed to run commands on this bot",
             ephemeral=True,
-            delete_after=1)
+            delete_after=10)
+        return
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    if await sync_command_tree(tree, persistenceDataMapper, force=True):
+        await interaction.followup.send(content="Commands successfully synchronized", ephemeral=True)
+    else:
+        await interaction.followup.send(content="Failed synchronizing commands", ephemeral=True)
 
 
 @client.event
@@ -173,18 +260,9 @@ async def on_ready():
         return
     firstCallOfOnReady = False
 
-    # Restore existing config first
-
-    await persistenceDataMapper.restore_data(client)
-
     # Enable slash commands like /fss_add_embed
     print("[INFO ] [main] Discord client is ready")
-    print("[INFO ] [main] Waiting for tree sync")
-    try:
-        await tree.sync()
-        print("[INFO ] [main] Tree is now synched")
-    except Exception:
-        print(f"[INFO ] [main] Failed waiting for tree sync: {traceback.format_exc()}")
+    await sync_command_tree(tree, persistenceDataMapper)
 
     infoPanelHandler.start()
     playerStatusHandler.start()
@@ -193,9 +271,30 @@ async def on_ready():
     statsReporter.start()
     print("[INFO ] [main] Finished initialization")
 
-    global stopped
+def handlePotentialTaskException(task, title):
+    if task is not None and task.done() and not task.cancelled():
+        exc = task.exception()
+        if exc is not None:
+            print(f"[ERROR] [main] {title} encountered an exception: {exc}")
+            print(f"[ERROR] [main] Traceback: {task.get_stack()}")
+
+async def wait_until_stopped():
+    """Monitors the handlers until a stop was requested"""
+    loopCounter = 0
     while stopped == False:
-        await asyncio.sleep(5)
+        try:
+            await asyncio.wait_for(stopEvent.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            pass
+        loopCounter += 1
+        if loopCounter % 12 == 0:
+            # Remember the server status once per minute so panels can be filled right after a restart
+            persistenceDataMapper.store_status_snapshot()
+        if loopCounter % 120 == 0:
+            # Fold the session journal into the time tracker file every ten minutes.
+            # The player count history, heatmaps and availability logs are stored at the same pace.
+            persistenceDataMapper.compact_journal()
+            persistenceDataMapper.store_time_series()
         handlePotentialTaskException(infoPanelHandler.task, "Info Panel Handler")
         handlePotentialTaskException(playerStatusHandler.task, "Player Status Handler")
         handlePotentialTaskException(serverStatusHandler.task, "Server Status Handler")
@@ -203,28 +302,63 @@ async def on_ready():
         handlePotentialTaskException(statsReporter.task, "Stats Reporter")
         sys.stdout.flush()
 
-    print("[INFO ] [main] Waiting for threads to end")
-    infoPanelHandler.stop()
-    playerStatusHandler.stop()
-    serverStatusHandler.stop()
-    summaryHandler.stop()
-    statsReporter.stop()
-
-    await infoPanelHandler.wait_for_completion()
-    await playerStatusHandler.wait_for_completion()
-    await serverStatusHandler.wait_for_completion()
-    await summaryHandler.wait_for_completion()
-    await statsReporter.wait_for_completion()
+async def shutdown():
+    """Stops everything in parallel using task cancellation. Pending data are flushed first.
+    The whole shutdown is limited to FSSB_SHUTDOWN_TIMEOUT seconds so it finishes within the kill timeout of fly.io"""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + float(os.getenv("FSSB_SHUTDOWN_TIMEOUT", "4"))
+    handlers = [infoPanelHandler, playerStatusHandler, serverStatusHandler, summaryHandler, statsReporter]
+
+    async def run_until_deadline(coroutine, title):
+        try:
+            await asyncio.wait_for(coroutine, timeout=max(deadline - loop.time(), 0.1))
+        except asyncio.TimeoutError:
+            print(f"[WARN ] [main] Shutdown deadline exceeded while {title}")
+        except Exception:
+            print(f"[WARN ] [main] Failed {title}: {traceback.format_exc()}")
+
+    print("[INFO ] [main] Stopping server trackers")
+    await run_until_deadline(commandHandler.stop_trackers(), "stopping server trackers")
+    await run_until_deadline(eventBus.drain(), "processing pending events")
+
+    print("[INFO ] [main] Flushing pending data")
+    await run_until_deadline(persistenceDataMapper.flush(), "flushing persistent data")
+    if client.is_ready():
+        await run_until_deadline(
+            asyncio.gather(playerStatusHandler.flush(), serverStatusHandler.flush()), "flushing pending messages")
+
+    print("[INFO ] [main] Waiting for tasks to end")
+    for handler in handlers:
+        handler.stop()
+    eventBus.stop()
+    persistenceDataMapper.writer.stop()
+    await run_until_deadline(
+        asyncio.gather(
+            eventBus.wait_for_completion(), persistenceDataMapper.writer.wait_for_completion(),
+            *(handler.wait_for_completion() for handler in handlers)),
+        "stopping handlers")
+
+    await run_until_deadline(client.close(), "closing the discord client")
     print("[INFO ] [main] Done")
 
-    await client.close()
-
-def handlePotentialTaskException(task, title):
-    if task.done() and not task.cancelled():
-        exc = task.exception()
-        if exc is not None:
-            print(f"[ERROR] [main] {title} encountered an exception: {exc}")
-            print(f"[ERROR] [main] Traceback: {task.get_stack()}")
+async def run_bot(token):
+    """Restores the configuration and starts polling the servers while logging in to discord.
+    The handlers are started as soon as discord is ready."""
+    global stopEvent, mainLoop
+    stopEvent = asyncio.Event()
+    mainLoop = asyncio.get_running_loop()
+    eventBus.start()
+    persistenceDataMapper.writer.start()
+    await persistenceDataMapper.restore_data()
+    async with client:
+        clientTask = asyncio.create_task(client.start(token))
+        stopTask = asyncio.create_task(wait_until_stopped())
+        await asyncio.wait([clientTask, stopTask], return_when=asyncio.FIRST_COMPLETED)
+        await shutdown()
+        stopTask.cancel()
+        await asyncio.gather(clientTask, stopTask, return_exceptions=True)
+        if clientTask.done() and not clientTask.cancelled() and clientTask.exception() is not None:
+            raise clientTask.exception()
 
 def signal_handler(sig, frame):
     print("[INFO ] [main] Caught Ctrl+C. Stopping")
@@ -234,6 +368,8 @@ def signal_handler(sig, frame):
         sys.exit(0)
     else:
         stopped = True
+        if mainLoop is not None:
+            mainLoop.call_soon_threadsafe(stopEvent.set)
 
 
 signal.signal(signal.SIGINT, signal_handler)
@@ -246,7 +382,8 @@ try:
 
     print("[INFO ] [main] Running client")
     token = os.getenv("DISCORD_TOKEN")
-    client.run(token)
-    print("[INFO ] [main] Discord client.run() returned")
+    discord.utils.setup_logging()
+    asyncio.run(run_bot(token))
+    print("[INFO ] [main] Discord client.start() returned")
 except Exception:
     print(f"[ERROR] [main] {traceback.format_exc()}")
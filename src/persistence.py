@@ -3,14 +3,21 @@ from discord.infopanelhandler import InfoPanelConfig, InfoPanelHandler
 from discord.playerstatushandler import PlayerStatusConfig, PlayerStatusHandler
 from discord.serverstatushandler import ServerStatusConfig, ServerStatusHandler
 from discord.summaryhandler import SummaryConfig, SummaryHandler
-from fs22.fs22server import FS22ServerConfig
-from stats.statstracker import OnlineTimeTracker
-from stats.statsreporter import StatsReporter
-from stats.playertracker import PlayerTracker
+from fs22.fs22server import FS22ServerConfig, FS22ServerStatus
+from stats.statstracker import OnlineTimeTracker, NUM_DAYS
+from stats.statsreporter import StatsReporter, StatsEmbedConfig
+from stats.playertracker import PlayerTracker, PlayerTrackerEvents
+from stats.journal import SessionJournal
+from stats.sqlitetracker import SqliteTimeTracker
+from stats.snapshotformat import to_binary, from_binary
+from stats.timeseries import TimeSeriesStore
+from stats.heatmap import HeatmapTracker
+from stats.availability import AvailabilityTracker
+from persistencewriter import PersistenceWriter
+import asyncio
 import json
 import os
 import traceback
-import discord
 
 def to_json(obj):
     return json.dumps(obj, default=lambda innerObj: getattr(innerObj, '__dict__', str(innerObj)))
@@ -42,6 +49,8 @@ class BotConfiguration:
     def __init__(self):
         self.serverConfigs = {}
         self.statsEmbedsAndChannels: dict[int, int] = {}
+        self.statsEmbedWindows: dict[int, str] = {}
+        self.statsEmbedPageSizes: dict[int, int] = {}
 
     def add_server_config(self, serverId, serverConfig):
         self.serverConfigs[serverId] = serverConfig
@@ -53,6 +62,9 @@ class PersistenceDataMapper:
     def __init__(self, commandHandler, storageRootPath):
         self.commandHandler: CommandHandler = commandHandler
         self.storageRootPath = storageRootPath
+        self.lastStatusSnapshot: str = None
+        self.journal: SessionJournal = None
+        self.writer = PersistenceWriter()
 
     def get_config_folder(self):
         return os.path.join(self.storageRootPath, "fssb")
@@ -63,21 +75,139 @@ class PersistenceDataMapper:
     def get_timetracker_file(self, configFolder):
         return os.path.join(configFolder, "timetracking.json")
     
+    def get_database_file(self, configFolder):
+        return os.path.join(configFolder, "fssb.sqlite")
+
+    def get_journal_file(self, configFolder):
+        return os.path.join(configFolder, "timetracking.journal")
+
     def get_backup_file(self, configFolder):
         return os.path.join(configFolder, "timetracking_backup.json")
 
+    def get_snapshot_file(self, configFolder):
+        return os.path.join(configFolder, "timetracking.bin")
+
+    def get_snapshot_backup_file(self, configFolder):
+        return os.path.join(configFolder, "timetracking_backup.bin")
+
+    def get_session_checkpoint_file(self, configFolder):
+        return os.path.join(configFolder, "sessions.json")
+
+    def get_time_series_file(self, configFolder):
+        return os.path.join(configFolder, "timeseries.bin")
+
+    def get_heatmap_file(self, configFolder):
+        return os.path.join(configFolder, "heatmaps.json")
+
+    def get_availability_file(self, configFolder):
+        return os.path.join(configFolder, "availability.json")
+
+    def get_status_snapshot_file(self, configFolder):
+        return os.path.join(configFolder, "serverstatus.json")
+
+    def get_command_fingerprint_file(self, configFolder):
+        return os.path.join(configFolder, "commands.fingerprint")
+
+    def get_imported_snapshots_file(self, configFolder):
+        return os.path.join(configFolder, "imported.fingerprints")
+
     def store_data(self):
-        jsonData = self.store_as_json()
+        """Requests storing the configuration. It is serialized once the writer gets to it, so bursts of changes
+        only result in a single write."""
+        configFolder = self.get_config_folder()
+        if not os.path.exists(configFolder):
+            os.mkdir(configFolder)
+        self.writer.request_write(self.get_config_file(configFolder), self.store_as_json)
+
+    def load_command_fingerprint(self) -> str:
+        """Retrieves the fingerprint of the slash commands which were last synced with discord"""
+        filePath = self.get_command_fingerprint_file(self.get_config_folder())
+        try:
+            if os.path.exists(filePath):
+                with open(filePath, "r") as file:
+                    return file.read().strip()
+        except Exception:
+            print(f"[WARN ] [Persistence] Failed reading command fingerprint: {traceback.format_exc()}")
+        return None
+
+    def store_command_fingerprint(self, fingerprint: str):
         configFolder = self.get_config_folder()
         if not os.path.exists(configFolder):
             os.mkdir(configFolder)
-        with open(self.get_config_file(configFolder), "w") as file:
-            file.write(jsonData)
+        self.writer.request_write(self.get_command_fingerprint_file(configFolder), lambda: fingerprint)
+
+    def load_imported_snapshots(self) -> set[str]:
+        """Retrieves the fingerprints of all snapshots which were imported, one per line"""
+        filePath = self.get_imported_snapshots_file(self.get_config_folder())
+        if not os.path.exists(filePath):
+            return set()
+        with open(filePath, "r") as file:
+            return {line.strip() for line in file if line.strip()}
+
+    def store_imported_snapshots(self):
+        """Requests storing the fingerprints of the imported snapshots. The request must follow the one for the snapshot
+        of the time tracker, so the imported data are written no later than their fingerprint."""
+        configFolder = self.get_config_folder()
+        fingerprints = "\n".join(sorted(self.commandHandler.importedSnapshots))
+        self.writer.request_write(self.get_imported_snapshots_file(configFolder), lambda: fingerprints)
+
+    def store_status_snapshot(self):
+        """Stores the last known status of every server. Nothing is written if the status did not change."""
+        snapshot = {
+            "version": 1,
+            "servers": {serverId: serverData.to_snapshot()
+                        for serverId, serverData in self.commandHandler.get_last_known_status().items()}
+        }
+        jsonData = json.dumps(snapshot, separators=(",", ":"))
+        if jsonData == self.lastStatusSnapshot:
+            return
+        configFolder = self.get_config_folder()
+        if not os.path.exists(configFolder):
+            os.mkdir(configFolder)
+
+        def on_written():
+            self.lastStatusSnapshot = jsonData
+        self.writer.request_write(self.get_status_snapshot_file(configFolder), lambda: jsonData, onWritten=on_written)
+
+    def restore_status_snapshot(self):
+        """Provides the last known status of every server to the handlers"""
+        filePath = self.get_status_snapshot_file(self.get_config_folder())
+        if not os.path.exists(filePath):
+            print("[INFO ] [Persistence] No server status snapshot found")
+            return
+        try:
+            with open(filePath, "r") as file:
+                snapshot = json.loads(file.read())
+            statusPerServer = {
+                int(serverIdStr): FS22ServerStatus.from_snapshot(serverData)
+                for serverIdStr, serverData in snapshot["servers"].items()
+            }
+            self.commandHandler.warm_up_handlers(statusPerServer)
+            print(f"[INFO ] [Persistence] Restored the last known status of {len(statusPerServer)} servers")
+        except Exception:
+            print(f"[WARN ] [Persistence] Failed restoring server status snapshot: {traceback.format_exc()}")
+
+    async def flush(self):
+        """Writes all data which is kept in memory to the persistent storage"""
+        if self.commandHandler.playerTracker is not None:
+            self.commandHandler.playerTracker.credit_pending_sessions()
+        self.store_data()
+        self.store_status_snapshot()
+        self.store_session_checkpoint()
+        self.store_time_series()
+        self.compact_journal()
+        if self.commandHandler.playerTracker is not None and \
+                isinstance(self.commandHandler.playerTracker.timeTracker, SqliteTimeTracker):
+            await asyncio.to_thread(self.commandHandler.playerTracker.timeTracker.flush)
+        await self.writer.flush()
 
     async def get_tracking_data(self) -> str:
         configFolder = self.get_config_folder()
         timetrackerFilePath = self.get_timetracker_file(configFolder)
-        try:            
+        if not os.path.exists(timetrackerFilePath):
+            # The file is only missing if the bot was stopped while the backup was being replaced
+            timetrackerFilePath = self.get_backup_file(configFolder)
+        try:
             if os.path.exists(timetrackerFilePath):
                 with open(timetrackerFilePath, "r") as file:
                     print(f"[INFO ] [Persistence] Loading time tracker data from {timetrackerFilePath}")
@@ -89,20 +219,81 @@ class PersistenceDataMapper:
         
         return None
 
-    async def restore_data(self, discordClient):
-        trackingData = await self.get_tracking_data()
-        if trackingData:
-            print("[INFO ] [Persistence] Restoring time tracker from existing data")
-            timetracker = OnlineTimeTracker.from_json(trackingData)
-        else:
-            print("[INFO ] [Persistence] Creating new time tracker")
-            timetracker = OnlineTimeTracker.create_new()
+    def load_time_tracker_snapshot(self, configFolder) -> OnlineTimeTracker:
+        """Loads the binary snapshot of the time tracker. The backup is used if the snapshot is missing or broken.
+        If snapshots exist, but none of them can be read, starting is refused: falling back to older data would
+        overwrite the snapshots with them."""
+        filePaths = [
+            filePath for filePath in [self.get_snapshot_file(configFolder), self.get_snapshot_backup_file(configFolder)]
+            if os.path.exists(filePath)]
+        for filePath in filePaths:
+            try:
+                with open(filePath, "rb") as file:
+                    print(f"[INFO ] [Persistence] Loading time tracker snapshot from {filePath}")
+                    return from_binary(file)
+            except Exception:
+                print(f"[WARN ] [Persistence] Failed loading time tracker snapshot: {traceback.format_exc()}")
+        if filePaths:
+            print(f"[ERROR] [Persistence] None of the time tracker snapshots could be read: {', '.join(filePaths)}")
+            raise RuntimeError(
+                "The time tracker snapshots could not be read. They are left untouched, so they can be repaired or " +
+                "removed manually")
+        return None
 
+    async def restore_file_time_tracker(self, configFolder) -> OnlineTimeTracker:
+        """Restores the time tracker from its snapshot and replays the sessions which were journaled since.
+        Data which were stored as JSON before snapshots existed are converted on the next compaction."""
+        timetracker = self.load_time_tracker_snapshot(configFolder)
+        if timetracker is None:
+            trackingData = await self.get_tracking_data()
+            if trackingData:
+                print("[INFO ] [Persistence] Restoring time tracker from existing data")
+                timetracker = OnlineTimeTracker.from_json(trackingData, numDays=NUM_DAYS)
+            else:
+                print("[INFO ] [Persistence] Creating new time tracker")
+                timetracker = OnlineTimeTracker.create_new()
+
+        self.journal = SessionJournal(self.get_journal_file(configFolder))
+        try:
+            numReplayed = self.journal.replay(timetracker)
+            print(f"[INFO ] [Persistence] Replayed {numReplayed} sessions from the journal")
+        except Exception:
+            print(f"[WARN ] [Persistence] Failed replaying the session journal: {traceback.format_exc()}")
+        return timetracker
+
+    async def restore_sqlite_time_tracker(self, configFolder) -> SqliteTimeTracker:
+        """Opens the stats database. Existing data are imported if the database is empty.
+        The files are left untouched, so switching back is possible, but they are no longer updated."""
+        databaseFilePath = self.get_database_file(configFolder)
+        print(f"[INFO ] [Persistence] Using stats database {databaseFilePath}")
+        timetracker = SqliteTimeTracker(databaseFilePath)
+        if timetracker.is_empty() and (
+                os.path.exists(self.get_snapshot_file(configFolder)) or
+                os.path.exists(self.get_timetracker_file(configFolder)) or
+                os.path.exists(self.get_journal_file(configFolder))):
+            fileTimeTracker = await self.restore_file_time_tracker(configFolder)
+            print("[INFO ] [Persistence] Migrating time tracker data to the stats database")
+            await asyncio.to_thread(timetracker.import_tracker, fileTimeTracker)
+            self.journal.close()
+        self.journal = None
+        return timetracker
+
+    async def restore_data(self):
         configFolder = self.get_config_folder()
+        if not os.path.exists(configFolder):
+            os.mkdir(configFolder)
+        # Unreadable fingerprints stop the start, since imports could be counted twice otherwise
+        self.commandHandler.importedSnapshots = self.load_imported_snapshots()
+        if os.getenv("FSSB_STATS_BACKEND", "file") == "sqlite":
+            timetracker = await self.restore_sqlite_time_tracker(configFolder)
+        else:
+            timetracker = await self.restore_file_time_tracker(configFolder)
+
         filePath=self.get_config_file(configFolder)
         if os.path.exists(filePath):
             with open(filePath, "r") as file:
-                await self.restore_from_json(file.read(), discordClient, timetracker)
+                await self.restore_from_json(file.read(), timetracker)
+            self.restore_status_snapshot()
 
     def store_as_json(self):
         botConfiguration = BotConfiguration()
@@ -123,52 +314,132 @@ class PersistenceDataMapper:
             infoConfig = self.commandHandler.infoPanelHandler.get_config(
                 serverId)
             if infoConfig is not None:
-                serverConfig.infoChannelId = infoConfig.channel.id
-                serverConfig.infoEmbedId = infoConfig.embed.id
+                serverConfig.infoChannelId = infoConfig.channelId
+                serverConfig.infoEmbedId = infoConfig.embedId
 
             # Get potential player channel config
             playerConfig = self.commandHandler.playerStatusHandler.get_config(
                 serverId)
             if playerConfig is not None:
-                serverConfig.playerChannelId = playerConfig.channel.id
+                serverConfig.playerChannelId = playerConfig.channelId
 
             # Get potential server channel config
             serverStatusConfig = self.commandHandler.serverStatusHandler.get_config(
                 serverId)
             if serverStatusConfig is not None:
-                serverConfig.serverChannelId = serverStatusConfig.channel.id
+                serverConfig.serverChannelId = serverStatusConfig.channelId
 
             # Get potential summary channel config
             summaryConfig = self.commandHandler.summaryHandler.get_config(
                 serverId)
             if summaryConfig is not None:
-                serverConfig.summaryChannelId = summaryConfig.channel.id
+                serverConfig.summaryChannelId = summaryConfig.channelId
                 serverConfig.summaryShortName = summaryConfig.shortName
 
-            for embedMessage in self.commandHandler.statsReporter.embeds:
-                botConfiguration.statsEmbedsAndChannels[embedMessage.id] = embedMessage.channel.id
-
             botConfiguration.add_server_config(serverId, serverConfig)
 
+        for embedConfig in self.commandHandler.statsReporter.embeds:
+            botConfiguration.statsEmbedsAndChannels[embedConfig.embedId] = embedConfig.channelId
+            botConfiguration.statsEmbedWindows[embedConfig.embedId] = embedConfig.window
+            botConfiguration.statsEmbedPageSizes[embedConfig.embedId] = embedConfig.pageSize
+
         return to_json(botConfiguration)
 
-    def store_time_tracking_data(self, timeTrackingData):
+    def store_session_checkpoint(self, *args):
+        """Requests storing the sessions which are in progress. Since the checkpoint is small and the writer coalesces
+        requests, this is cheap enough to be done whenever online times were credited."""
+        if self.commandHandler.playerTracker is None:
+            return
         configFolder = self.get_config_folder()
-        timeTrackerFilePath = self.get_timetracker_file(configFolder)
-        backupFilePath = self.get_backup_file(configFolder)
-        if self.commandHandler.playerTracker is not None:
-            try:
-                if os.path.exists(backupFilePath):
-                    os.remove(backupFilePath)
-                if os.path.exists(timeTrackerFilePath):
-                    os.rename(timeTrackerFilePath, backupFilePath)
-                #print("[INFO ] [Persistence] Writing time tracking data")
-                with open(self.get_timetracker_file(self.get_config_folder()), "w") as file:
-                    file.write(timeTrackingData)
-            except Exception:
-                print(f"[WARN ] [Persistence] Failed writing time tracking data: {traceback.format_exc()}")
-        
-    async def restore_from_json(self, jsonString, discordClient, timetracker):
+        self.writer.request_write(
+            self.get_session_checkpoint_file(configFolder),
+            lambda: json.dumps(self.commandHandler.playerTracker.get_checkpoint(), separators=(",", ":")))
+
+    def restore_session_checkpoint(self, playerTracker: PlayerTracker):
+        filePath = self.get_session_checkpoint_file(self.get_config_folder())
+        if not os.path.exists(filePath):
+            return
+        try:
+            with open(filePath, "r") as file:
+                playerTracker.restore_checkpoint(json.loads(file.read()))
+            print(f"[INFO ] [Persistence] Resumed {len(playerTracker.sessions)} sessions")
+        except Exception:
+            print(f"[WARN ] [Persistence] Failed restoring session checkpoint: {traceback.format_exc()}")
+
+    def store_time_series(self):
+        """Requests storing the player count archives, heatmaps and availability logs.
+        They are serialized once the writer gets to it."""
+        configFolder = self.get_config_folder()
+        if self.commandHandler.timeSeries is not None:
+            self.writer.request_write(self.get_time_series_file(configFolder), self.commandHandler.timeSeries.to_binary)
+        if self.commandHandler.heatmaps is not None:
+            self.writer.request_write(
+                self.get_heatmap_file(configFolder),
+                lambda: json.dumps(self.commandHandler.heatmaps.to_dict(), separators=(",", ":")))
+        if self.commandHandler.availability is not None:
+            self.writer.request_write(
+                self.get_availability_file(configFolder),
+                lambda: json.dumps(self.commandHandler.availability.to_dict(), separators=(",", ":")))
+
+    def restore_time_series(self) -> TimeSeriesStore:
+        filePath = self.get_time_series_file(self.get_config_folder())
+        try:
+            if os.path.exists(filePath):
+                with open(filePath, "rb") as file:
+                    timeSeries = TimeSeriesStore.from_binary(file.read())
+                print(f"[INFO ] [Persistence] Restored the player count history of {len(timeSeries.servers)} servers")
+                return timeSeries
+        except Exception:
+            print(f"[WARN ] [Persistence] Failed restoring player count history: {traceback.format_exc()}")
+        return TimeSeriesStore()
+
+    def restore_heatmaps(self) -> HeatmapTracker:
+        filePath = self.get_heatmap_file(self.get_config_folder())
+        try:
+            if os.path.exists(filePath):
+                with open(filePath, "r") as file:
+                    return HeatmapTracker.from_dict(json.loads(file.read()))
+        except Exception:
+            print(f"[WARN ] [Persistence] Failed restoring heatmaps: {traceback.format_exc()}")
+        return HeatmapTracker()
+
+    def restore_availability(self) -> AvailabilityTracker:
+        filePath = self.get_availability_file(self.get_config_folder())
+        try:
+            if os.path.exists(filePath):
+                with open(filePath, "r") as file:
+                    return AvailabilityTracker.from_dict(json.loads(file.read()))
+        except Exception:
+            print(f"[WARN ] [Persistence] Failed restoring availability logs: {traceback.format_exc()}")
+        return AvailabilityTracker()
+
+    def rotate_journal(self, force: bool = False) -> bytes:
+        """Takes a snapshot of the time tracker and starts a new journal. Returns None if there is nothing to compact.
+        Forcing a snapshot is required whenever the time tracker was changed without journaling, e.g. by an import."""
+        if self.journal is None or self.commandHandler.playerTracker is None or \
+                not (force or self.journal.has_records()):
+            return None
+        timeTrackingData = to_binary(self.commandHandler.playerTracker.timeTracker)
+        self.journal.rotate()
+        return timeTrackingData
+
+    def compact_journal(self, force: bool = False):
+        """Folds the journal into the time tracker snapshot.
+        The rotated journals are only removed once the snapshot of the time tracker was written. A later snapshot may
+        still be pending at that point, so the journals which were rotated for it are kept."""
+        timeTrackingData = self.rotate_journal(force)
+        if timeTrackingData is not None:
+            journal, generation = self.journal, self.journal.generation
+            self.store_time_tracking_data(timeTrackingData, onWritten=lambda: journal.remove_rotated_files(generation))
+
+    def store_time_tracking_data(self, timeTrackingData: bytes, onWritten=None):
+        """Requests storing a binary snapshot of the time tracker. The previous snapshot is kept as a backup."""
+        configFolder = self.get_config_folder()
+        self.writer.request_write(
+            self.get_snapshot_file(configFolder), lambda: timeTrackingData,
+            backupFilePath=self.get_snapshot_backup_file(configFolder), onWritten=onWritten)
+
+    async def restore_from_json(self, jsonString, timetracker):
         print("[INFO ] [Persistence] Restoring config from JSON")
         data = json.loads(jsonString)
 
@@ -191,10 +462,15 @@ class PersistenceDataMapper:
 
         # Register the configs
         if timetracker is not None:
-            playerTracker = PlayerTracker(timetracker)
+            playerTracker = PlayerTracker(timetracker, self.commandHandler.eventBus, self.journal)
+            self.restore_session_checkpoint(playerTracker)
             self.commandHandler.set_player_tracker(playerTracker)
-            playerTracker.events.stats_updated += self.store_time_tracking_data
+            persistenceSubscriber = self.commandHandler.eventBus.create_subscriber("PersistenceDataMapper", lossless=True)
+            persistenceSubscriber.subscribe(PlayerTrackerEvents.stats_updated, self.store_session_checkpoint)
             self.commandHandler.statsReporter.set_time_tracker(timetracker)
+        self.commandHandler.set_time_series(self.restore_time_series())
+        self.commandHandler.set_heatmaps(self.restore_heatmaps())
+        self.commandHandler.set_availability(self.restore_availability())
         self.commandHandler.restore_servers(serverConfigs)
 
         # Now restore the settings for the individual handlers
@@ -202,75 +478,73 @@ class PersistenceDataMapper:
             serverId = int(serverIdStr)
             fs22serverConfig = serverConfigs[serverId]
 
-            await self.restore_info_panel_handler(serverConfigDict, fs22serverConfig, discordClient)
-            await self.restore_player_status_handler(serverConfigDict, fs22serverConfig, discordClient)
-            await self.restore_server_status_handler(serverConfigDict, fs22serverConfig, discordClient)
-            await self.restore_summary_handler(serverConfigDict, fs22serverConfig, discordClient)
+            self.restore_info_panel_handler(serverConfigDict, fs22serverConfig)
+            self.restore_player_status_handler(serverConfigDict, fs22serverConfig)
+            self.restore_server_status_handler(serverConfigDict, fs22serverConfig)
+            self.restore_summary_handler(serverConfigDict, fs22serverConfig)
             # TODO
             botChannelId = serverConfigDict["botChannelId"]
 
         # Restore stats reporter
-        await self.restore_stats_embed(data.get("statsEmbedsAndChannels", {}), discordClient)
+        self.restore_stats_embed(
+            data.get("statsEmbedsAndChannels", {}), data.get("statsEmbedWindows", {}), data.get("statsEmbedPageSizes", {}))
 
-    async def restore_info_panel_handler(self, serverConfigDict, serverConfig, discordClient):
-        """Restores the configuration for the InfoPanelHandler from the persistent storage."""
+    def restore_info_panel_handler(self, serverConfigDict, serverConfig):
+        """Restores the configuration for the InfoPanelHandler from the persistent storage.
+        The channel and the embed are resolved by the handler on first use, so no discord request is made here."""
 
         infoChannelId = serverConfigDict["infoChannelId"]
         infoEmbedId = serverConfigDict["infoEmbedId"]
 
         if infoChannelId and infoEmbedId:
             try:
-                infoChannel = await discordClient.fetch_channel(infoChannelId)
-                infoEmbed = await infoChannel.fetch_message(infoEmbedId)
                 self.commandHandler.infoPanelHandler.add_config(serverConfig.id, InfoPanelConfig(
                     ip=serverConfig.ip,
                     port=serverConfig.port,
                     icon=serverConfig.icon,
                     title=serverConfig.title,
                     color=serverConfig.color,
-                    channel=infoChannel,
-                    embed=infoEmbed))
+                    channelId=int(infoChannelId),
+                    embedId=int(infoEmbedId)))
                 print(
                     f"[INFO ] [PersistenceDataMapper] Successfully restored info panel handler for server {serverConfig.id}")
             except Exception:
                 print(
                     f"[WARN ] [PersistenceDataMapper] Failed restoring info channel: {traceback.format_exc()}")
 
-    async def restore_player_status_handler(self, serverConfigDict, serverConfig, discordClient):
+    def restore_player_status_handler(self, serverConfigDict, serverConfig):
         """Restores the configuration for the PlayerStatusHandler from the persistent storage."""
 
         if playerChannelId := serverConfigDict["playerChannelId"]:
             try:
-                playerChannel = await discordClient.fetch_channel(playerChannelId)
                 self.commandHandler.playerStatusHandler.add_config(serverConfig.id, PlayerStatusConfig(
                     icon=serverConfig.icon,
                     title=serverConfig.title,
                     color=serverConfig.color,
-                    channel=playerChannel))
+                    channelId=int(playerChannelId)))
                 print(
                     f"[INFO ] [PersistenceDataMapper] Successfully restored player status handler for server {serverConfig.id}")
             except Exception:
                 print(
                     f"[WARN ] [PersistenceDataMapper] Failed restoring player status handler: {traceback.format_exc()}")
 
-    async def restore_server_status_handler(self, serverConfigDict, serverConfig, discordClient):
+    def restore_server_status_handler(self, serverConfigDict, serverConfig):
         """Restores the configuration for the ServerStatusHandler from the persistent storage."""
 
         if serverChannelId := serverConfigDict["serverChannelId"]:
             try:
-                serverChannel = await discordClient.fetch_channel(serverChannelId)
                 self.commandHandler.serverStatusHandler.add_config(serverConfig.id, ServerStatusConfig(
                     icon=serverConfig.icon,
                     title=serverConfig.title,
                     color=serverConfig.color,
-                    channel=serverChannel))
+                    channelId=int(serverChannelId)))
                 print(
                     f"[INFO ] [PersistenceDataMapper] Successfully restored server status handler for server {serverConfig.id}")
             except Exception:
                 print(
                     f"[WARN ] [PersistenceDataMapper] Failed restoring server status handler: {traceback.format_exc()}")
 
-    async def restore_summary_handler(self, serverConfigDict, serverConfig, discordClient):
+    def restore_summary_handler(self, serverConfigDict, serverConfig):
         """Restores the configuration for the SummaryHandler from the persistent storage."""
 
         summaryShortName = serverConfigDict["summaryShortName"]
@@ -278,25 +552,26 @@ class PersistenceDataMapper:
 
         if summaryShortName and summaryChannelId:
             try:
-                summaryChannel = await discordClient.fetch_channel(summaryChannelId)
                 self.commandHandler.summaryHandler.add_config(serverConfig.id, SummaryConfig(
                     shortName=summaryShortName,
-                    channel=summaryChannel))
+                    channelId=int(summaryChannelId)))
                 print(
                     f"[INFO ] [PersistenceDataMapper] Successfully restored summary handler for server {serverConfig.id}")
             except Exception:
                 print(
                     f"[WARN ] [PersistenceDataMapper] Failed restoring summary handler: {traceback.format_exc()}")
 
-    async def restore_stats_embed(self, embedData: dict[str, int], discordClient: discord.Client):
-        """Restores a single embed for player stats form the persistent storage."""
+    def restore_stats_embed(self, embedData: dict[str, int], windowData: dict[str, str], pageSizeData: dict[str, int]):
+        """Restores the embeds for player stats from the persistent storage.
+        Embeds which were stored before windows or page sizes could be selected display the defaults."""
 
         embeds = []
         for embedIdStr, channelId in embedData.items():
             try:
-                statsChannel = await discordClient.fetch_channel(channelId)
-                embedMessage = await statsChannel.fetch_message(int(embedIdStr))
-                embeds.append(embedMessage)
+                embedConfig = StatsEmbedConfig(int(channelId), int(embedIdStr))
+                embedConfig.window = windowData.get(embedIdStr, embedConfig.window)
+                embedConfig.pageSize = int(pageSizeData.get(embedIdStr, embedConfig.pageSize))
+                embeds.append(embedConfig)
                 print("[INFO] [PersistenceDataMapper] Successfully restored stats embed")
             except Exception:
                 print(f"[WARN ] [PersistenceDataMapper] Failed restoring stats embed: {traceback.format_exc()}")
@@ -0,0 +1,139 @@
+import asyncio
+import os
+import time
+import traceback
+
+
+def write_atomically(filePath: str, data: str | bytes, backupFilePath: str = None):
+    """Writes the data to a temporary file first and replaces the target file only once the data are on disk.
+    If a backup file is requested, the previous file becomes the backup. Either the file or its backup is complete at any
+    point in time, so a crash while writing never loses both."""
+    tempFilePath = filePath + ".tmp"
+    with open(tempFilePath, "wb" if isinstance(data, bytes) else "w") as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    if backupFilePath is not None and os.path.exists(filePath):
+        os.replace(filePath, backupFilePath)
+    os.replace(tempFilePath, filePath)
+
+
+class WriterMetrics:
+    """This class stores statistics about the files written by the persistence writer"""
+
+    def __init__(self):
+        self.requests = 0  # Requests for writing a file
+        self.writes = 0  # Files which were actually written. Requests for the same file within an interval are coalesced.
+        self.failed = 0
+        self.flushes = 0  # Batches of files which were written
+        self.lastFlushLatency = 0.0  # Seconds between the first request of a batch and the batch being written
+        self.maxFlushLatency = 0.0
+        self.totalFlushLatency = 0.0
+
+    def average_flush_latency(self) -> float:
+        return self.totalFlushLatency / self.flushes if self.flushes > 0 else 0.0
+
+
+class PendingWrite:
+    """A request for writing a single file. The data are only retrieved when the file is actually written."""
+
+    def __init__(self, getData, backupFilePath: str, onWritten):
+        self.getData = getData
+        self.backupFilePath = backupFilePath
+        self.onWritten = onWritten
+
+
+class PersistenceWriter:
+    """Writes files in a worker thread, so the event loop is never blocked by file I/O.
+    All requests within an interval are written in a single batch. Several requests for the same file result in a single
+    write of the most recent data."""
+
+    def __init__(self, interval: float = 2.0):
+        self.interval = interval
+        self.pendingWrites: dict[str, PendingWrite] = {}
+        self.firstRequestTime: float = None
+        self.wakeUpEvent = asyncio.Event()
+        self.writeLock = asyncio.Lock()
+        self.metrics = WriterMetrics()
+        self.task: asyncio.Task = None
+
+    def request_write(self, filePath: str, getData, backupFilePath: str = None, onWritten=None):
+        """Requests writing the data returned by getData to the given file.
+        onWritten will be called on the event loop after the file was written successfully."""
+        self.metrics.requests += 1
+        if self.firstRequestTime is None:
+            self.firstRequestTime = time.monotonic()
+        self.pendingWrites[filePath] = PendingWrite(getData, backupFilePath, onWritten)
+        self.wakeUpEvent.set()
+
+    ### Threading ###
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self.write_periodically())
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+
+    async def wait_for_completion(self):
+        if self.task is not None:
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def write_periodically(self):
+        try:
+            while True:
+                await self.wakeUpEvent.wait()
+                # Give further requests the chance to be part of the same batch
+                await asyncio.sleep(self.interval)
+                await self.flush()
+        except asyncio.CancelledError:
+            print("[INFO ] [PersistenceWriter] PersistenceWriter was aborted", flush=True)
+            raise
+
+    async def flush(self):
+        """Writes all pending files immediately"""
+        async with self.writeLock:
+            self.wakeUpEvent.clear()
+            if not self.pendingWrites:
+                return
+            pendingWrites = self.pendingWrites
+            firstRequestTime = self.firstRequestTime
+            self.pendingWrites = {}
+            self.firstRequestTime = None
+
+            # The data are retrieved on the event loop since they are usually owned by it
+            batch = []
+            for filePath, pendingWrite in pendingWrites.items():
+                try:
+                    batch.append((filePath, pendingWrite.getData(), pendingWrite))
+                except Exception:
+                    self.metrics.failed += 1
+                    print(f"[WARN ] [PersistenceWriter] Failed retrieving data for {filePath}: {traceback.format_exc()}")
+            writtenRequests = await asyncio.to_thread(self.write_batch, batch)
+            for pendingWrite in writtenRequests:
+                if pendingWrite.onWritten is not None:
+                    try:
+                        pendingWrite.onWritten()
+                    except Exception:
+                        print(f"[WARN ] [PersistenceWriter] Failed handling a written file: {traceback.format_exc()}")
+
+            latency = time.monotonic() - firstRequestTime
+            self.metrics.flushes += 1
+            self.metrics.lastFlushLatency = latency
+            self.metrics.totalFlushLatency += latency
+            self.metrics.maxFlushLatency = max(self.metrics.maxFlushLatency, latency)
+
+    def write_batch(self, batch: list[tuple[str, str, PendingWrite]]) -> list[PendingWrite]:
+        """Writes the files in the worker thread and returns the requests which were written successfully"""
+        writtenRequests = []
+        for filePath, data, pendingWrite in batch:
+            try:
+                write_atomically(filePath, data, pendingWrite.backupFilePath)
+                self.metrics.writes += 1
+                writtenRequests.append(pendingWrite)
+            except Exception:
+                self.metrics.failed += 1
+                print(f"[WARN ] [PersistenceWriter] Failed writing {filePath}: {traceback.format_exc()}")
+        return writtenRequests
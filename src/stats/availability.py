@@ -0,0 +1,174 @@
+from fs22.fs22server import OnlineState
+from fs22.servertracker import ServerStatusChanges
+from bisect import bisect_right
+import time
+
+DAY = 24 * 60 * 60
+RETENTION = 31 * DAY  # Transitions are kept a bit longer than the longest window
+UPTIME_WINDOWS = [("24h", DAY), ("7d", 7 * DAY), ("30d", 30 * DAY)]
+STATES = [OnlineState.Unknown, OnlineState.Offline, OnlineState.Online]
+
+
+class AvailabilityStats:
+    """The availability of a server within a window"""
+
+    def __init__(self, uptime: float, outages: int, meanTimeToRecovery: float):
+        self.uptime = uptime  # Share of the time the state was known in which the server was online, None if never known
+        self.outages = outages  # Outages which started within the window
+        self.meanTimeToRecovery = meanTimeToRecovery  # Seconds, None if no outage ended within the window
+
+
+class AvailabilityLog:
+    """Stores the transitions between the online states of a single server.
+    For each transition, the time online, the time the state was known, the number of outages and the recovery time of
+    all outages before it are stored as well. Any statistic of a window is therefore the difference between two
+    cumulative values, each of which is found by a binary search."""
+
+    def __init__(self):
+        self.times: list[float] = []
+        self.states: list[OnlineState] = []
+        self.onlineTimes: list[float] = []
+        self.knownTimes: list[float] = []
+        self.outageCounts: list[int] = []
+        self.recoveries: list[int] = []
+        self.recoveryTimes: list[float] = []
+        self.outageStart: float = None
+        self.lastSeen: float = None
+
+    def record(self, timestamp: float, state: OnlineState):
+        self.lastSeen = timestamp
+        if self.states and self.states[-1] == state:
+            return
+        onlineTime, knownTime, outageCount, recoveries, recoveryTime = self.get_totals(len(self.times) - 1, timestamp)
+        if state == OnlineState.Offline and self.outageStart is None:
+            self.outageStart = timestamp
+            outageCount += 1
+        elif state == OnlineState.Online and self.outageStart is not None:
+            recoveries += 1
+            recoveryTime += timestamp - self.outageStart
+            self.outageStart = None
+        self.times.append(timestamp)
+        self.states.append(state)
+        self.onlineTimes.append(onlineTime)
+        self.knownTimes.append(knownTime)
+        self.outageCounts.append(outageCount)
+        self.recoveries.append(recoveries)
+        self.recoveryTimes.append(recoveryTime)
+
+    def get_totals(self, index: int, timestamp: float) -> tuple[float, float, int, int, float]:
+        """Calculates the cumulative values at the given time, which must be at or after the transition at the index"""
+        if index < 0:
+            return 0.0, 0.0, 0, 0, 0.0
+        duration = timestamp - self.times[index]
+        state = self.states[index]
+        return (
+            self.onlineTimes[index] + (duration if state == OnlineState.Online else 0.0),
+            self.knownTimes[index] + (duration if state != OnlineState.Unknown else 0.0),
+            self.outageCounts[index], self.recoveries[index], self.recoveryTimes[index])
+
+    def get_totals_at(self, timestamp: float) -> tuple[float, float, int, int, float]:
+        # The current state lasts until the server was last seen
+        if self.lastSeen is not None:
+            timestamp = min(timestamp, self.lastSeen)
+        return self.get_totals(bisect_right(self.times, timestamp) - 1, timestamp)
+
+    def get_stats(self, start: float, end: float) -> AvailabilityStats:
+        startOnline, startKnown, startOutages, startRecoveries, startRecoveryTime = self.get_totals_at(start)
+        endOnline, endKnown, endOutages, endRecoveries, endRecoveryTime = self.get_totals_at(end)
+        knownTime = endKnown - startKnown
+        recoveries = endRecoveries - startRecoveries
+        return AvailabilityStats(
+            (endOnline - startOnline) / knownTime if knownTime > 0 else None,
+            endOutages - startOutages,
+            (endRecoveryTime - startRecoveryTime) / recoveries if recoveries > 0 else None)
+
+    def prune(self, before: float):
+        """Drops the transitions which are not needed for windows starting at the given time.
+        Only differences of the cumulative values are used, so the remaining ones stay valid."""
+        index = bisect_right(self.times, before) - 1
+        if index > 0:
+            for values in [self.times, self.states, self.onlineTimes, self.knownTimes, self.outageCounts,
+                           self.recoveries, self.recoveryTimes]:
+                del values[:index]
+
+    def to_dict(self) -> dict:
+        return {
+            "times": self.times,
+            "states": [STATES.index(state) for state in self.states],
+            "lastSeen": self.lastSeen
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Replays the stored transitions. The time between the last poll and now is unknown, since the bot was offline."""
+        result = cls()
+        for timestamp, state in zip(data["times"], data["states"]):
+            result.record(timestamp, STATES[state])
+        if data["lastSeen"] is not None:
+            result.record(data["lastSeen"], OnlineState.Unknown)
+        return result
+
+
+class AvailabilityTracker:
+    """Records the online state of every server on every poll"""
+
+    def __init__(self):
+        self.servers: dict[int, AvailabilityLog] = {}
+        self.nextPrune = 0.0
+
+    def on_changes(self, changes: ServerStatusChanges):
+        self.record(changes.serverId, time.time(), changes.serverData.status)
+
+    def record(self, serverId: int, timestamp: float, state: OnlineState):
+        if serverId not in self.servers:
+            self.servers[serverId] = AvailabilityLog()
+        self.servers[serverId].record(timestamp, state)
+        if timestamp >= self.nextPrune:
+            self.nextPrune = timestamp + DAY
+            for availabilityLog in self.servers.values():
+                availabilityLog.prune(timestamp - RETENTION)
+
+    def get_stats(self, serverId: int, duration: float, end: float = None) -> AvailabilityStats:
+        if serverId not in self.servers:
+            return None
+        end = end or time.time()
+        return self.servers[serverId].get_stats(end - duration, end)
+
+    def remove_server(self, serverId: int):
+        self.servers.pop(serverId, None)
+
+    def to_dict(self) -> dict:
+        return {serverId: availabilityLog.to_dict() for serverId, availabilityLog in self.servers.items()}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        result = cls()
+        result.servers = {int(serverId): AvailabilityLog.from_dict(logData) for serverId, logData in data.items()}
+        return result
+
+
+def format_duration(seconds: float) -> str:
+    if seconds < 60 * 60:
+        return f"{seconds / 60:.0f} min"
+    if seconds < DAY:
+        return f"{seconds / (60 * 60):.1f} h"
+    return f"{seconds / DAY:.1f} d"
+
+
+def render_availability(availabilityTracker: AvailabilityTracker, serverId: int, now: float = None) -> str:
+    """Describes the uptime of a server in the usual windows, as well as the outages within the longest window"""
+    now = now or time.time()
+    uptimes = []
+    for name, duration in UPTIME_WINDOWS:
+        stats = availabilityTracker.get_stats(serverId, duration, now)
+        if stats is not None and stats.uptime is not None:
+            uptimes.append(f"{name}: {stats.uptime * 100:.2f}%")
+        else:
+            uptimes.append(f"{name}: -")
+    outages = 0
+    meanTimeToRecovery = "-"
+    if stats is not None:
+        outages = stats.outages
+        if stats.meanTimeToRecovery is not None:
+            meanTimeToRecovery = format_duration(stats.meanTimeToRecovery)
+    return f"Uptime {' | '.join(uptimes)}\nOutages ({UPTIME_WINDOWS[-1][0]}): {outages} | MTTR: {meanTimeToRecovery}"
@@ -0,0 +1,285 @@
+"""Benchmarks the storage of online times on synthetic data sets of different sizes.
+
+Every storage engine is filled with the same sessions and has to answer the same queries, so engines can be compared
+to each other and to earlier runs:
+    OnlineTimeTracker  the current implementation (bucket rings with running totals)
+    DailyStats         the previous implementation (one DailyStats object per day, summed up per query)
+
+Adding an online time is several times slower in the OnlineTimeTracker (small: about 5.5 µs rather than 0.85 µs per
+session, medium: about 7 µs rather than 1.1 µs). That is the price for the totals: every session updates the server
+and the combined columns of all four rings and the running totals of every window containing its bucket, whereas
+DailyStats only updated two dictionaries of a single day. In return, get_total_stats is 4 to 10 times faster, and
+sessions are added once per credit interval while queries are answered on every stats request.
+
+For every operation, the fastest of several runs and the peak of the memory allocated by a separate run (traced with
+tracemalloc, which slows the code down, so time and memory are never measured together) are reported.
+
+Run from the src directory:
+    python -m stats.bench_statstracker [--scenario <name>]... [--all] [--output results.json] [--compare baseline.json]
+"""
+from stats.statstracker import DailyStats, OnlineTimeTracker, StatsWindow, HelperFuncs
+from stats.snapshotformat import to_binary, from_binary
+import argparse
+import datetime
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+SESSIONS_PER_PLAYER = 5
+END_DATE = datetime.date(2024, 6, 30)  # The most recent day of every data set, so results do not depend on today
+
+
+class Scenario:
+    """Describes a synthetic data set"""
+
+    def __init__(self, name: str, numPlayers: int, numDays: int, numServers: int):
+        self.name = name
+        self.numPlayers = numPlayers
+        self.numDays = numDays
+        self.numServers = numServers
+
+    def create_sessions(self) -> list[tuple[int, int, str, int]]:
+        """Creates the day, server ID, player name and online time of every session. The same data are created on
+        every run."""
+        random.seed(42)
+        return [
+            (random.randrange(self.numDays), random.randrange(self.numServers), f"Player {playerNumber}",
+             random.randint(1, 120))
+            for playerNumber in range(self.numPlayers) for _ in range(SESSIONS_PER_PLAYER)]
+
+
+SCENARIOS = [
+    Scenario("small", 100, 14, 1),
+    Scenario("medium", 10_000, 30, 5),
+    Scenario("long", 10_000, 365, 20),
+    Scenario("wide", 10_000, 30, 200),
+    Scenario("large", 100_000, 90, 50),
+    Scenario("huge", 100_000, 365, 200),
+]
+DEFAULT_SCENARIOS = ["small", "medium", "long", "wide"]  # The others take several minutes
+
+
+def legacy_get_total_stats(stats: dict[int, DailyStats], serverIds: list[int]) -> dict[str, int]:
+    """The query as it was implemented before the totals were maintained incrementally"""
+    totalStats: dict[str, int] = {}
+    for dailyStats in stats.values():
+        for serverId in serverIds:
+            for playerName, onlineTime in dailyStats.get_server_stats(serverId).items():
+                totalStats[playerName] = totalStats.get(playerName, 0) + onlineTime
+    return totalStats
+
+
+def legacy_shift_entries(stats: dict[int, DailyStats], daysSinceLastUdpate: int):
+    """Shifting as it was implemented before the days were stored in a ring"""
+    numEntries = len(stats)
+    for _ in range(daysSinceLastUdpate):
+        for i in range(numEntries - 1, 0, -1):
+            stats[i] = stats[i - 1]
+        stats[0] = DailyStats()
+
+
+class TrackerEngine:
+    """Stores online times in the OnlineTimeTracker"""
+    name = "OnlineTimeTracker"
+
+    def __init__(self, numDays: int):
+        self.numDays = numDays
+        self.window = StatsWindow("bench", "All tracked days", "days", numDays)
+        self.dates = [END_DATE - datetime.timedelta(days=day) for day in range(numDays)]
+        self.tracker: OnlineTimeTracker = None
+
+    def add_sessions(self, sessions: list[tuple[int, int, str, int]]):
+        self.tracker = OnlineTimeTracker.create_new(self.numDays)
+        self.tracker.lastUpdate = END_DATE
+        for day, serverId, playerName, onlineTime in sessions:
+            self.tracker.add_online_time(serverId, playerName, onlineTime, self.dates[day])
+
+    def get_total_stats(self, serverIds: list[int]) -> dict[str, int]:
+        return self.tracker.get_total_stats(serverIds, self.window)
+
+    def shift_entries(self):
+        self.tracker.shift_entries(1)
+
+    def get_serializers(self) -> list:
+        return [
+            ("json", lambda: self.tracker.to_json(), lambda data: OnlineTimeTracker.from_json(data)),
+            ("binary", lambda: to_binary(self.tracker), from_binary)
+        ]
+
+
+class DailyStatsEngine:
+    """Stores online times in one DailyStats object per day, as before the OnlineTimeTracker used bucket rings"""
+    name = "DailyStats"
+
+    def __init__(self, numDays: int):
+        self.numDays = numDays
+        self.stats: dict[int, DailyStats] = None
+
+    def add_sessions(self, sessions: list[tuple[int, int, str, int]]):
+        self.stats = {day: DailyStats() for day in range(self.numDays)}
+        for day, serverId, playerName, onlineTime in sessions:
+            self.stats[day].add_online_time(serverId, playerName, onlineTime)
+
+    def get_total_stats(self, serverIds: list[int]) -> dict[str, int]:
+        return legacy_get_total_stats(self.stats, serverIds)
+
+    def shift_entries(self):
+        legacy_shift_entries(self.stats, 1)
+
+    def to_json(self) -> str:
+        return HelperFuncs().to_json({"lastUpdate": HelperFuncs().date_to_json(END_DATE), "stats": self.stats})
+
+    @staticmethod
+    def from_json(data: str) -> dict[int, DailyStats]:
+        return {int(day): DailyStats.from_dict(dailyStats) for day, dailyStats in json.loads(data)["stats"].items()}
+
+    def get_serializers(self) -> list:
+        return [("json", self.to_json, self.from_json)]
+
+
+ENGINES = [TrackerEngine, DailyStatsEngine]
+
+
+class BenchmarkResult:
+    """The time and memory an engine needed for an operation within a scenario"""
+
+    def __init__(self, engine: str, scenario: Scenario, operation: str, milliseconds: float, peakKiB: float,
+                 numOperations: int = 1, sizeKiB: float = None):
+        self.engine = engine
+        self.scenario = scenario.name
+        self.numPlayers = scenario.numPlayers
+        self.numDays = scenario.numDays
+        self.numServers = scenario.numServers
+        self.operation = operation
+        self.milliseconds = milliseconds
+        self.peakKiB = peakKiB  # None if memory was not measured
+        self.numOperations = numOperations  # The amount of calls within a single run, e.g. one per session
+        self.sizeKiB = sizeKiB  # The size of serialized data
+
+    def get_key(self) -> tuple[str, str, str]:
+        return self.engine, self.scenario, self.operation
+
+    def format(self, baseline=None) -> str:
+        perOperation = f"{self.milliseconds * 1000 / self.numOperations:10.2f} µs/op" if self.numOperations > 1 else ""
+        peak = f"{self.peakKiB:.0f} KiB peak" if self.peakKiB is not None else ""
+        size = f"{self.sizeKiB:.0f} KiB" if self.sizeKiB is not None else ""
+        line = f"{self.scenario:<7} {self.engine:<18} {self.operation:<26} {self.milliseconds:10.2f} ms " + \
+               f"{perOperation:<16} {peak:>16} {size:>12}"
+        if baseline is not None and baseline.milliseconds > 0:
+            line += f"  {self.milliseconds / baseline.milliseconds:6.2f}x time"
+            if self.peakKiB is not None and baseline.peakKiB:
+                line += f" {self.peakKiB / baseline.peakKiB:6.2f}x memory"
+        return line
+
+
+def measure(func, repetitions: int = 10) -> float:
+    """Returns the fastest of several runs in milliseconds"""
+    fastest = float("inf")
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        func()
+        fastest = min(fastest, time.perf_counter() - start)
+    return fastest * 1000
+
+
+def measure_memory(func) -> float:
+    """Returns the peak of the memory allocated while running the function in KiB"""
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
+
+
+def run_scenario(scenario: Scenario, traceMemory: bool = True) -> list[BenchmarkResult]:
+    sessions = scenario.create_sessions()
+    serverIds = list(range(scenario.numServers))
+    subset = serverIds[:max(1, scenario.numServers // 2)]
+    # Large data sets take seconds per run, so they are measured fewer times
+    repetitions = 5 if len(sessions) <= 100_000 else 1
+    results: list[BenchmarkResult] = []
+    expectedStats = None
+
+    def run(engine, operation: str, func, numRepetitions: int = repetitions, numOperations: int = 1, sizeKiB: float = None):
+        milliseconds = measure(func, numRepetitions)
+        peakKiB = measure_memory(func) if traceMemory else None
+        result = BenchmarkResult(engine.name, scenario, operation, milliseconds, peakKiB, numOperations, sizeKiB)
+        results.append(result)
+        print(result.format(), flush=True)
+
+    for engineClass in ENGINES:
+        engine = engineClass(scenario.numDays)
+        run(engine, "add_online_time", lambda: engine.add_sessions(sessions), 1, len(sessions))
+
+        stats = engine.get_total_stats(serverIds)
+        if expectedStats is None:
+            expectedStats = stats
+        elif stats != expectedStats:
+            raise AssertionError(f"{engine.name} delivers different results than {ENGINES[0].name}")
+        run(engine, "get_total_stats", lambda: engine.get_total_stats(serverIds))
+        run(engine, f"get_total_stats ({len(subset)} srv)", lambda: engine.get_total_stats(subset))
+
+        for formatName, serialize, deserialize in engine.get_serializers():
+            data = serialize()
+            run(engine, f"to_{formatName}", serialize, sizeKiB=len(data) / 1024)
+            run(engine, f"from_{formatName}", lambda: deserialize(data))
+            del data
+
+        # Every run drops a day, so shifting comes last
+        run(engine, "shift_entries(1)", engine.shift_entries, min(repetitions, scenario.numDays // 2))
+        del engine
+    return results
+
+
+def load_baseline(filePath: str) -> dict[tuple[str, str, str], BenchmarkResult]:
+    with open(filePath, "r") as file:
+        data = json.load(file)
+    baseline = {}
+    for resultData in data["results"]:
+        result = BenchmarkResult.__new__(BenchmarkResult)
+        result.__dict__.update(resultData)
+        baseline[result.get_key()] = result
+    return baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the storage of online times")
+    parser.add_argument(
+        "--scenario", action="append", choices=[scenario.name for scenario in SCENARIOS],
+        help=f"The data sets to run (default: {', '.join(DEFAULT_SCENARIOS)})")
+    parser.add_argument("--all", action="store_true", help="Run all data sets, including those with 100k players")
+    parser.add_argument("--no-memory", action="store_true", help="Only measure time, which is a lot faster")
+    parser.add_argument("--output", help="Writes the results to the given JSON file")
+    parser.add_argument("--compare", help="Compares the results to those in the given JSON file")
+    args = parser.parse_args()
+
+    scenarioNames = [scenario.name for scenario in SCENARIOS] if args.all else args.scenario or DEFAULT_SCENARIOS
+    baseline = load_baseline(args.compare) if args.compare else {}
+    results: list[BenchmarkResult] = []
+    for scenario in SCENARIOS:
+        if scenario.name not in scenarioNames:
+            continue
+        print(f"{scenario.name}: {scenario.numPlayers} players, {scenario.numDays} days, {scenario.numServers} servers, " +
+              f"{scenario.numPlayers * SESSIONS_PER_PLAYER} sessions")
+        results += run_scenario(scenario, traceMemory=not args.no_memory)
+
+    if baseline:
+        print(f"\nCompared to {args.compare}:")
+        for result in results:
+            print(result.format(baseline.get(result.get_key())))
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "results": [result.__dict__ for result in results]
+            }, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
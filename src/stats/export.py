@@ -0,0 +1,79 @@
+from stats.statstracker import OnlineTimeTracker
+from stats.sqlitetracker import SqliteTimeTracker
+from stats.snapshotformat import to_binary, from_binary
+from tempfile import SpooledTemporaryFile
+import asyncio
+import csv
+import datetime
+import gzip
+import io
+import json
+
+EXPORT_FORMATS = ["csv", "ndjson"]
+CSV_HEADER = ["date", "server_id", "player", "minutes"]
+SPOOL_SIZE = 1024 * 1024  # Exports up to this size are kept in memory, larger ones are moved to a temporary file
+
+
+class ExportWriter:
+    """Writes online times as gzip compressed CSV or NDJSON. Rows are compressed as they are written."""
+
+    def __init__(self, fileObject, exportFormat: str):
+        if exportFormat not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format {exportFormat}")
+        self.exportFormat = exportFormat
+        self.gzipFile = gzip.GzipFile(fileobj=fileObject, mode="wb")
+        self.textFile = io.TextIOWrapper(self.gzipFile, encoding="utf-8", newline="")
+        self.csvWriter = csv.writer(self.textFile) if exportFormat == "csv" else None
+        self.numRows = 0
+        if self.csvWriter is not None:
+            self.csvWriter.writerow(CSV_HEADER)
+
+    def write(self, date: datetime.date, serverId: int, playerName: str, minutes: int):
+        if self.csvWriter is not None:
+            self.csvWriter.writerow([date.isoformat(), serverId, playerName, minutes])
+        else:
+            self.textFile.write(json.dumps(
+                {"date": date.isoformat(), "server_id": serverId, "player": playerName, "minutes": minutes},
+                ensure_ascii=False) + "\n")
+        self.numRows += 1
+
+    def close(self):
+        """Writes the end of the gzip stream. The underlying file stays open."""
+        self.textFile.close()
+
+
+def write_export(fileObject, rows, exportFormat: str) -> int:
+    exportWriter = ExportWriter(fileObject, exportFormat)
+    for row in rows:
+        exportWriter.write(*row)
+    exportWriter.close()
+    return exportWriter.numRows
+
+
+def export_snapshot(
+        snapshotData: bytes, fileObject, exportFormat: str, serverIds: set[int], startDate: datetime.date = None,
+        endDate: datetime.date = None) -> int:
+    rows = from_binary(snapshotData).iter_daily_online_times(serverIds, startDate, endDate)
+    return write_export(fileObject, rows, exportFormat)
+
+
+async def export_online_times(
+        timeTracker: OnlineTimeTracker | SqliteTimeTracker, exportFormat: str, serverIds: set[int],
+        startDate: datetime.date = None, endDate: datetime.date = None) -> tuple[SpooledTemporaryFile, int]:
+    """Exports the daily online times of the given servers and returns the compressed file and the amount of rows.
+    The export is written in a separate thread. The in-memory time tracker belongs to the event loop and changes with
+    every credit and new day, so a snapshot of it is taken on the loop first and exported instead."""
+    exportFile = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    try:
+        if isinstance(timeTracker, SqliteTimeTracker):
+            rows = timeTracker.iter_daily_online_times(serverIds, startDate, endDate)
+            numRows = await asyncio.to_thread(write_export, exportFile, rows, exportFormat)
+        else:
+            snapshotData = to_binary(timeTracker, compress=False)
+            numRows = await asyncio.to_thread(
+                export_snapshot, snapshotData, exportFile, exportFormat, serverIds, startDate, endDate)
+    except Exception:
+        exportFile.close()
+        raise
+    exportFile.seek(0)
+    return exportFile, numRows
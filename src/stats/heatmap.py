@@ -0,0 +1,121 @@
+from fs22.servertracker import ServerStatusChanges
+from array import array
+import datetime
+import math
+
+HOURS_PER_WEEK = 7 * 24
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+SHADES = " ░▒▓█"
+
+
+def get_hour_of_week(now: datetime.datetime) -> int:
+    return now.weekday() * 24 + now.hour
+
+
+class Heatmap:
+    """Counts the concurrent players for every hour of the week.
+    Every poll adds the current player count to the cell of the current hour, so the average of a cell is the average
+    amount of concurrent players during that hour."""
+
+    def __init__(self):
+        self.sums = array("Q", [0]) * HOURS_PER_WEEK
+        self.samples = array("Q", [0]) * HOURS_PER_WEEK
+        self.peaks = array("I", [0]) * HOURS_PER_WEEK
+
+    def record(self, hourOfWeek: int, playerCount: int):
+        self.sums[hourOfWeek] += playerCount
+        self.samples[hourOfWeek] += 1
+        if playerCount > self.peaks[hourOfWeek]:
+            self.peaks[hourOfWeek] = playerCount
+
+    def get_averages(self) -> list[float]:
+        return [total / samples if samples > 0 else 0.0 for total, samples in zip(self.sums, self.samples)]
+
+    def to_dict(self) -> dict[str, list[int]]:
+        return {"sums": self.sums.tolist(), "samples": self.samples.tolist(), "peaks": self.peaks.tolist()}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, list[int]]):
+        result = cls()
+        result.sums = array("Q", data["sums"])
+        result.samples = array("Q", data["samples"])
+        result.peaks = array("I", data["peaks"])
+        if len(result.sums) != HOURS_PER_WEEK or len(result.samples) != HOURS_PER_WEEK or len(result.peaks) != HOURS_PER_WEEK:
+            raise ValueError(f"A heatmap must have {HOURS_PER_WEEK} cells")
+        return result
+
+
+def render_heatmap(heatmap: Heatmap) -> str:
+    """Renders the average amount of concurrent players as a block of text with one row per day and one column per hour"""
+    averages = heatmap.get_averages()
+    maxAverage = max(averages)
+    lines = ["```", "    " + "".join(f"{hour:<6}" for hour in range(0, 24, 6))]
+    for day, weekday in enumerate(WEEKDAYS):
+        cells = []
+        for average in averages[day * 24:(day + 1) * 24]:
+            shade = math.ceil(average / maxAverage * (len(SHADES) - 1)) if maxAverage > 0 else 0
+            cells.append(SHADES[shade])
+        lines.append(f"{weekday} {''.join(cells)}")
+    lines.append("```")
+    if maxAverage > 0:
+        busiestHour = averages.index(maxAverage)
+        lines.append(
+            f"Busiest hour: {WEEKDAYS[busiestHour // 24]} {busiestHour % 24:02}:00 with {maxAverage:.1f} players on average")
+        lines.append(f"Peak: {max(heatmap.peaks)} concurrent players")
+    else:
+        lines.append("Nobody has been online yet")
+    return "\n".join(lines)
+
+
+class HeatmapTracker:
+    """Keeps a heatmap of concurrent players for every server and for every guild.
+    The player count of a guild is the sum of the most recent player counts of its servers. It is recorded whenever
+    one of its servers was polled."""
+
+    def __init__(self):
+        self.servers: dict[int, Heatmap] = {}
+        self.guilds: dict[int, Heatmap] = {}
+        self.serverGuilds: dict[int, int] = {}
+        self.playerCounts: dict[int, int] = {}  # The most recent player count of each server
+        self.guildPlayerCounts: dict[int, int] = {}
+
+    def update_guild_to_server_map(self, guildToServerMap: dict[int, list[int]]):
+        self.serverGuilds = {serverId: guildId for guildId, serverIds in guildToServerMap.items() for serverId in serverIds}
+        self.guildPlayerCounts = {
+            guildId: sum(self.playerCounts.get(serverId, 0) for serverId in serverIds)
+            for guildId, serverIds in guildToServerMap.items()}
+
+    def on_changes(self, changes: ServerStatusChanges):
+        self.record(changes.serverId, datetime.datetime.now(), changes.playerCount)
+
+    def record(self, serverId: int, now: datetime.datetime, playerCount: int):
+        hourOfWeek = get_hour_of_week(now)
+        if serverId not in self.servers:
+            self.servers[serverId] = Heatmap()
+        self.servers[serverId].record(hourOfWeek, playerCount)
+
+        guildId = self.serverGuilds.get(serverId)
+        if guildId is not None:
+            guildPlayerCount = self.guildPlayerCounts.get(guildId, 0) + playerCount - self.playerCounts.get(serverId, 0)
+            self.guildPlayerCounts[guildId] = guildPlayerCount
+            if guildId not in self.guilds:
+                self.guilds[guildId] = Heatmap()
+            self.guilds[guildId].record(hourOfWeek, guildPlayerCount)
+        self.playerCounts[serverId] = playerCount
+
+    def remove_server(self, serverId: int):
+        self.servers.pop(serverId, None)
+        self.playerCounts.pop(serverId, None)
+
+    def to_dict(self) -> dict[str, dict]:
+        return {
+            "servers": {serverId: heatmap.to_dict() for serverId, heatmap in self.servers.items()},
+            "guilds": {guildId: heatmap.to_dict() for guildId, heatmap in self.guilds.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, dict]):
+        result = cls()
+        result.servers = {int(serverId): Heatmap.from_dict(heatmap) for serverId, heatmap in data["servers"].items()}
+        result.guilds = {int(guildId): Heatmap.from_dict(heatmap) for guildId, heatmap in data["guilds"].items()}
+        return result
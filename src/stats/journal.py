@@ -0,0 +1,93 @@
+from stats.statstracker import OnlineTimeTracker
+import datetime
+import json
+import os
+
+
+class SessionJournal:
+    """Stores every credited online time as a single line in an append-only file.
+    Replaying the journal on top of the last snapshot of the time tracker restores the sessions since that snapshot.
+
+    Every record carries the session number of the time tracker, so records which are already contained in a snapshot
+    are skipped, no matter when the snapshot was taken."""
+
+    def __init__(self, filePath: str):
+        self.filePath = filePath
+        self.file = None
+        self.numRecords = 0  # The amount of records which were not compacted yet
+        rotatedGenerations = self.get_rotated_generations()
+        self.generation = rotatedGenerations[-1] if rotatedGenerations else 0  # The most recent rotation
+
+    def get_rotated_file(self, generation: int) -> str:
+        """Every rotation moves the journal to a file of its own, numbered by the rotations since the bot started using
+        generations. Generation 0 is the single rotated file of earlier versions."""
+        return self.filePath + (f".{generation}" if generation > 0 else ".old")
+
+    def get_rotated_generations(self) -> list[int]:
+        """Returns the generations of all rotated files which still exist, oldest first"""
+        folder, fileName = os.path.split(self.filePath)
+        generations = []
+        for entry in os.listdir(folder or "."):
+            if not entry.startswith(fileName + "."):
+                continue
+            suffix = entry[len(fileName) + 1:]
+            if suffix == "old":
+                generations.append(0)
+            elif suffix.isdigit():
+                generations.append(int(suffix))
+        return sorted(generations)
+
+    def has_records(self) -> bool:
+        return self.numRecords > 0 or len(self.get_rotated_generations()) > 0
+
+    def append(self, sessionNumber: int, date: datetime.date, serverId: int, playerName: str, onlineTime: int):
+        if self.file is None:
+            self.file = open(self.filePath, "a", encoding="utf-8")
+        record = [sessionNumber, date.isoformat(), serverId, onlineTime, playerName]
+        self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.file.flush()
+        self.numRecords += 1
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def rotate(self) -> int:
+        """Moves the current journal to a new rotated file, so new sessions are written to a new journal.
+        Returns the generation of the rotation. Its file and those of earlier generations must be kept until a snapshot
+        which was taken at the rotation was written, see remove_rotated_files."""
+        self.close()
+        self.generation += 1
+        if os.path.exists(self.filePath):
+            os.replace(self.filePath, self.get_rotated_file(self.generation))
+        self.numRecords = 0
+        return self.generation
+
+    def remove_rotated_files(self, generation: int):
+        """Removes the rotated files up to the given generation, since a snapshot which contains their sessions was
+        written. Files of later rotations belong to snapshots which may still be pending."""
+        for rotatedGeneration in self.get_rotated_generations():
+            if rotatedGeneration <= generation:
+                os.remove(self.get_rotated_file(rotatedGeneration))
+
+    def replay(self, timeTracker: OnlineTimeTracker) -> int:
+        """Adds all sessions which are not contained in the time tracker yet and returns their amount"""
+        numReplayed = 0
+        filePaths = [self.get_rotated_file(generation) for generation in self.get_rotated_generations()]
+        for filePath in filePaths + [self.filePath]:
+            if not os.path.exists(filePath):
+                continue
+            with open(filePath, "r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        sessionNumber, dateStr, serverId, onlineTime, playerName = json.loads(line)
+                    except ValueError:
+                        # The last line is incomplete if the bot was killed while writing it
+                        continue
+                    self.numRecords += 1
+                    if sessionNumber > timeTracker.sessionCount:
+                        timeTracker.add_online_time(serverId, playerName, onlineTime, datetime.date.fromisoformat(dateStr))
+                        timeTracker.sessionCount = sessionNumber
+                        numReplayed += 1
+        return numReplayed
@@ -0,0 +1,237 @@
+"""Merges snapshots of the OnlineTimeTracker, e.g. when consolidating bot instances or restoring backups.
+
+Every snapshot is aligned by its last update: its days, weeks and months are added to the buckets which cover the same
+dates in the merged tracker, and its all-time totals are added as they are. Server IDs can be remapped per snapshot.
+Snapshots are loaded and merged one at a time, so besides the merged tracker only a single snapshot is kept in memory.
+The result is validated before it is written.
+
+Usage: python -m stats.merge <output file> <input file>... [--remap <input number>:<old ID>:<new ID>]... [--binary]
+Inputs may be JSON or binary snapshots.
+"""
+from stats.statstracker import OnlineTimeTracker, BucketRing, ServerColumns, SparseColumns, get_week, get_month
+from stats.snapshotformat import RING_NAMES, is_binary_snapshot, from_binary, to_binary
+from typing import Iterator
+import argparse
+import datetime
+import hashlib
+import json
+import sys
+
+
+def load_snapshot(data: bytes) -> OnlineTimeTracker:
+    """Loads a binary or JSON snapshot"""
+    if is_binary_snapshot(data):
+        return from_binary(data)
+    return OnlineTimeTracker.from_json(data.decode("utf-8"))
+
+
+def parse_server_id_map(text: str) -> dict[int, int]:
+    """Parses server IDs mappings given as "old:new", separated by commas"""
+    serverIdMap: dict[int, int] = {}
+    for mapping in text.split(","):
+        if not mapping.strip():
+            continue
+        oldServerId, separator, newServerId = mapping.partition(":")
+        if not separator:
+            raise ValueError(f"Server IDs must be mapped as old:new, not {mapping.strip()}")
+        serverIdMap[int(oldServerId)] = int(newServerId)
+    return serverIdMap
+
+
+def get_total_minutes(timeTracker: OnlineTimeTracker) -> int:
+    return sum(timeTracker.allTime.combined.totals[timeTracker.allTime.numBuckets])
+
+
+def get_bucket_number(ringName: str, lastUpdate: datetime.date, bucket: int) -> int:
+    """Numbers the day, week or month which a bucket covers, independent of the date of the tracker"""
+    if ringName == "days":
+        return lastUpdate.toordinal() - bucket
+    if ringName == "weeks":
+        return get_week(lastUpdate) - bucket
+    if ringName == "months":
+        return get_month(lastUpdate) - bucket
+    return bucket
+
+
+def get_bucket_offset(ringName: str, source: OnlineTimeTracker, target: OnlineTimeTracker) -> int:
+    """Calculates how many buckets older a bucket of the source is in the target, since the target may be more recent"""
+    if ringName == "days":
+        return (target.lastUpdate - source.lastUpdate).days
+    if ringName == "weeks":
+        return get_week(target.lastUpdate) - get_week(source.lastUpdate)
+    if ringName == "months":
+        return get_month(target.lastUpdate) - get_month(source.lastUpdate)
+    return 0
+
+
+def iter_bucket_entries(timeTracker: OnlineTimeTracker, ring: BucketRing) -> Iterator[tuple[int, int, str, int]]:
+    """Yields the bucket, server ID, player name and online time of every non-empty bucket of the given ring"""
+    for serverId, serverColumns in ring.servers.items():
+        for bucket in range(ring.numBuckets):
+            for slot, minutes in serverColumns.iter_column(ring.get_column(bucket)):
+                yield bucket, serverId, timeTracker.playerNames[serverColumns.playerIndices[slot]], minutes
+
+
+def get_fingerprint(timeTracker: OnlineTimeTracker) -> str:
+    """Identifies a snapshot by its online times, so repeated imports can be detected.
+    Buckets are identified by the days, weeks and months they cover rather than by their position, so exporting the
+    same online times again results in the same fingerprint. The session count is left out, since it changes without
+    changing any online time."""
+    entries = []
+    if timeTracker.lastUpdate is not None:
+        for ringName in RING_NAMES:
+            for bucket, serverId, playerName, minutes in iter_bucket_entries(timeTracker, getattr(timeTracker, ringName)):
+                entries.append((ringName, get_bucket_number(ringName, timeTracker.lastUpdate, bucket), serverId,
+                                playerName, minutes))
+    digest = hashlib.sha256()
+    for entry in sorted(entries):
+        digest.update(json.dumps(entry).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def merge_tracker(target: OnlineTimeTracker, source: OnlineTimeTracker, serverIdMap: dict[int, int] = None) -> int:
+    """Adds all online times of the source to the target and returns the amount of minutes which were added.
+    If the source is more recent than the target, the target is moved to its date first. Buckets of the source which
+    are older than the buckets of the target are only kept in the coarser rings, as if the target had rotated them."""
+    if source.lastUpdate is None:
+        return 0
+    serverIdMap = serverIdMap or {}
+    if target.lastUpdate is None:
+        target.lastUpdate = source.lastUpdate
+    elif source.lastUpdate > target.lastUpdate:
+        target.move_to_date(source.lastUpdate)
+    for ringName in RING_NAMES:
+        targetRing: BucketRing = getattr(target, ringName)
+        offset = get_bucket_offset(ringName, source, target)
+        for bucket, serverId, playerName, minutes in iter_bucket_entries(source, getattr(source, ringName)):
+            targetRing.add_minutes(
+                bucket + offset, serverIdMap.get(serverId, serverId), target.intern_player(playerName), minutes)
+    return get_total_minutes(source)
+
+
+def get_column_minutes(ring: BucketRing, serverColumns: ServerColumns) -> dict[tuple[int, int], int]:
+    """Retrieves the minutes of every player index and column with minutes"""
+    return {
+        (serverColumns.playerIndices[slot], column): minutes
+        for column in range(ring.numBuckets) for slot, minutes in serverColumns.iter_column(column)}
+
+
+def validate_columns(ring: BucketRing, serverColumns: ServerColumns, numPlayers: int, name: str) -> list[str]:
+    """Checks that the slots are consistent and that every total matches the buckets of its window"""
+    numSlots = len(serverColumns.playerIndices)
+    if serverColumns.numRows > numSlots or (
+            not isinstance(serverColumns, SparseColumns) and
+            len(serverColumns.minutes) != serverColumns.numRows * ring.numBuckets):
+        return [f"{name}: {len(serverColumns.minutes)} minutes are stored for {numSlots} slots"]
+    if isinstance(serverColumns, SparseColumns) and \
+            any(slot >= numSlots for columnMinutes in serverColumns.columns for slot in columnMinutes):
+        return [f"{name}: minutes are stored for unknown slots"]
+    problems = []
+    if any(playerIndex >= numPlayers for playerIndex in serverColumns.playerIndices):
+        problems.append(f"{name}: unknown players are referenced")
+    if serverColumns.slots != dict(zip(serverColumns.playerIndices, range(numSlots))):
+        problems.append(f"{name}: the slots do not match the player indices")
+    for window in serverColumns.totals:
+        columns = [ring.get_column(bucket) for bucket in range(window)]
+        for slot in range(numSlots):
+            expectedTotal = sum(serverColumns.get_minutes(slot, column) for column in columns)
+            if serverColumns.get_total(slot, window) != expectedTotal:
+                problems.append(f"{name}: the total of {window} buckets of player {serverColumns.playerIndices[slot]} is wrong")
+                break
+    return problems
+
+
+def validate_tracker(timeTracker: OnlineTimeTracker, expectedMinutes: int = None) -> list[str]:
+    """Checks the internal consistency of a time tracker and returns the problems which were found.
+    If expectedMinutes is given, the all-time total of all players must match it as well."""
+    numPlayers = len(timeTracker.playerNames)
+    problems = []
+    for ringName in RING_NAMES:
+        ring: BucketRing = getattr(timeTracker, ringName)
+        combinedMinutes: dict[tuple[int, int], int] = {}
+        for serverId, serverColumns in ring.servers.items():
+            serverProblems = validate_columns(ring, serverColumns, numPlayers, f"{ringName} of server {serverId}")
+            problems += serverProblems
+            if serverProblems:
+                continue
+            for key, minutes in get_column_minutes(ring, serverColumns).items():
+                combinedMinutes[key] = combinedMinutes.get(key, 0) + minutes
+        combinedProblems = validate_columns(ring, ring.combined, numPlayers, f"{ringName} of all servers")
+        problems += combinedProblems
+        if combinedProblems:
+            continue
+        mismatches = combinedMinutes.items() ^ get_column_minutes(ring, ring.combined).items()
+        mismatchingPlayers = {playerIndex for (playerIndex, _), _ in mismatches}
+        for playerIndex in sorted(mismatchingPlayers):
+            problems.append(f"{ringName} of all servers: player {playerIndex} does not match the sum of the servers")
+    if expectedMinutes is not None and get_total_minutes(timeTracker) != expectedMinutes:
+        problems.append(f"{get_total_minutes(timeTracker)} minutes were merged rather than {expectedMinutes}")
+    return problems
+
+
+def merge_into_copy(snapshotData: bytes, source: OnlineTimeTracker, serverIdMap: dict[int, int] = None,
+                    expectedMinutes: int = None) -> tuple[OnlineTimeTracker, int, list[str]]:
+    """Merges the source into a copy of a tracker, given as its binary snapshot, and validates the result.
+    Returns the merged copy, the amount of minutes which were added and the problems which were found. The original
+    tracker is never changed, so it can stay in use while this runs in a worker thread."""
+    target = from_binary(snapshotData)
+    numMinutes = merge_tracker(target, source, serverIdMap)
+    return target, numMinutes, validate_tracker(target, expectedMinutes)
+
+
+def merge_files(filePaths: list[str], serverIdMaps: dict[int, dict[int, int]] = None) -> tuple[OnlineTimeTracker, int]:
+    """Merges the snapshots in the given files, remapping server IDs per file (by index).
+    Returns the merged tracker and the amount of minutes which were read."""
+    serverIdMaps = serverIdMaps or {}
+    timeTracker = OnlineTimeTracker.create_new()
+    totalMinutes = 0
+    for index, filePath in enumerate(filePaths):
+        with open(filePath, "rb") as file:
+            source = load_snapshot(file.read())
+        totalMinutes += merge_tracker(timeTracker, source, serverIdMaps.get(index))
+        timeTracker.sessionCount = max(timeTracker.sessionCount, source.sessionCount)
+        print(f"Merged {filePath} (last update {source.lastUpdate}, {len(source.playerNames)} players)")
+    return timeTracker, totalMinutes
+
+
+def parse_remap(text: str) -> tuple[int, int, int]:
+    try:
+        inputNumber, oldServerId, newServerId = (int(value) for value in text.split(":"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected <input number>:<old ID>:<new ID>, not {text}")
+    return inputNumber, oldServerId, newServerId
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merges time tracker snapshots of several bot instances or backups")
+    parser.add_argument("outputFile")
+    parser.add_argument("inputFiles", nargs="+")
+    parser.add_argument(
+        "--remap", type=parse_remap, action="append", default=[], metavar="INPUT:OLD:NEW",
+        help="Stores the server with ID OLD of the given input (starting at 1) as server NEW")
+    parser.add_argument("--binary", action="store_true", help="Write a binary snapshot rather than JSON")
+    args = parser.parse_args()
+
+    serverIdMaps: dict[int, dict[int, int]] = {}
+    for inputNumber, oldServerId, newServerId in args.remap:
+        if not 1 <= inputNumber <= len(args.inputFiles):
+            parser.error(f"There is no input number {inputNumber}")
+        serverIdMaps.setdefault(inputNumber - 1, {})[oldServerId] = newServerId
+
+    timeTracker, totalMinutes = merge_files(args.inputFiles, serverIdMaps)
+    problems = validate_tracker(timeTracker, totalMinutes)
+    if problems:
+        print("The merged data are inconsistent, nothing was written:\n" + "\n".join(problems), file=sys.stderr)
+        sys.exit(1)
+
+    if args.binary:
+        with open(args.outputFile, "wb") as file:
+            file.write(to_binary(timeTracker))
+    else:
+        with open(args.outputFile, "w") as file:
+            file.write(timeTracker.to_json())
+    print(f"Wrote {totalMinutes} minutes of {len(timeTracker.playerNames)} players to {args.outputFile}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,135 @@
-from fs22.servertracker import FS22ServerStatus
+from fs22.fs22server import OnlineState
+from fs22.servertracker import FS22ServerStatus, ServerStatusChanges
 from stats.statstracker import OnlineTimeTracker
-from events import Events
+from stats.sessiontable import SessionTable, PlayerSession
+from stats.journal import SessionJournal
+from eventbus import EventBus
+import datetime
+import traceback
 
 
-class PlayerTrackerEvents(Events):
-    """Defines events to be subscribed to"""
-    __events__ = ('stats_updated')
+class PlayerTrackerEvents:
+    """Defines the topics which are published by the player tracker"""
+    stats_updated = "stats_updated"  # Sends the ID of the server whose online times were credited, once per batch
+
+
+CREDIT_INTERVAL = 10 * 60  # Seconds between crediting the sessions of a server which are still in progress
+
+
+def split_by_day(end: datetime.datetime, minutes: int) -> list[tuple[datetime.date, int]]:
+    """Splits the minutes which passed until the given point in time into the minutes of each day, oldest day first"""
+    result = []
+    day = end.date()
+    minutesOfDay = end.hour * 60 + end.minute
+    while minutes > 0:
+        dayMinutes = min(minutes, minutesOfDay)
+        if dayMinutes > 0:
+            result.append((day, dayMinutes))
+        minutes -= dayMinutes
+        day -= datetime.timedelta(days=1)
+        minutesOfDay = 24 * 60
+    result.reverse()
+    return result
 
 
 class PlayerTracker:
+    """Credits the online times of players while they are online.
+    Every poll adds the minutes which passed since the previous poll to the pending minutes of the session. They are
+    credited when the player leaves, and every CREDIT_INTERVAL while the player stays online. The stats therefore
+    include players who are currently online with a delay of at most CREDIT_INTERVAL, sessions which span midnight are
+    split between the days, and the journal and the stats cache only see one batch of credits per server and interval
+    rather than one credit per player and poll. A restart of the bot only loses the minutes since the last checkpoint.
+    Credited online times are appended to the journal right away rather than through the event bus, so every credit
+    which reached the time tracker is also on disk."""
 
-    def __init__(self, timeTracker: OnlineTimeTracker):
-        self.lastKnownPlayerTimes: dict[str, int] = {}
+    def __init__(self, timeTracker: OnlineTimeTracker, eventBus: EventBus, journal: SessionJournal = None,
+                 creditInterval: float = CREDIT_INTERVAL):
+        self.sessions = SessionTable()
         self.timeTracker = timeTracker
-        self.events = PlayerTrackerEvents()
+        self.eventBus = eventBus
+        self.journal = journal  # None if the time tracker stores every credit itself, e.g. in a database
+        self.creditInterval = creditInterval
+        self.nextCredits: dict[int, float] = {}  # The timestamp at which the sessions of each server are credited next
+        self.recordedCredits: list[tuple[int, str, int, datetime.date]] = None  # See start_recording_credits
 
-    def on_player_offline(self, serverId: int, playerName: str):
-        if playerName in self.lastKnownPlayerTimes:
-            onlineTime = self.lastKnownPlayerTimes[playerName]
-            self.timeTracker.add_online_time(serverId, playerName, onlineTime)
-            self.events.stats_updated(self.get_current_data())
+    def on_changes(self, changes: ServerStatusChanges):
+        # Sessions of players who left are kept until they expire. A failed poll reports every player as having left,
+        # and the session table tells a continued session from a new one by the online time anyway.
+        self.on_updated(changes.serverId, changes.serverData)
 
-    def on_updated(self, serverId: int, serverData: FS22ServerStatus):
+    def on_updated(self, serverId: int, serverData: FS22ServerStatus, now: datetime.datetime = None):
+        now = now or datetime.datetime.now()
+        timestamp = now.timestamp()
         for playerData in serverData.onlinePlayers.values():
-            self.lastKnownPlayerTimes[playerData.playerName] = int(playerData.onlineTime)
+            self.sessions.update(serverId, playerData.playerName, int(playerData.onlineTime), timestamp)
+        if serverData.status != OnlineState.Unknown:
+            # A failed poll does not tell which players were online
+            self.sessions.mark_polled(serverId, timestamp)
+
+        # Players who are no longer reported are credited right away, those who are still online once per interval
+        creditAll = timestamp >= self.nextCredits.get(serverId, 0.0)
+        if creditAll:
+            self.nextCredits[serverId] = timestamp + self.creditInterval
+        self.credit_sessions([
+            (sessionServerId, playerName, session)
+            for sessionServerId, playerName, session in self.sessions.get_pending_sessions(serverId)
+            if creditAll or playerName not in serverData.onlinePlayers])
+        self.credit_sessions(self.sessions.sweep(timestamp))
+
+    def credit_pending_sessions(self):
+        """Credits the pending minutes of all sessions, e.g. before the bot stops"""
+        self.credit_sessions(self.sessions.get_pending_sessions())
+
+    def credit_sessions(self, sessions: list[tuple[int, str, PlayerSession]]):
+        """Credits the pending minutes of the given sessions and publishes a single event per affected server"""
+        serverIds = []
+        for serverId, playerName, session in sessions:
+            if session.pendingMinutes <= 0:
+                continue
+            # The pending minutes passed until the session was last seen
+            self.credit_online_time(
+                serverId, playerName, session.pendingMinutes, datetime.datetime.fromtimestamp(session.lastSeen))
+            session.pendingMinutes = 0
+            if serverId not in serverIds:
+                serverIds.append(serverId)
+        for serverId in serverIds:
+            self.eventBus.publish(PlayerTrackerEvents.stats_updated, serverId)
+
+    def credit_online_time(self, serverId: int, playerName: str, onlineTime: int, end: datetime.datetime):
+        for date, minutes in split_by_day(end, onlineTime):
+            self.timeTracker.add_online_time(serverId, playerName, minutes, date)
+            self.store_session(self.timeTracker.sessionCount, date, serverId, playerName, minutes)
+            if self.recordedCredits is not None:
+                self.recordedCredits.append((serverId, playerName, minutes, date))
+
+    def store_session(self, sessionNumber: int, date: datetime.date, serverId: int, playerName: str, onlineTime: int):
+        """Appends credited online time to the journal. The time tracker itself is only written on compaction."""
+        if self.journal is None:
+            return
+        try:
+            self.journal.append(sessionNumber, date, serverId, playerName, onlineTime)
+        except Exception:
+            print(f"[WARN ] [PlayerTracker] Failed appending session to the journal: {traceback.format_exc()}")
+
+    def start_recording_credits(self):
+        """Records all online times which are credited from now on, e.g. while a copy of the time tracker is changed in
+        a worker thread, so they can be added to the copy before it replaces the time tracker"""
+        self.recordedCredits = []
+
+    def stop_recording_credits(self):
+        self.recordedCredits = None
+
+    def replace_time_tracker(self, timeTracker: OnlineTimeTracker):
+        """Adds the online times which were credited since start_recording_credits to the given time tracker and
+        credits to it from now on. The session count matches the journal again, since every credit counts a session."""
+        for serverId, playerName, minutes, date in self.recordedCredits or []:
+            timeTracker.add_online_time(serverId, playerName, minutes, date)
+        self.timeTracker = timeTracker
+        self.stop_recording_credits()
+
+    def get_checkpoint(self) -> dict:
+        """Describes the sessions which are in progress, so they can be resumed after a restart"""
+        return self.sessions.to_checkpoint()
 
-    def get_current_data(self) -> str:
-        return self.timeTracker.to_json()
\ No newline at end of file
+    def restore_checkpoint(self, checkpoint: dict):
+        self.sessions.restore_checkpoint(checkpoint)
@@ -0,0 +1,99 @@
+import math
+
+SESSION_TTL = 60 * 60  # Seconds after which a session which was not seen anymore is dropped
+
+
+class PlayerSession:
+    """The part of a session in progress which was seen already, and how much of it was not credited yet"""
+    __slots__ = ("onlineTime", "lastSeen", "pendingMinutes")
+
+    def __init__(self, onlineTime: int, lastSeen: float, pendingMinutes: int = 0):
+        self.onlineTime = onlineTime
+        self.lastSeen = lastSeen  # Timestamp of the poll which reported the online time
+        self.pendingMinutes = pendingMinutes  # Minutes up to lastSeen which were not credited yet
+
+
+class SessionTable:
+    """Keeps the sessions which are in progress, per server and player.
+    Sessions are not removed when a player seems to have left, since a single failed poll reports no players at all.
+    If the player shows up again, the online time tells whether the session continued or a new one started.
+    Sessions which were not seen for a while are dropped by a periodic sweep. The size of the table therefore depends
+    on the players who were online within the TTL rather than on every player who was ever seen.
+    A player who is seen for the first time can only have been online since the previous poll of the server. Their
+    online time is capped accordingly, so a restart with an outdated or missing checkpoint does not credit the part of
+    a session again which was credited before the restart."""
+
+    def __init__(self, ttl: float = SESSION_TTL):
+        self.ttl = ttl
+        self.sessions: dict[tuple[int, str], PlayerSession] = {}
+        self.lastPolls: dict[int, float] = {}  # The timestamp of the most recent successful poll of each server
+        self.nextSweep = 0.0
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def get(self, serverId: int, playerName: str) -> PlayerSession:
+        return self.sessions.get((serverId, playerName))
+
+    def get_pending_sessions(self, serverId: int = None) -> list[tuple[int, str, PlayerSession]]:
+        """Returns the sessions of the given server, or of all servers, which have minutes that were not credited yet"""
+        return [(sessionServerId, playerName, session) for (sessionServerId, playerName), session in self.sessions.items()
+                if session.pendingMinutes > 0 and (serverId is None or sessionServerId == serverId)]
+
+    def mark_polled(self, serverId: int, now: float):
+        """Remembers that the players of the server were reported completely at the given time"""
+        self.lastPolls[serverId] = now
+
+    def update(self, serverId: int, playerName: str, onlineTime: int, now: float) -> int:
+        """Stores the current online time of a player and returns the minutes which are new since the last update.
+        They are added to the pending minutes of the session until they are credited.
+        The session was restarted if the online time grew by less than the time which passed since it was last seen,
+        which happens if the player reconnected or the server restarted in the meantime.
+        New sessions are credited with the minutes since the last poll of the server at most. If the server was never
+        polled, nothing is credited and the online time is only the baseline for later polls."""
+        session = self.sessions.get((serverId, playerName))
+        if session is None:
+            lastPoll = self.lastPolls.get(serverId)
+            newMinutes = 0 if lastPoll is None else max(0, min(onlineTime, math.ceil((now - lastPoll) / 60)))
+            self.sessions[(serverId, playerName)] = PlayerSession(onlineTime, now, newMinutes)
+            return newMinutes
+        minutesSinceLastSeen = int((now - session.lastSeen) // 60)
+        if onlineTime < session.onlineTime + max(0, minutesSinceLastSeen - 1):
+            newMinutes = onlineTime
+        else:
+            newMinutes = onlineTime - session.onlineTime
+        session.onlineTime = onlineTime
+        session.lastSeen = now
+        session.pendingMinutes += newMinutes
+        return newMinutes
+
+    def remove(self, serverId: int, playerName: str):
+        self.sessions.pop((serverId, playerName), None)
+
+    def sweep(self, now: float) -> list[tuple[int, str, PlayerSession]]:
+        """Drops the sessions which expired and returns them, so their pending minutes can still be credited.
+        Sweeps at most once per half TTL."""
+        if now < self.nextSweep:
+            return []
+        self.nextSweep = now + self.ttl / 2
+        expiredKeys = [key for key, session in self.sessions.items() if now - session.lastSeen > self.ttl]
+        return [(serverId, playerName, self.sessions.pop((serverId, playerName))) for serverId, playerName in expiredKeys]
+
+    def to_checkpoint(self) -> dict:
+        return {
+            "sessions": [[serverId, playerName, session.onlineTime, session.lastSeen, session.pendingMinutes]
+                         for (serverId, playerName), session in self.sessions.items()],
+            "polls": {str(serverId): lastPoll for serverId, lastPoll in self.lastPolls.items()}
+        }
+
+    def restore_checkpoint(self, checkpoint: dict):
+        # Checkpoints of earlier versions do not contain pending minutes, since every minute was credited right away
+        for serverId, playerName, onlineTime, lastSeen, *pendingMinutes in checkpoint.get("sessions", []):
+            self.sessions[(int(serverId), playerName)] = PlayerSession(
+                int(onlineTime), float(lastSeen), int(pendingMinutes[0]) if pendingMinutes else 0)
+        if "polls" in checkpoint:
+            self.lastPolls = {int(serverId): float(lastPoll) for serverId, lastPoll in checkpoint["polls"].items()}
+        else:
+            # Earlier checkpoints were written whenever a session was credited, so the sessions were seen last
+            for (serverId, playerName), session in self.sessions.items():
+                self.lastPolls[serverId] = max(self.lastPolls.get(serverId, 0.0), session.lastSeen)
@@ -0,0 +1,286 @@
+"""A compact binary format for snapshots of the OnlineTimeTracker.
+
+Layout (all integers are unsigned, counters are varints, arrays are little endian 32 bit values):
+    magic "FSSB", format version (1 byte), flags (1 byte, bit 0: the payload is zlib compressed)
+    payload:
+        last update (ordinal of the date, 0 if unknown), session count, number of days
+        string table: number of player names, then the length and UTF-8 bytes of each name
+        slot table: number of servers, then for each server its ID, number of slots and the player indices of the
+            slots, finally the number of slots and the player indices of all servers combined
+        for each bucket ring (days, weeks, months, all time):
+            number of buckets, head, number of servers
+            for each server and finally for all servers combined:
+                server ID (only for servers), then either
+                    days and all time: number of slots, minutes of the slots
+                    weeks and months: for each column the number of slots with minutes, their slots and minutes
+
+Minutes are stored as they are kept in memory, so loading mostly copies buffers. Snapshots are loaded as a stream:
+the payload is decompressed chunk by chunk while it is read, so neither the file nor the decompressed payload has to
+be held in memory as a whole. Totals are derived from the minutes,
+so they are calculated while loading rather than stored.
+Versions 1 and 2 stored the slots per ring as well as the totals. Their minutes are added to a new tracker.
+
+Converting from and to JSON: python -m stats.snapshotformat (to-binary|to-json) <input file> <output file>
+"""
+from stats.statstracker import OnlineTimeTracker, BucketRing, ServerColumns, SparseColumns, PlayerSlots
+from array import array
+from typing import BinaryIO
+import argparse
+import datetime
+import io
+import sys
+import zlib
+
+MAGIC = b"FSSB"
+VERSION = 3
+V1_WINDOWS = {"days": [1, 7, 14, 30], "weeks": [13], "months": [12], "allTime": [1]}  # The windows of version 1 snapshots
+FLAG_COMPRESSED = 1
+COMPRESSION_LEVEL = 1  # Higher levels barely reduce the size, but take several times as long
+RING_NAMES = ["days", "weeks", "months", "allTime"]
+CHUNK_SIZE = 64 * 1024  # The number of bytes which are read from the stream at once
+
+
+def is_binary_snapshot(data: bytes) -> bool:
+    return data[:len(MAGIC)] == MAGIC
+
+
+def write_varint(buffer: bytearray, value: int):
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def write_array(buffer: bytearray, values: array):
+    if sys.byteorder == "big":
+        values = array("I", values)
+        values.byteswap()
+    buffer += values.tobytes()
+
+
+def write_slots(buffer: bytearray, playerSlots: PlayerSlots):
+    write_varint(buffer, len(playerSlots.playerIndices))
+    write_array(buffer, playerSlots.playerIndices)
+
+
+def write_columns(buffer: bytearray, serverColumns: ServerColumns):
+    if isinstance(serverColumns, SparseColumns):
+        for columnMinutes in serverColumns.columns:
+            write_varint(buffer, len(columnMinutes))
+            write_array(buffer, array("I", columnMinutes.keys()))
+            write_array(buffer, array("I", columnMinutes.values()))
+    else:
+        write_varint(buffer, serverColumns.numRows)
+        write_array(buffer, serverColumns.minutes)
+
+
+def to_binary(timeTracker: OnlineTimeTracker, compress: bool = True) -> bytes:
+    payload = bytearray()
+    write_varint(payload, timeTracker.lastUpdate.toordinal() if timeTracker.lastUpdate else 0)
+    write_varint(payload, timeTracker.sessionCount)
+    write_varint(payload, timeTracker.numDays)
+
+    write_varint(payload, len(timeTracker.playerNames))
+    for playerName in timeTracker.playerNames:
+        encodedName = playerName.encode("utf-8")
+        write_varint(payload, len(encodedName))
+        payload += encodedName
+
+    write_varint(payload, len(timeTracker.serverSlots))
+    for serverId, playerSlots in timeTracker.serverSlots.items():
+        write_varint(payload, serverId)
+        write_slots(payload, playerSlots)
+    write_slots(payload, timeTracker.combinedSlots)
+
+    for ringName in RING_NAMES:
+        ring: BucketRing = getattr(timeTracker, ringName)
+        write_varint(payload, ring.numBuckets)
+        write_varint(payload, ring.head)
+        write_varint(payload, len(ring.servers))
+        for serverId, serverColumns in ring.servers.items():
+            write_varint(payload, serverId)
+            write_columns(payload, serverColumns)
+        write_columns(payload, ring.combined)
+
+    if compress:
+        return MAGIC + bytes([VERSION, FLAG_COMPRESSED]) + zlib.compress(payload, COMPRESSION_LEVEL)
+    return MAGIC + bytes([VERSION, 0]) + payload
+
+
+class SnapshotReader:
+    """Reads the values of a snapshot one after another. The payload is read from the stream in chunks, which are
+    decompressed as they arrive if a decompressor is given. Consumed bytes are dropped from the buffer."""
+
+    def __init__(self, stream: BinaryIO, decompressor=None):
+        self.stream = stream
+        self.decompressor = decompressor
+        self.buffer = bytearray()
+        self.position = 0
+
+    def fill(self, length: int):
+        """Reads chunks from the stream until at least the given number of unread bytes are buffered"""
+        del self.buffer[:self.position]
+        self.position = 0
+        while len(self.buffer) < length:
+            chunk = self.stream.read(CHUNK_SIZE)
+            data = chunk
+            if self.decompressor is not None:
+                # Small chunks may not yield any data yet, only the end of the stream flushes the rest
+                try:
+                    data = self.decompressor.decompress(chunk) if chunk else self.decompressor.flush()
+                except zlib.error as e:
+                    raise ValueError(f"The snapshot is corrupted: {e}")
+            if not chunk and not data:
+                raise ValueError("The snapshot is truncated")
+            self.buffer += data
+
+    def read_varint(self) -> int:
+        value = 0
+        shift = 0
+        while True:
+            if self.position >= len(self.buffer):
+                self.fill(1)
+            byte = self.buffer[self.position]
+            self.position += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def read_bytes(self, length: int) -> bytes:
+        if self.position + length > len(self.buffer):
+            self.fill(length)
+        data = bytes(self.buffer[self.position:self.position + length])
+        self.position += length
+        return data
+
+    def read_array(self, length: int) -> array:
+        values = array("I")
+        values.frombytes(self.read_bytes(length * values.itemsize))
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
+
+    def read_slots(self, playerSlots: PlayerSlots):
+        playerSlots.playerIndices = self.read_array(self.read_varint())
+        playerSlots.slots = dict(zip(playerSlots.playerIndices, range(len(playerSlots.playerIndices))))
+
+    def read_columns(self, ring: BucketRing, serverColumns: ServerColumns):
+        numSlots = len(serverColumns.playerIndices)
+        if isinstance(serverColumns, SparseColumns):
+            for column in range(ring.numBuckets):
+                numEntries = self.read_varint()
+                slots = self.read_array(numEntries)
+                if any(slot >= numSlots for slot in slots):
+                    raise ValueError("The snapshot references unknown slots")
+                serverColumns.columns[column] = dict(zip(slots, self.read_array(numEntries)))
+        else:
+            numRows = self.read_varint()
+            if numRows > numSlots:
+                raise ValueError("The snapshot references unknown slots")
+            serverColumns.minutes = self.read_array(numRows * ring.numBuckets)
+        serverColumns.update_totals(ring.head)
+
+    def read_legacy_columns(self, ring: BucketRing, serverId: int, storedWindows: list[int]):
+        """Reads the slots and minutes of a single server as stored by versions 1 and 2 and adds them to the ring.
+        The stored totals are skipped. Without a server ID, the combined minutes are skipped as well, since adding the
+        minutes of the servers already adds them to the combined ones."""
+        numSlots = self.read_varint()
+        playerIndices = self.read_array(numSlots)
+        minutes = self.read_array(numSlots * ring.numBuckets)
+        for _ in storedWindows:
+            self.read_array(numSlots)
+        if serverId is None:
+            return
+        for slot, playerIndex in enumerate(playerIndices):
+            for column in range(ring.numBuckets):
+                if minutes[slot * ring.numBuckets + column] > 0:
+                    bucket = (column - ring.head) % ring.numBuckets
+                    ring.add_minutes(bucket, serverId, playerIndex, minutes[slot * ring.numBuckets + column])
+
+
+def from_binary(data: bytes | BinaryIO) -> OnlineTimeTracker:
+    """Loads a snapshot from the given bytes or binary stream, e.g. an open file, which is read in chunks"""
+    stream = io.BytesIO(data) if isinstance(data, (bytes, bytearray, memoryview)) else data
+    header = stream.read(len(MAGIC) + 2)
+    if not is_binary_snapshot(header) or len(header) < len(MAGIC) + 2:
+        raise ValueError("The data are not a time tracker snapshot")
+    version, flags = header[len(MAGIC)], header[len(MAGIC) + 1]
+    if version not in [1, 2, VERSION]:
+        raise ValueError(f"Unsupported snapshot version {version}")
+    reader = SnapshotReader(stream, zlib.decompressobj() if flags & FLAG_COMPRESSED else None)
+
+    lastUpdateOrdinal = reader.read_varint()
+    sessionCount = reader.read_varint()
+    timeTracker = OnlineTimeTracker.create_new(reader.read_varint())
+    timeTracker.lastUpdate = datetime.date.fromordinal(lastUpdateOrdinal) if lastUpdateOrdinal > 0 else None
+    timeTracker.sessionCount = sessionCount
+
+    numPlayers = reader.read_varint()
+    timeTracker.playerNames = [str(reader.read_bytes(reader.read_varint()), "utf-8") for _ in range(numPlayers)]
+    timeTracker.playerIndices = {playerName: index for index, playerName in enumerate(timeTracker.playerNames)}
+
+    if version >= 3:
+        for _ in range(reader.read_varint()):
+            serverId = reader.read_varint()
+            timeTracker.serverSlots[serverId] = PlayerSlots()
+            reader.read_slots(timeTracker.serverSlots[serverId])
+        reader.read_slots(timeTracker.combinedSlots)
+    for playerSlots in [*timeTracker.serverSlots.values(), timeTracker.combinedSlots]:
+        if any(playerIndex >= numPlayers for playerIndex in playerSlots.playerIndices):
+            raise ValueError("The snapshot references unknown players")
+
+    for ringName in RING_NAMES:
+        ring: BucketRing = getattr(timeTracker, ringName)
+        numBuckets = reader.read_varint()
+        if numBuckets != ring.numBuckets:
+            raise ValueError(f"The snapshot stores {numBuckets} {ringName} rather than {ring.numBuckets}")
+        ring.head = reader.read_varint()
+        if version >= 3:
+            for _ in range(reader.read_varint()):
+                serverId = reader.read_varint()
+                if serverId not in timeTracker.serverSlots:
+                    raise ValueError(f"The snapshot stores no slots for server {serverId}")
+                reader.read_columns(ring, ring.get_server_columns(serverId))
+            reader.read_columns(ring, ring.combined)
+            continue
+        if version == 1:
+            storedWindows = sorted({min(window, numBuckets) for window in V1_WINDOWS[ringName]} | {numBuckets})
+        else:
+            storedWindows = [reader.read_varint() for _ in range(reader.read_varint())]
+        for _ in range(reader.read_varint()):
+            reader.read_legacy_columns(ring, reader.read_varint(), storedWindows)
+        reader.read_legacy_columns(ring, None, storedWindows)
+    return timeTracker
+
+
+def json_to_binary(jsonString: str, compress: bool = True) -> bytes:
+    return to_binary(OnlineTimeTracker.from_json(jsonString), compress)
+
+
+def binary_to_json(data: bytes, indent=None) -> str:
+    return from_binary(data).to_json(indent)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Converts time tracker snapshots between JSON and the binary format")
+    parser.add_argument("direction", choices=["to-binary", "to-json"])
+    parser.add_argument("inputFile")
+    parser.add_argument("outputFile")
+    parser.add_argument("--uncompressed", action="store_true", help="Do not compress binary snapshots")
+    args = parser.parse_args()
+
+    if args.direction == "to-binary":
+        with open(args.inputFile, "r") as file:
+            data = json_to_binary(file.read(), compress=not args.uncompressed)
+        with open(args.outputFile, "wb") as file:
+            file.write(data)
+    else:
+        with open(args.inputFile, "rb") as file:
+            jsonString = from_binary(file).to_json()
+        with open(args.outputFile, "w") as file:
+            file.write(jsonString)
+
+
+if __name__ == "__main__":
+    main()
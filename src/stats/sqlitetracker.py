@@ -0,0 +1,243 @@
+from stats.statstracker import OnlineTimeTracker, StatsWindow, StatsWindows, ROLLUP_LEVELS, get_week, get_month
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Iterator
+import datetime
+import json
+import sqlite3
+import traceback
+
+# The primary key doubles as the index on (server, day)
+CREATE_TABLES = """
+CREATE TABLE IF NOT EXISTS online_times (
+    server_id INTEGER NOT NULL,
+    day INTEGER NOT NULL,
+    player TEXT NOT NULL,
+    minutes INTEGER NOT NULL,
+    PRIMARY KEY (server_id, day, player)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS online_times_player ON online_times (player, day);
+CREATE TABLE IF NOT EXISTS imported_rollups (
+    level TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    server_id INTEGER NOT NULL,
+    player TEXT NOT NULL,
+    minutes INTEGER NOT NULL,
+    PRIMARY KEY (level, bucket, server_id, player)
+) WITHOUT ROWID;
+"""
+
+ADD_MINUTES = """
+INSERT INTO online_times (server_id, day, player, minutes) VALUES (?, ?, ?, ?)
+ON CONFLICT (server_id, day, player) DO UPDATE SET minutes = minutes + excluded.minutes
+"""
+
+ADD_ROLLUP_MINUTES = """
+INSERT INTO imported_rollups (level, bucket, server_id, player, minutes) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (level, bucket, server_id, player) DO UPDATE SET minutes = minutes + excluded.minutes
+"""
+
+# Imported rollups only count for windows of their own level, days windows never match any of them
+GET_TOTAL_STATS = """
+SELECT player, SUM(minutes) FROM (
+    SELECT player, minutes FROM online_times
+    WHERE server_id IN (SELECT value FROM json_each(:serverIds)) AND day >= :firstDay
+    UNION ALL
+    SELECT player, minutes FROM imported_rollups
+    WHERE level = :level AND bucket >= :firstBucket AND server_id IN (SELECT value FROM json_each(:serverIds))
+)
+GROUP BY player HAVING SUM(minutes) > 0
+"""
+
+GET_SERVER_STATS = """
+SELECT player, SUM(minutes) FROM (
+    SELECT player, minutes FROM online_times WHERE server_id = :serverId AND day >= :firstDay
+    UNION ALL
+    SELECT player, minutes FROM imported_rollups
+    WHERE level = :level AND bucket >= :firstBucket AND server_id = :serverId
+)
+GROUP BY player HAVING SUM(minutes) > 0
+"""
+
+GET_ONLINE_TIME = """
+SELECT
+    (SELECT COALESCE(SUM(minutes), 0) FROM online_times WHERE player = :player AND day >= :firstDay) +
+    (SELECT COALESCE(SUM(minutes), 0) FROM imported_rollups
+     WHERE level = :level AND bucket >= :firstBucket AND player = :player)
+"""
+
+GET_ALL_ROWS = "SELECT server_id, day, player, minutes FROM online_times ORDER BY day"
+
+GET_ALL_ROLLUPS = "SELECT level, bucket, server_id, player, minutes FROM imported_rollups"
+
+GET_DAILY_ROWS = """
+SELECT day, server_id, player, minutes FROM online_times
+WHERE server_id IN (SELECT value FROM json_each(?)) AND day BETWEEN ? AND ? AND minutes > 0
+ORDER BY day, server_id
+"""
+
+
+def get_first_day(window: StatsWindow, today: datetime.date) -> int:
+    """Calculates the ordinal of the first day which belongs to the given window"""
+    if window.level == "days":
+        return today.toordinal() - (window.numBuckets - 1)
+    if window.level == "weeks":
+        return (get_week(today) - (window.numBuckets - 1)) * 7 + 1
+    if window.level == "months":
+        firstMonth = get_month(today) - (window.numBuckets - 1)
+        return datetime.date(firstMonth // 12, firstMonth % 12 + 1, 1).toordinal()
+    return 0
+
+
+def get_bucket(level: str, date: datetime.date) -> int:
+    """Calculates the absolute number of the week or month which contains the given date"""
+    if level == "weeks":
+        return get_week(date)
+    if level == "months":
+        return get_month(date)
+    return 0
+
+
+def get_query_parameters(window: StatsWindow, today: datetime.date) -> dict:
+    """Calculates the first day and, for rollup levels, the first imported bucket which belong to the given window"""
+    return {
+        "firstDay": get_first_day(window, today), "level": window.level,
+        "firstBucket": get_bucket(window.level, today) - (window.numBuckets - 1)}
+
+
+class SqliteTimeTracker:
+    """This class stores online times in an SQLite database with one row per server, day and player.
+    It can be used in place of the OnlineTimeTracker and answers the same queries, for any window, through SQL.
+    Weeks, months and all-time totals which were imported from an in-memory tracker, but are older than its days,
+    are kept in a separate table of rollups, since their days are unknown.
+
+    Online times are written by a single background thread, so adding them never blocks the caller.
+    Queries block until the database answered, so they should be run in a separate thread as well."""
+
+    def __init__(self, filePath: str):
+        self.sessionCount = 0  # Only used for identifying sessions in events, since the database needs no journal
+        self.lock = Lock()
+        self.connection = sqlite3.connect(filePath, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(CREATE_TABLES)
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="SqliteTimeTracker")
+
+    def is_empty(self) -> bool:
+        with self.lock:
+            return self.connection.execute(
+                "SELECT 1 FROM online_times UNION ALL SELECT 1 FROM imported_rollups LIMIT 1").fetchone() is None
+
+    def add_online_time(self, serverId: int, playerName: str, onlineTime: int, date: datetime.date = None):
+        """Adds an online time for the given player for the given date (default: today) in the background"""
+        date = date or datetime.date.today()
+        self.sessionCount += 1
+        self.writer.submit(self.add_rows, [(serverId, date.toordinal(), playerName, onlineTime)])
+
+    def add_rows(self, rows: list[tuple[int, int, str, int]], rollups: list[tuple[str, int, int, str, int]] = ()):
+        """Stores the given daily rows and imported rollups within a single transaction"""
+        try:
+            with self.lock, self.connection:
+                self.connection.executemany(ADD_MINUTES, rows)
+                self.connection.executemany(ADD_ROLLUP_MINUTES, rollups)
+        except Exception:
+            print(f"[WARN ] [SqliteTimeTracker] Failed storing {len(rows)} online times: {traceback.format_exc()}", flush=True)
+            raise
+
+    def flush(self):
+        """Waits until all online times which were added so far are stored"""
+        self.writer.submit(lambda: None).result()
+
+    def close(self):
+        self.writer.shutdown(wait=True)
+        with self.lock:
+            self.connection.close()
+
+    def get_total_stats(
+            self, serverIds: list[int], window: StatsWindow = StatsWindows.default,
+            today: datetime.date = None) -> dict[str, int]:
+        """Counts the total online times for each player within the given window, independent of the server"""
+        parameters = get_query_parameters(window, today or datetime.date.today())
+        with self.lock:
+            return dict(self.connection.execute(GET_TOTAL_STATS, {**parameters, "serverIds": json.dumps(list(serverIds))}))
+
+    def get_server_stats(
+            self, serverId: int, window: StatsWindow = StatsWindows.default,
+            today: datetime.date = None) -> dict[str, int]:
+        """Counts the total online times for each player within the given window, but for a single server only"""
+        parameters = get_query_parameters(window, today or datetime.date.today())
+        with self.lock:
+            return dict(self.connection.execute(GET_SERVER_STATS, {**parameters, "serverId": serverId}))
+
+    def get_online_time(
+            self, playerName: str, window: StatsWindow = StatsWindows.default, today: datetime.date = None) -> int:
+        parameters = get_query_parameters(window, today or datetime.date.today())
+        with self.lock:
+            return self.connection.execute(GET_ONLINE_TIME, {**parameters, "player": playerName}).fetchone()[0]
+
+    def iter_daily_online_times(
+            self, serverIds: set[int] = None, startDate: datetime.date = None,
+            endDate: datetime.date = None) -> Iterator[tuple[datetime.date, int, str, int]]:
+        """Yields the date, server ID, player name and online time of every stored day, oldest day first.
+        Imported rollups are not included, since they do not belong to a single day.
+        Rows are fetched from the cursor one by one. The database stays locked until the iteration finished."""
+        if serverIds is None:
+            with self.lock:
+                serverIds = [row[0] for row in self.connection.execute("SELECT DISTINCT server_id FROM online_times")]
+        firstDay = startDate.toordinal() if startDate is not None else 0
+        lastDay = endDate.toordinal() if endDate is not None else datetime.date.max.toordinal()
+        with self.lock:
+            cursor = self.connection.execute(GET_DAILY_ROWS, (json.dumps(sorted(serverIds)), firstDay, lastDay))
+            for day, serverId, playerName, minutes in cursor:
+                yield datetime.date.fromordinal(day), serverId, playerName, minutes
+
+    ### Conversion ###
+
+    def import_tracker(self, timeTracker: OnlineTimeTracker):
+        """Imports the data of an in-memory time tracker, e.g. when migrating from JSON.
+        Every day is imported as it is. Online times which are only known per week, month or in total, because they
+        are older than the tracked days, are imported as rollups of their week or month, so every window keeps its
+        totals. Everything is stored in a single transaction."""
+        rows: list[tuple[int, int, str, int]] = []
+        dailyTotals: dict[tuple[str, int, int, str], int] = {}
+        lastUpdate = timeTracker.lastUpdate or datetime.date.today()
+        for day, onlineTimesPerServer in timeTracker.get_bucket_data(timeTracker.days).items():
+            date = lastUpdate - datetime.timedelta(days=day)
+            for serverId, onlineTimes in onlineTimesPerServer.items():
+                for playerName, minutes in onlineTimes.items():
+                    rows.append((serverId, date.toordinal(), playerName, minutes))
+                    for level in ROLLUP_LEVELS:
+                        key = (level, get_bucket(level, date), serverId, playerName)
+                        dailyTotals[key] = dailyTotals.get(key, 0) + minutes
+
+        rollups: list[tuple[str, int, int, str, int]] = []
+        for level in ROLLUP_LEVELS:
+            lastBucket = get_bucket(level, lastUpdate)
+            for bucket, onlineTimesPerServer in timeTracker.get_bucket_data(getattr(timeTracker, level)).items():
+                for serverId, onlineTimes in onlineTimesPerServer.items():
+                    for playerName, minutes in onlineTimes.items():
+                        key = (level, lastBucket - bucket, serverId, playerName)
+                        olderMinutes = minutes - dailyTotals.get(key, 0)
+                        if olderMinutes > 0:
+                            rollups.append((*key, olderMinutes))
+        self.add_rows(rows, rollups)
+
+    def to_tracker(self) -> OnlineTimeTracker:
+        """Creates an in-memory time tracker with all data of the database, e.g. for exporting them as JSON"""
+        timeTracker = OnlineTimeTracker.create_new()
+        with self.lock:
+            rows = self.connection.execute(GET_ALL_ROWS).fetchall()
+            rollups = self.connection.execute(GET_ALL_ROLLUPS).fetchall()
+        for serverId, day, playerName, minutes in rows:
+            timeTracker.add_online_time(serverId, playerName, minutes, datetime.date.fromordinal(day))
+        lastUpdate = timeTracker.lastUpdate or datetime.date.today()
+        for level, bucket, serverId, playerName, minutes in rollups:
+            relativeBucket = get_bucket(level, lastUpdate) - bucket
+            if relativeBucket >= 0:
+                ring = getattr(timeTracker, level)
+                ring.add_minutes(relativeBucket, serverId, timeTracker.intern_player(playerName), minutes)
+        timeTracker.sessionCount = self.sessionCount
+        return timeTracker
+
+    def to_json(self, indent=None) -> str:
+        return self.to_tracker().to_json(indent)
@@ -1,20 +1,111 @@
 import discord
 import asyncio
 import datetime
+import heapq
 import traceback
 from threading import Lock
-from stats.statstracker import OnlineTimeTracker
+from stats.statstracker import OnlineTimeTracker, StatsWindow, StatsWindows
+from stats.sqlitetracker import SqliteTimeTracker
+from discord.objectresolver import get_channel, get_partial_message
+
+DESCRIPTION_LIMIT = 4096  # The maximum length of an embed description
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 50  # Larger pages would often be truncated to fit the description
+
+
+def get_leaderboard_page(onlineTimes: dict[str, int], pageSize: int, page: int) -> list[tuple[str, int]]:
+    """Selects the players of the given page, most online time first.
+    Only the players up to the given page are ranked, so the cost grows with the page rather than with all players."""
+    ranking = heapq.nsmallest((page + 1) * pageSize, onlineTimes.items(), key=lambda item: (-item[1], item[0]))
+    return ranking[page * pageSize:]
+
+
+def build_leaderboard_text(
+        header: str, entries: list[tuple[str, int]], firstRank: int, limit: int = DESCRIPTION_LIMIT) -> str:
+    """Joins the entries of a leaderboard page. Entries which would exceed the limit are left out and summarized.
+    The length is measured in UTF-8 bytes, which is never less than the length discord counts."""
+    lines = [header]
+    length = len(header.encode())
+    reservedLength = len(f"\r\n    ... and {len(entries)} more".encode())
+    for index, (player, onlineTime) in enumerate(entries):
+        line = f"\r\n    {firstRank + index}. **{player}**: {onlineTime} minutes"
+        lineLength = len(line.encode())
+        # Keep room for the summary unless this is the last entry
+        if length + lineLength + (reservedLength if index < len(entries) - 1 else 0) > limit:
+            lines.append(f"\r\n    ... and {len(entries) - index} more")
+            break
+        lines.append(line)
+        length += lineLength
+    return "".join(lines)
+
+
+class StatsEmbedConfig:
+    """This class stores the location of a single stats embed"""
+
+    def __init__(
+            self, channelId: int, embedId: int, color: str = "FFFFFF", window: str = StatsWindows.default.name,
+            pageSize: int = DEFAULT_PAGE_SIZE):
+        self.channelId = channelId
+        self.embedId = embedId
+        self.color = color
+        self.window = window  # The name of the StatsWindow to be displayed
+        self.pageSize = pageSize  # The amount of players per page
+        self.page = 0  # The page which is currently displayed. Not persisted.
+        self.guildId: int = None  # Resolved on first use
+        self.embed: discord.PartialMessage = None  # Resolved on first use
+        self.renderedContent: tuple = None  # The content which was last sent to discord
+
+
+class StatsCacheEntry:
+    """The online times of a set of servers within a window, and the leaderboard pages rendered from them"""
+
+    def __init__(self, date: datetime.date, data: dict[str, int]):
+        self.date = date  # The day the online times were retrieved on. Windows move along with the day.
+        self.updatedAt = datetime.datetime.now()
+        self.data = data
+        self.pages: dict[tuple[int, int], str] = {}  # The text of each page, by page size and page
+
+
+class LeaderboardView(discord.ui.View):
+    """Buttons for paging through the leaderboard of a stats embed"""
+
+    def __init__(self, statsReporter, embedConfig: StatsEmbedConfig, page: int, numPages: int):
+        super().__init__(timeout=None)
+        self.statsReporter = statsReporter
+        self.embedConfig = embedConfig
+        previousButton = discord.ui.Button(
+            label="◀", style=discord.ButtonStyle.secondary, disabled=page == 0,
+            custom_id=f"fssb_stats_{embedConfig.embedId}_previous")
+        previousButton.callback = self.show_previous_page
+        pageButton = discord.ui.Button(
+            label=f"{page + 1}/{numPages}", style=discord.ButtonStyle.secondary, disabled=True,
+            custom_id=f"fssb_stats_{embedConfig.embedId}_page")
+        nextButton = discord.ui.Button(
+            label="▶", style=discord.ButtonStyle.secondary, disabled=page >= numPages - 1,
+            custom_id=f"fssb_stats_{embedConfig.embedId}_next")
+        nextButton.callback = self.show_next_page
+        self.add_item(previousButton)
+        self.add_item(pageButton)
+        self.add_item(nextButton)
+
+    async def show_previous_page(self, interaction: discord.Interaction):
+        await self.statsReporter.change_page(interaction, self.embedConfig, -1)
+
+    async def show_next_page(self, interaction: discord.Interaction):
+        await self.statsReporter.change_page(interaction, self.embedConfig, 1)
+
 
 class StatsReporter:
     """This class is responsible for displaying the online times of players during the last couple of days"""
 
     def __init__(self, discordClient: discord.Client):
         self.discordClient = discordClient
-        self.timeTracker: OnlineTimeTracker = None
+        self.timeTracker: OnlineTimeTracker | SqliteTimeTracker = None
         self.task: asyncio.Task = None
-        self.enabled: bool = False
-        self.embeds: list [discord.Message] = []
+        self.embeds: list [StatsEmbedConfig] = []
         self.guildToServerMap: dict [int, list[int]] = {}
+        self.statsCache: dict[tuple[tuple[int, ...], str], StatsCacheEntry] = {}
+        self.invalidations = 0  # Counts invalidations, so data retrieved during an invalidation are not cached
         self.lock: Lock = Lock()
         self.debug = False
         
@@ -22,20 +113,57 @@ class StatsReporter:
         if self.debug == True:
             print(f"[DEBUG] [StatsReporter] {message}")
 
-    def set_time_tracker(self, timeTracker: OnlineTimeTracker):
+    def set_time_tracker(self, timeTracker: OnlineTimeTracker | SqliteTimeTracker):
         with self.lock:
             self.timeTracker = timeTracker
+            self.invalidate_cache()
 
     def update_guild_to_server_map(self, guildToServerMap: dict [int, list[int]]):
         with self.lock:
             self.guildToServerMap = guildToServerMap
+            self.invalidate_cache()
+
+    def on_stats_updated(self, serverId: int):
+        """Drops the cached online times of every set of servers which contains the updated server"""
+        with self.lock:
+            self.invalidations += 1
+            for key in [key for key in self.statsCache if serverId in key[0]]:
+                del self.statsCache[key]
+
+    def invalidate_cache(self):
+        self.invalidations += 1
+        self.statsCache.clear()
 
-    async def add_embed(self, interaction):
+    async def add_embed(self, interaction, window: str = StatsWindows.default.name):
         embed = discord.Embed(title="Pending...", color=int("FFFFFF", 16))
+        message = await interaction.channel.send(embed=embed)
+        embedConfig = StatsEmbedConfig(interaction.channel.id, message.id, window=window)
+        embedConfig.guildId = interaction.guild_id
         with self.lock:
-            self.embeds.append(await interaction.channel.send(embed=embed))
+            self.embeds.append(embedConfig)
 
-    def restore_embeds(self, embeds):
+    def get_guild_embeds(self, guild: discord.Guild) -> list[StatsEmbedConfig]:
+        with self.lock:
+            return [
+                embedConfig for embedConfig in self.embeds
+                if embedConfig.guildId == guild.id or guild.get_channel(embedConfig.channelId) is not None]
+
+    def set_window(self, guild: discord.Guild, window: str) -> int:
+        """Changes the window displayed by all stats embeds of the given guild and returns the amount of changed embeds"""
+        guildEmbeds = self.get_guild_embeds(guild)
+        for embedConfig in guildEmbeds:
+            embedConfig.window = window
+        return len(guildEmbeds)
+
+    def set_page_size(self, guild: discord.Guild, pageSize: int) -> int:
+        """Changes the amount of players per page for all stats embeds of the given guild"""
+        guildEmbeds = self.get_guild_embeds(guild)
+        for embedConfig in guildEmbeds:
+            embedConfig.pageSize = pageSize
+            embedConfig.page = 0
+        return len(guildEmbeds)
+
+    def restore_embeds(self, embeds: list[StatsEmbedConfig]):
         with self.lock:
             self.embeds = embeds
         
@@ -43,82 +171,139 @@ class StatsReporter:
 
     def start(self):
         if self.task is None:
-            self.enabled = True
             self.task = asyncio.create_task(self.update_panel())
 
     def stop(self):
         if self.task is not None:
-            self.enabled = False
+            self.task.cancel()
 
     async def wait_for_completion(self):
-        counter = 0
-        while counter < 70 and not self.task.done():
-            await asyncio.sleep(1)
-            counter += 1
-        self.task = None
+        if self.task is not None:
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
 
     ### Discord update ###
 
     async def update_panel(self):
         self.debugPrint("Processing has started")
-        while self.enabled == True:
-            # Sleep 60 seconds, but abort at any time when requested
-            for _ in range(1, 60):
-                await asyncio.sleep(1)
-                if self.enabled == False:
-                    self.debugPrint("Aborting StatsReporter")
-                    return
-
-            self.debugPrint("Waking up")
-            with self.lock:
-                if not self.timeTracker:
-                    self.debugPrint("No time tracker - skipping")
-                    continue
-                embedListCopy = list(self.embeds)
-                guildToServerMapCopy = dict(self.guildToServerMap)
-
-            self.debugPrint("Starting to update embeds")
-            for embedMessage in embedListCopy:
-                guildId = int(embedMessage.guild.id)
-                if guildId not in guildToServerMapCopy:
-                    self.debugPrint("No server found for embed - skipping")
-                    self.debugPrint(guildToServerMapCopy)
-                    self.debugPrint(guildId)
-                    continue
-                serverIds = guildToServerMapCopy[guildId]
-                try:
-                    data = self.timeTracker.get_total_stats(serverIds)
-                except Exception:
-                    print(f"[WARN ] [StatsReporter] Failed retrieving total stats for guild id {guildId}: {traceback.format_exc()}",
-                        flush=True)
-                    continue
-                
-                message = "Online times within the last 14 days:\r\n"
-                sortedOnlineTimes = dict(sorted(data.items(), key=lambda item: item[1], reverse=True))
-                for player, onlineTime in sortedOnlineTimes.items():
-                    message += f"\r\n    **{player}**: {onlineTime} minutes"
-
-                # Update the embed
-                try:
-                    self.debugPrint("Updating embed")
-                    newEmbed = discord.Embed(
-                        title=f"Online times",
-                        description=message,
-                        color=embedMessage.embeds[0].color
-                    )
-                    self.debugPrint("Adding last update field")
-                    newEmbed.add_field(name="Last Update", value=f"{datetime.datetime.now()}")
-                    self.debugPrint("Updating embed")
-                    await embedMessage.edit(embed=newEmbed)
-                except Exception:
-                    print(
-                        f"[WARN ] [StatsReporter] Could not update embed for guild {guildId}: {traceback.format_exc()}",
-                        flush=True
-                    )
-
-                # don't spam discord
-                await asyncio.sleep(3)
-
-        print("[INFO ] [StatsReporter] StatsReporter was aborted", flush=True)
+        try:
+            while True:
+                await self.update_all_embeds()
+                await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            print("[INFO ] [StatsReporter] StatsReporter was aborted", flush=True)
+            raise
+
+    async def update_all_embeds(self):
+        """Updates the stats embed of every guild"""
+        self.debugPrint("Waking up")
+        with self.lock:
+            if not self.timeTracker:
+                self.debugPrint("No time tracker - skipping")
+                return
+            embedListCopy = list(self.embeds)
+            guildToServerMapCopy = dict(self.guildToServerMap)
+
+        self.debugPrint("Starting to update embeds")
+        for embedConfig in embedListCopy:
+            try:
+                await self.resolve_embed(embedConfig)
+            except Exception:
+                print(f"[WARN ] [StatsReporter] Failed resolving stats embed {embedConfig.embedId}: {traceback.format_exc()}",
+                    flush=True)
+                continue
+            guildId = embedConfig.guildId
+            if guildId not in guildToServerMapCopy:
+                self.debugPrint("No server found for embed - skipping")
+                self.debugPrint(guildToServerMapCopy)
+                self.debugPrint(guildId)
+                continue
+            serverIds = guildToServerMapCopy[guildId]
+            try:
+                renderedContent = embedConfig.renderedContent
+                newEmbed, view = await self.render_embed(embedConfig, serverIds)
+            except Exception:
+                print(f"[WARN ] [StatsReporter] Failed retrieving total stats for guild id {guildId}: {traceback.format_exc()}",
+                    flush=True)
+                continue
+            if embedConfig.renderedContent == renderedContent:
+                self.debugPrint("Stats did not change - skipping")
+                continue
+
+            # Update the embed
+            try:
+                self.debugPrint("Updating embed")
+                await embedConfig.embed.edit(embed=newEmbed, view=view)
+            except Exception:
+                # Try again with the next update
+                embedConfig.renderedContent = None
+                print(
+                    f"[WARN ] [StatsReporter] Could not update embed for guild {guildId}: {traceback.format_exc()}",
+                    flush=True
+                )
+
+            # don't spam discord
+            await asyncio.sleep(3)
+
+    async def render_embed(
+            self, embedConfig: StatsEmbedConfig, serverIds: list[int]) -> tuple[discord.Embed, LeaderboardView]:
+        """Renders the current page of a stats embed. Buttons for paging are only added if there is more than one page."""
+        window = StatsWindows.get(embedConfig.window)
+        cacheEntry = await self.get_cache_entry(serverIds, window)
+        numPages = max(1, -(-len(cacheEntry.data) // embedConfig.pageSize))
+        page = embedConfig.page = min(embedConfig.page, numPages - 1)
+        if (embedConfig.pageSize, page) not in cacheEntry.pages:
+            entries = get_leaderboard_page(cacheEntry.data, embedConfig.pageSize, page)
+            cacheEntry.pages[(embedConfig.pageSize, page)] = build_leaderboard_text(
+                f"Online times ({window.description.lower()}):\r\n", entries, page * embedConfig.pageSize + 1)
+        message = cacheEntry.pages[(embedConfig.pageSize, page)]
+        embedConfig.renderedContent = (message, page, numPages)
+
+        newEmbed = discord.Embed(
+            title=f"Online times",
+            description=message,
+            color=int(embedConfig.color, 16)
+        )
+        newEmbed.add_field(name="Last Update", value=f"{cacheEntry.updatedAt}")
+        view = LeaderboardView(self, embedConfig, page, numPages) if numPages > 1 else None
+        return newEmbed, view
+
+    async def get_cache_entry(self, serverIds: list[int], window: StatsWindow) -> StatsCacheEntry:
+        """Retrieves the online times of the given servers, unless they did not change since they were last retrieved"""
+        key = (tuple(sorted(serverIds)), window.name)
+        today = datetime.date.today()
+        with self.lock:
+            cacheEntry = self.statsCache.get(key)
+            invalidations = self.invalidations
+        if cacheEntry is not None and cacheEntry.date == today:
+            return cacheEntry
+
+        cacheEntry = StatsCacheEntry(today, await self.get_total_stats(serverIds, window))
+        with self.lock:
+            # Online times which were updated while retrieving them might be missing
+            if self.invalidations == invalidations:
+                self.statsCache[key] = cacheEntry
+        return cacheEntry
+
+    async def change_page(self, interaction: discord.Interaction, embedConfig: StatsEmbedConfig, delta: int):
+        with self.lock:
+            serverIds = self.guildToServerMap.get(embedConfig.guildId, [])
+        embedConfig.page = max(0, embedConfig.page + delta)
+        newEmbed, view = await self.render_embed(embedConfig, serverIds)
+        await interaction.response.edit_message(embed=newEmbed, view=view)
+
+    async def get_total_stats(self, serverIds: list[int], window: StatsWindow) -> dict[str, int]:
+        """Queries the database in a separate thread. Data which are in memory are returned directly."""
+        if isinstance(self.timeTracker, SqliteTimeTracker):
+            return await asyncio.to_thread(self.timeTracker.get_total_stats, serverIds, window)
+        return self.timeTracker.get_total_stats(serverIds, window)
+
+    async def resolve_embed(self, embedConfig: StatsEmbedConfig):
+        """Resolves the discord objects of a stats embed. The guild is only fetched if the channel is not cached."""
+        if embedConfig.guildId is None:
+            channel = await get_channel(self.discordClient, embedConfig.channelId)
+            embedConfig.guildId = int(channel.guild.id)
+        if embedConfig.embed is None:
+            embedConfig.embed = get_partial_message(self.discordClient, embedConfig.channelId, embedConfig.embedId)
 
         
\ No newline at end of file
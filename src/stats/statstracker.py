@@ -1,5 +1,8 @@
+from array import array
+from typing import Iterator
 import datetime
 import json
+import operator
 from json import JSONEncoder, JSONDecoder
 
 
@@ -107,71 +110,483 @@ class DailyStats:
         return result
 
 
+def zeros(count: int) -> array:
+    return array("I", [0]) * count
+
+
+def append_zeros(values: array, count: int):
+    """Appends zeros without creating a temporary array, which is several times faster for small counts"""
+    values.frombytes(bytes(count * values.itemsize))
+
+
+def get_week(date: datetime.date) -> int:
+    """Numbers the weeks continuously, each week starting on a monday"""
+    return (date.toordinal() - 1) // 7
+
+
+def get_month(date: datetime.date) -> int:
+    """Numbers the months continuously"""
+    return date.year * 12 + date.month - 1
+
+
+NUM_DAYS = 30
+NUM_WEEKS = 13
+NUM_MONTHS = 12
+ROLLUP_LEVELS = ["weeks", "months", "allTime"]
+
+
+class StatsWindow:
+    """Describes a period of time which online times can be requested for"""
+
+    def __init__(self, name: str, description: str, level: str, numBuckets: int):
+        self.name = name
+        self.description = description
+        self.level = level  # The name of the bucket ring which stores the data for this window
+        self.numBuckets = numBuckets  # The amount of most recent buckets of that ring which make up the window
+
+
+class StatsWindows:
+    """Defines the windows which online times can be displayed for"""
+    today = StatsWindow("24h", "Today", "days", 1)
+    lastWeek = StatsWindow("7d", "Last 7 days", "days", 7)
+    lastTwoWeeks = StatsWindow("14d", "Last 14 days", "days", 14)
+    lastMonth = StatsWindow("30d", "Last 30 days", "days", NUM_DAYS)
+    lastQuarter = StatsWindow("13w", "Last 13 weeks", "weeks", NUM_WEEKS)
+    lastYear = StatsWindow("12m", "Last 12 months", "months", NUM_MONTHS)
+    allTime = StatsWindow("all", "All time", "allTime", 1)
+    default = lastTwoWeeks
+    available = [today, lastWeek, lastTwoWeeks, lastMonth, lastQuarter, lastYear, allTime]
+
+    @classmethod
+    def get(cls, name: str) -> StatsWindow:
+        for window in cls.available:
+            if window.name == name:
+                return window
+        return cls.default
+
+
+class PlayerSlots:
+    """This class assigns a slot to every player of a single server (or of all servers combined).
+    The slots are shared by all bucket rings, so every player is mapped only once per server."""
+
+    def __init__(self):
+        self.slots: dict[int, int] = {}  # Maps player indices to slots
+        self.playerIndices = array("I")  # Maps slots to player indices
+
+    def get_slot(self, playerIndex: int) -> int:
+        slot = self.slots.get(playerIndex)
+        if slot is None:
+            slot = len(self.playerIndices)
+            self.slots[playerIndex] = slot
+            self.playerIndices.append(playerIndex)
+        return slot
+
+
+class ServerColumns:
+    """This class stores the online times of all players of a single server for all buckets of a ring in one contiguous
+    buffer. Players are referenced by their slot (see PlayerSlots), and the minutes of a slot for a given bucket are
+    stored at index (slot * numBuckets + column). Mapping buckets to columns is up to the BucketRing.
+    For every window, i.e. the n most recent buckets, the sum is maintained for every slot, so totals can be looked up
+    rather than calculated. Slots are assigned by all rings, so storage for them is only allocated once this ring uses
+    them."""
+
+    def __init__(self, numBuckets: int, windows: list[int], playerSlots: PlayerSlots):
+        self.numBuckets = numBuckets
+        self.playerSlots = playerSlots
+        self.numRows = 0  # The amount of slots which storage was allocated for
+        self.minutes = array("I")
+        self.totals: dict[int, array] = {window: array("I") for window in windows}  # The sum per slot for each window
+        # The windows which contain each bucket, so adding minutes only updates their totals
+        self.bucketWindows = [[window for window in windows if bucket < window] for bucket in range(numBuckets)]
+
+    @property
+    def slots(self) -> dict[int, int]:
+        return self.playerSlots.slots
+
+    @property
+    def playerIndices(self) -> array:
+        return self.playerSlots.playerIndices
+
+    def add_rows(self, numRows: int):
+        """Allocates storage up to the given amount of slots"""
+        append_zeros(self.minutes, (numRows - self.numRows) * self.numBuckets)
+        for totals in self.totals.values():
+            append_zeros(totals, numRows - self.numRows)
+        self.numRows = numRows
+
+    def add_minutes(self, column: int, bucket: int, slot: int, minutes: int):
+        """Adds minutes to the given column for the given slot (see PlayerSlots)"""
+        if slot >= self.numRows:
+            # Allocate all slots which were assigned so far, since the next ones will most likely be used as well
+            self.add_rows(len(self.playerSlots.playerIndices))
+        self.minutes[slot * self.numBuckets + column] += minutes
+        totals = self.totals
+        for window in self.bucketWindows[bucket]:
+            totals[window][slot] += minutes
+
+    def get_minutes(self, slot: int, column: int) -> int:
+        index = slot * self.numBuckets + column
+        return self.minutes[index] if index < len(self.minutes) else 0
+
+    def iter_column(self, column: int) -> Iterator[tuple[int, int]]:
+        """Yields the slot and minutes of every slot with minutes in the given column"""
+        for slot, minutes in enumerate(self.minutes[column::self.numBuckets]):
+            if minutes > 0:
+                yield slot, minutes
+
+    def get_total(self, slot: int, window: int) -> int:
+        totals = self.totals[window]
+        return totals[slot] if slot < len(totals) else 0
+
+    def rotate(self, head: int):
+        """Turns the column at the given head, which stored the oldest bucket, into the column of a new, empty bucket.
+        All other buckets get one bucket older, so minutes leaving a window are removed from its totals."""
+        for window, totals in self.totals.items():
+            leavingMinutes = self.minutes[(head + window) % self.numBuckets::self.numBuckets]
+            if any(leavingMinutes):
+                self.totals[window] = array("I", map(operator.sub, totals, leavingMinutes))
+        self.minutes[head::self.numBuckets] = zeros(self.numRows)
+
+    def update_totals(self, head: int):
+        """Calculates the totals of all windows from the minutes, e.g. after loading the minutes"""
+        self.numRows = len(self.minutes) // self.numBuckets
+        # Windows of a few buckets are summed up column by column, the window of all buckets row by row
+        runningTotals = zeros(self.numRows)
+        for bucket in range(max((window for window in self.totals if window < self.numBuckets), default=0)):
+            column = (head + bucket) % self.numBuckets
+            runningTotals = array("I", map(operator.add, runningTotals, self.minutes[column::self.numBuckets]))
+            if bucket + 1 in self.totals:
+                self.totals[bucket + 1] = runningTotals
+        self.totals[self.numBuckets] = array("I", (
+            sum(self.minutes[start:start + self.numBuckets]) for start in range(0, len(self.minutes), self.numBuckets)))
+
+
+class SparseColumns(ServerColumns):
+    """Stores the online times of a ring like ServerColumns, but every column only contains the slots with minutes in
+    its bucket. Weeks and months use this, since most players are only online in a few of them. Totals are still
+    stored per slot."""
+
+    def __init__(self, numBuckets: int, windows: list[int], playerSlots: PlayerSlots):
+        super().__init__(numBuckets, windows, playerSlots)
+        self.columns: list[dict[int, int]] = [{} for _ in range(numBuckets)]  # Maps slots to minutes per column
+
+    def add_rows(self, numRows: int):
+        for totals in self.totals.values():
+            append_zeros(totals, numRows - self.numRows)
+        self.numRows = numRows
+
+    def add_minutes(self, column: int, bucket: int, slot: int, minutes: int):
+        if slot >= self.numRows:
+            self.add_rows(len(self.playerSlots.playerIndices))
+        columnMinutes = self.columns[column]
+        columnMinutes[slot] = columnMinutes.get(slot, 0) + minutes
+        totals = self.totals
+        for window in self.bucketWindows[bucket]:
+            totals[window][slot] += minutes
+
+    def get_minutes(self, slot: int, column: int) -> int:
+        return self.columns[column].get(slot, 0)
+
+    def iter_column(self, column: int) -> Iterator[tuple[int, int]]:
+        for slot, minutes in sorted(self.columns[column].items()):
+            if minutes > 0:
+                yield slot, minutes
+
+    def rotate(self, head: int):
+        for window, totals in self.totals.items():
+            for slot, minutes in self.columns[(head + window) % self.numBuckets].items():
+                totals[slot] -= minutes
+        self.columns[head] = {}
+
+    def update_totals(self, head: int):
+        self.numRows = max((slot + 1 for columnMinutes in self.columns for slot in columnMinutes), default=0)
+        runningTotals = zeros(self.numRows)
+        for bucket in range(self.numBuckets):
+            for slot, minutes in self.columns[(head + bucket) % self.numBuckets].items():
+                runningTotals[slot] += minutes
+            if bucket + 1 in self.totals:
+                self.totals[bucket + 1] = array("I", runningTotals)
+
+
+class BucketRing:
+    """This class stores online times in a ring of buckets which cover the same length of time each (a day, a week, ...),
+    once per server and once for all servers combined.
+    The most recent bucket is stored in column "head", the one before in column "head + 1" and so on.
+    Moving to a new bucket therefore only moves the head and clears a single column.
+    The slots of the players are shared with the other rings of the tracker."""
+
+    def __init__(self, numBuckets: int, windows: list[int], serverSlots: dict[int, PlayerSlots],
+                 combinedSlots: PlayerSlots, sparse: bool = False):
+        self.numBuckets = numBuckets
+        self.windows = sorted({min(window, numBuckets) for window in windows} | {numBuckets})
+        self.head = 0
+        self.serverSlots = serverSlots
+        self.columnsClass = SparseColumns if sparse else ServerColumns
+        self.servers: dict[int, ServerColumns] = {}
+        self.combined = self.columnsClass(numBuckets, self.windows, combinedSlots)  # The sum of all servers
+
+    def get_column(self, bucket: int) -> int:
+        """Retrieves the column which stores the given bucket (0 being the most recent one)"""
+        return (self.head + bucket) % self.numBuckets
+
+    def get_window(self, numBuckets: int) -> int:
+        """Limits a window to the buckets which are actually stored"""
+        return min(numBuckets, self.numBuckets)
+
+    def get_server_columns(self, serverId: int) -> ServerColumns:
+        serverColumns = self.servers.get(serverId)
+        if serverColumns is None:
+            playerSlots = self.serverSlots.setdefault(serverId, PlayerSlots())
+            serverColumns = self.servers[serverId] = self.columnsClass(self.numBuckets, self.windows, playerSlots)
+        return serverColumns
+
+    def add_minutes(self, bucket: int, serverId: int, playerIndex: int, minutes: int):
+        """Adds minutes to the given bucket (0 being the most recent one). Buckets which are no longer stored are ignored."""
+        serverColumns = self.get_server_columns(serverId)
+        self.add_slot_minutes(
+            bucket, serverColumns, serverColumns.playerSlots.get_slot(playerIndex),
+            self.combined.playerSlots.get_slot(playerIndex), minutes)
+
+    def add_slot_minutes(
+            self, bucket: int, serverColumns: ServerColumns, serverSlot: int, combinedSlot: int, minutes: int):
+        """Adds minutes like add_minutes, but for slots which the caller already looked up"""
+        if bucket >= self.numBuckets:
+            return
+        column = (self.head + bucket) % self.numBuckets
+        serverColumns.add_minutes(column, bucket, serverSlot, minutes)
+        self.combined.add_minutes(column, bucket, combinedSlot, minutes)
+
+    def shift(self, numBuckets: int):
+        """Moves to a new bucket the given amount of times. At most numBuckets columns are cleared."""
+        for _ in range(min(numBuckets, self.numBuckets)):
+            # The column of the oldest bucket becomes the column of the new bucket
+            self.head = (self.head - 1) % self.numBuckets
+            for serverColumns in self.servers.values():
+                serverColumns.rotate(self.head)
+            self.combined.rotate(self.head)
+
+
 class OnlineTimeTracker:
-    """This class keeps track of the online times of configured amount of days"""
+    """This class keeps track of the online times of players for several windows (see StatsWindows).
 
-    def __init__(self, stats: dict[int, DailyStats], lastUpdate: datetime.date):
-        self.stats = stats
+    Player names are interned, i.e. every name is stored only once and referenced by its index.
+    Online times are stored in rings of daily, weekly and monthly buckets as well as in an all-time accumulator,
+    so every window can be answered while memory stays bounded. Every ring uses the same slots per server, and weeks
+    and months only store the players who were online in a bucket.
+    Totals are maintained for every window on every change, so queries never need to sum up buckets."""
+
+    def __init__(self, stats: dict[int, DailyStats], lastUpdate: datetime.date, rollups: dict = None):
+        self.numDays = len(stats)
         self.lastUpdate = lastUpdate
+        self.sessionCount = 0  # The amount of sessions added through add_online_time, which identifies journal records
+        self.playerNames: list[str] = []
+        self.playerIndices: dict[str, int] = {}
+        self.serverSlots: dict[int, PlayerSlots] = {}
+        self.combinedSlots = PlayerSlots()
+        self.bucketsDate: datetime.date = None  # The last update which the cached buckets were looked up for
+        self.bucketsPerDay: dict[int, list[tuple[BucketRing, int]]] = {}
+        self.days = self.create_ring(self.numDays, "days")
+        self.weeks = self.create_ring(NUM_WEEKS, "weeks", sparse=True)
+        self.months = self.create_ring(NUM_MONTHS, "months", sparse=True)
+        self.allTime = self.create_ring(1, "allTime")
+        for day, dailyStats in stats.items():
+            for serverId in dailyStats.get_servers():
+                for playerName, onlineTime in dailyStats.get_server_stats(serverId).items():
+                    if rollups is None:
+                        # Older data only contain days, so weeks, months and the all-time totals are derived from them
+                        self.add_minutes(day, serverId, playerName, onlineTime)
+                    else:
+                        self.days.add_minutes(day, serverId, self.intern_player(playerName), onlineTime)
+        for level, buckets in (rollups or {}).items():
+            ring: BucketRing = getattr(self, level)
+            for bucketStr, servers in buckets.items():
+                for serverIdStr, onlineTimes in servers.items():
+                    for playerName, onlineTime in onlineTimes.items():
+                        ring.add_minutes(int(bucketStr), int(serverIdStr), self.intern_player(playerName), int(onlineTime))
 
     @classmethod
-    def create_new(cls, maxDays: int = 14):
+    def create_new(cls, maxDays: int = NUM_DAYS):
         stats: dict[int, DailyStats] = {
             i: DailyStats() for i in range(maxDays)}
         return cls(stats=stats, lastUpdate=None)
 
-    def get_online_time(self, playerName: str) -> int:
-        return sum(stats.get_online_time(playerName) for stats in self.stats.values())
-        
-    def get_total_stats(self, serverIds: list[int]) -> dict[str, int]:
-        """Counts the total online times for each player, independent of day and server"""
-        stats: dict[str, int] = {}
-        for dailyStats in self.stats.values():
-            for serverId in serverIds:
-                for playerName, onlineTime in dailyStats.get_server_stats(serverId).items():
-                    if playerName not in stats:
-                        stats[playerName] = 0
-                    stats[playerName] += onlineTime
-        return stats
-
-    def get_server_stats(self, serverId: int) -> dict[str, int]:
-        """Counts the total online times for each player, independent of the day, but for a single server only"""
-        stats: dict[str, int] = {}
-        for dailyStats in self.stats.values():
-            for playerName, onlineTime in dailyStats.get_server_stats(serverId).items():
-                if playerName not in stats:
-                    stats[playerName] = 0
-                stats[playerName] += onlineTime
+    @staticmethod
+    def get_windows(level: str) -> list[int]:
+        return [window.numBuckets for window in StatsWindows.available if window.level == level]
+
+    def create_ring(self, numBuckets: int, level: str, sparse: bool = False) -> BucketRing:
+        return BucketRing(numBuckets, self.get_windows(level), self.serverSlots, self.combinedSlots, sparse)
+
+    @property
+    def stats(self) -> dict[int, DailyStats]:
+        """Creates a copy of the daily data in the layout of one DailyStats object per day.
+        Players and servers are sorted so the result does not depend on the order in which data were added."""
+        stats: dict[int, DailyStats] = {day: DailyStats() for day in range(self.numDays)}
+        for day, onlineTimesPerServer in self.get_bucket_data(self.days).items():
+            for serverId, onlineTimes in onlineTimesPerServer.items():
+                for playerName, onlineTime in onlineTimes.items():
+                    stats[day].add_online_time(serverId, playerName, onlineTime)
+        for dailyStats in stats.values():
+            dailyStats.statsPerPlayer = {
+                playerName: dailyStats.statsPerPlayer[playerName] for playerName in sorted(dailyStats.statsPerPlayer)}
         return stats
 
-    def add_online_time(self, serverId: int, playerName: str, onlineTime: int):
-        """Adds an online time for the given player for today"""
-        today = datetime.date.today()
+    def get_bucket_data(self, ring: BucketRing) -> dict[int, dict[int, dict[str, int]]]:
+        """Retrieves the online times of each player on each server for each non-empty bucket of the given ring.
+        Servers and players are sorted."""
+        data: dict[int, dict[int, dict[str, int]]] = {}
+        for serverId in sorted(ring.servers):
+            serverColumns = ring.servers[serverId]
+            playerIndices = serverColumns.playerIndices
+            for bucket in range(ring.numBuckets):
+                onlineTimes = sorted(
+                    (self.playerNames[playerIndices[slot]], minutes)
+                    for slot, minutes in serverColumns.iter_column(ring.get_column(bucket)))
+                if onlineTimes:
+                    data.setdefault(bucket, {})[serverId] = dict(onlineTimes)
+        return dict(sorted(data.items()))
+
+    def iter_daily_online_times(
+            self, serverIds: set[int] = None, startDate: datetime.date = None,
+            endDate: datetime.date = None) -> Iterator[tuple[datetime.date, int, str, int]]:
+        """Yields the date, server ID, player name and online time of every tracked day, oldest day first.
+        Entries are produced one by one, so the whole data set never needs to be kept in memory."""
+        if self.lastUpdate is None:
+            return
+        for day in reversed(range(self.days.numBuckets)):
+            date = self.lastUpdate - datetime.timedelta(days=day)
+            if (startDate is not None and date < startDate) or (endDate is not None and date > endDate):
+                continue
+            column = self.days.get_column(day)
+            for serverId in sorted(self.days.servers):
+                if serverIds is not None and serverId not in serverIds:
+                    continue
+                serverColumns = self.days.servers[serverId]
+                for slot, minutes in serverColumns.iter_column(column):
+                    yield date, serverId, self.playerNames[serverColumns.playerIndices[slot]], minutes
+
+    def intern_player(self, playerName: str) -> int:
+        playerIndex = self.playerIndices.get(playerName)
+        if playerIndex is None:
+            playerIndex = len(self.playerNames)
+            self.playerIndices[playerName] = playerIndex
+            self.playerNames.append(playerName)
+        return playerIndex
+
+    def get_ring(self, window: StatsWindow) -> BucketRing:
+        return getattr(self, window.level)
+
+    def add_minutes(self, day: int, serverId: int, playerName: str, onlineTime: int):
+        """Adds an online time for the given player on the given day (0 being the most recent one).
+        The time is added to the week and month which contain that day, as well as to the all-time totals."""
+        playerIndex = self.intern_player(playerName)
+        buckets = self.get_buckets(day)
+        # The slots are shared by all rings, so they are only looked up once
+        playerSlots = self.serverSlots.get(serverId)
+        if playerSlots is None:
+            playerSlots = self.serverSlots[serverId] = PlayerSlots()
+        serverSlot = playerSlots.get_slot(playerIndex)
+        combinedSlot = self.combinedSlots.get_slot(playerIndex)
+        for ring, bucket in buckets:
+            column = (ring.head + bucket) % ring.numBuckets
+            serverColumns = ring.servers.get(serverId) or ring.get_server_columns(serverId)
+            serverColumns.add_minutes(column, bucket, serverSlot, onlineTime)
+            ring.combined.add_minutes(column, bucket, combinedSlot, onlineTime)
+
+    def get_buckets(self, day: int) -> list[tuple[BucketRing, int]]:
+        """Retrieves the ring and bucket of every ring which stores the given day (0 being the most recent one).
+        They only change along with the last update, so they are cached for all days until then."""
+        referenceDate = self.lastUpdate or datetime.date.today()
+        if referenceDate != self.bucketsDate:
+            self.bucketsDate = referenceDate
+            self.bucketsPerDay = {}
+        buckets = self.bucketsPerDay.get(day)
+        if buckets is None:
+            date = referenceDate - datetime.timedelta(days=day)
+            buckets = self.bucketsPerDay[day] = [
+                (ring, bucket) for ring, bucket in [
+                    (self.days, day), (self.weeks, get_week(referenceDate) - get_week(date)),
+                    (self.months, get_month(referenceDate) - get_month(date)), (self.allTime, 0)]
+                if bucket < ring.numBuckets]
+        return buckets
+
+    def get_online_time(self, playerName: str, window: StatsWindow = StatsWindows.default) -> int:
+        playerIndex = self.playerIndices.get(playerName)
+        ring = self.get_ring(window)
+        if playerIndex is None or playerIndex not in ring.combined.slots:
+            return 0
+        return ring.combined.get_total(ring.combined.slots[playerIndex], ring.get_window(window.numBuckets))
+
+    def get_total_stats(self, serverIds: list[int], window: StatsWindow = StatsWindows.default) -> dict[str, int]:
+        """Counts the total online times for each player within the given window, independent of the server"""
+        ring = self.get_ring(window)
+        numBuckets = ring.get_window(window.numBuckets)
+        trackedServerIds = [serverId for serverId in set(serverIds) if serverId in ring.servers]
+        if len(trackedServerIds) == 1:
+            return self.get_server_stats(trackedServerIds[0], window)
+
+        if len(trackedServerIds) == len(ring.servers):
+            # Every server is requested, so the combined totals can be used as they are
+            playerIndices = ring.combined.playerIndices
+            totals = ring.combined.totals[numBuckets]
+        else:
+            playerIndices = range(len(self.playerNames))
+            totals = zeros(len(self.playerNames))
+            for serverId in trackedServerIds:
+                serverColumns = ring.servers[serverId]
+                for playerIndex, onlineTime in zip(serverColumns.playerIndices, serverColumns.totals[numBuckets]):
+                    totals[playerIndex] += onlineTime
+        playerNames = self.playerNames
+        return {
+            playerNames[playerIndex]: onlineTime for playerIndex, onlineTime in zip(playerIndices, totals) if onlineTime > 0}
+
+    def get_server_stats(self, serverId: int, window: StatsWindow = StatsWindows.default) -> dict[str, int]:
+        """Counts the total online times for each player within the given window, but for a single server only"""
+        ring = self.get_ring(window)
+        serverColumns = ring.servers.get(serverId)
+        if serverColumns is None:
+            return {}
+        playerNames = self.playerNames
+        totals = serverColumns.totals[ring.get_window(window.numBuckets)]
+        return {
+            playerNames[playerIndex]: onlineTime
+            for playerIndex, onlineTime in zip(serverColumns.playerIndices, totals) if onlineTime > 0}
+
+    def add_online_time(self, serverId: int, playerName: str, onlineTime: int, date: datetime.date = None):
+        """Adds an online time for the given player for the given date (default: today)"""
+        date = date or datetime.date.today()
         if not self.lastUpdate:
-            self.lastUpdate = today
-        daysSinceLastUdpate = (today - self.lastUpdate).days
-        if daysSinceLastUdpate > 0:
-            self.shift_entries(daysSinceLastUdpate)
-            self.lastUpdate = today
-        self.stats[0].add_online_time(serverId, playerName, onlineTime)
+            self.lastUpdate = date
+        if date > self.lastUpdate:
+            self.move_to_date(date)
+        self.add_minutes((self.lastUpdate - date).days, serverId, playerName, onlineTime)
+        self.sessionCount += 1
+
+    def move_to_date(self, today: datetime.date):
+        """Starts new buckets for every day, week and month which passed since the last update"""
+        self.shift_entries((today - self.lastUpdate).days)
+        self.weeks.shift(get_week(today) - get_week(self.lastUpdate))
+        self.months.shift(get_month(today) - get_month(self.lastUpdate))
+        self.lastUpdate = today
 
     def shift_entries(self, daysSinceLastUdpate: int):
-        """Shifts all entries by one, dropping the last one and adding an empty first one.
+        """Shifts all daily entries by the given amount of days, dropping the oldest ones and adding empty ones.
 
-        If nobody has been online on a given day, or the bot was offline, data will be shifted accordingly."""
-        numEntries = len(self.stats)
-        for _ in range(daysSinceLastUdpate):
-            for i in range(numEntries - 1, 0, -1):
-                self.stats[i] = self.stats[i-1]
-            self.stats[0] = DailyStats()
+        If nobody has been online on a given day, or the bot was offline, data will be shifted accordingly.
+        At most numDays columns are cleared, no matter how many days passed."""
+        self.days.shift(daysSinceLastUdpate)
 
     def to_json(self, indent=None) -> str:
         tmpDict = {"lastUpdate": HelperFuncs().date_to_json(self.lastUpdate)}
+        tmpDict["sessionCount"] = self.sessionCount
         tmpDict["stats"] = self.stats
+        for level in ROLLUP_LEVELS:
+            tmpDict[level] = self.get_bucket_data(getattr(self, level))
         return HelperFuncs().to_json(tmpDict, indent)
 
     @classmethod
-    def from_json(cls, j: str):
+    def from_json(cls, j: str, numDays: int = None):
+        """Restores a tracker from JSON. If numDays is larger than the amount of stored days, empty days are added."""
         tmpDict = json.loads(j)
 
         lastUpdate: datetime.date = \
@@ -181,4 +596,12 @@ class OnlineTimeTracker:
             int(indexStr): DailyStats.from_dict(dailyStatsDict)
             for indexStr, dailyStatsDict in tmpStats.items()
         }
-        return cls(stats, lastUpdate)
+        for day in range(len(stats), numDays or 0):
+            stats[day] = DailyStats()
+        # Files which were written before weeks and months were tracked only contain days
+        rollups = None
+        if all(level in tmpDict for level in ROLLUP_LEVELS):
+            rollups = {level: tmpDict[level] for level in ROLLUP_LEVELS}
+        tracker = cls(stats, lastUpdate, rollups)
+        tracker.sessionCount = int(tmpDict.get("sessionCount", 0))
+        return tracker
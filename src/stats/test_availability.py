@@ -0,0 +1,87 @@
+from fs22.fs22server import OnlineState
+from stats.availability import AvailabilityTracker, AvailabilityLog, render_availability, DAY
+import unittest
+
+FIRST_SERVER = 0
+START = 1_700_000_000.0
+HOUR = 60 * 60
+
+
+class TestAvailability(unittest.TestCase):
+
+    def setUp(self):
+        self.sut = AvailabilityTracker()
+
+    def record_states(self, *states: tuple[float, OnlineState]):
+        for offset, state in states:
+            self.sut.record(FIRST_SERVER, START + offset, state)
+
+    def test_uptime(self):
+        self.record_states(
+            (0, OnlineState.Online), (6 * HOUR, OnlineState.Offline), (7 * HOUR, OnlineState.Online),
+            (20 * HOUR, OnlineState.Online), (24 * HOUR, OnlineState.Online))
+
+        stats = self.sut.get_stats(FIRST_SERVER, DAY, START + DAY)
+
+        self.assertAlmostEqual(stats.uptime, 23 / 24)
+        self.assertEqual(stats.outages, 1)
+        self.assertEqual(stats.meanTimeToRecovery, HOUR)
+
+    def test_partialWindow(self):
+        self.record_states(
+            (0, OnlineState.Offline), (2 * HOUR, OnlineState.Online), (4 * HOUR, OnlineState.Offline),
+            (5 * HOUR, OnlineState.Online), (6 * HOUR, OnlineState.Online))
+
+        stats = self.sut.get_stats(FIRST_SERVER, 3 * HOUR, START + 6 * HOUR)
+
+        self.assertAlmostEqual(stats.uptime, 2 / 3)
+        self.assertEqual(stats.outages, 1)
+        self.assertEqual(stats.meanTimeToRecovery, HOUR)
+
+    def test_unknownStateIsNotCounted(self):
+        self.record_states(
+            (0, OnlineState.Online), (HOUR, OnlineState.Unknown), (3 * HOUR, OnlineState.Offline),
+            (4 * HOUR, OnlineState.Offline))
+
+        stats = self.sut.get_stats(FIRST_SERVER, DAY, START + 4 * HOUR)
+
+        self.assertAlmostEqual(stats.uptime, 0.5)
+
+    def test_restoreMarksDowntimeAsUnknown(self):
+        self.record_states((0, OnlineState.Online), (HOUR, OnlineState.Online))
+
+        restoredTracker = AvailabilityTracker.from_dict(self.sut.to_dict())
+        restoredTracker.record(FIRST_SERVER, START + 3 * HOUR, OnlineState.Online)
+        restoredTracker.record(FIRST_SERVER, START + 4 * HOUR, OnlineState.Online)
+
+        self.assertAlmostEqual(restoredTracker.get_stats(FIRST_SERVER, DAY, START + 4 * HOUR).uptime, 1.0)
+        self.assertEqual(restoredTracker.servers[FIRST_SERVER].knownTimes[-1], HOUR)
+
+    def test_prune(self):
+        availabilityLog = AvailabilityLog()
+        for day in range(10):
+            availabilityLog.record(START + day * DAY, OnlineState.Online)
+            availabilityLog.record(START + day * DAY + HOUR, OnlineState.Offline)
+        availabilityLog.record(START + 10 * DAY, OnlineState.Online)
+        expectedStats = availabilityLog.get_stats(START + 5 * DAY, START + 10 * DAY)
+
+        availabilityLog.prune(START + 5 * DAY)
+        stats = availabilityLog.get_stats(START + 5 * DAY, START + 10 * DAY)
+
+        self.assertEqual(len(availabilityLog.times), 11)
+        self.assertAlmostEqual(stats.uptime, expectedStats.uptime)
+        self.assertEqual(stats.outages, expectedStats.outages)
+
+    def test_render(self):
+        self.record_states(
+            (0, OnlineState.Online), (HOUR, OnlineState.Offline), (HOUR + 600, OnlineState.Online),
+            (2 * HOUR, OnlineState.Online))
+
+        text = render_availability(self.sut, FIRST_SERVER, START + 2 * HOUR)
+
+        self.assertIn("24h: 91.67%", text)
+        self.assertIn("Outages (30d): 1 | MTTR: 10 min", text)
+
+
+if __name__ == '__main__':
+    unittest.main()
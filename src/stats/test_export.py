@@ -0,0 +1,84 @@
+from stats.export import export_online_times
+from stats.sqlitetracker import SqliteTimeTracker
+from stats.statstracker import OnlineTimeTracker
+import asyncio
+import datetime
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+FIRST_SERVER = 0
+SECOND_SERVER = 1
+TODAY = datetime.date(2024, 5, 1)
+YESTERDAY = TODAY - datetime.timedelta(days=1)
+
+
+class TestExport(unittest.TestCase):
+
+    def setUp(self):
+        self.timeTracker = OnlineTimeTracker.create_new()
+        self.timeTracker.add_online_time(FIRST_SERVER, "Player 1", 5, YESTERDAY)
+        self.timeTracker.add_online_time(SECOND_SERVER, "Spieler Ä", 3, YESTERDAY)
+        self.timeTracker.add_online_time(FIRST_SERVER, "Player 1", 7, TODAY)
+
+    def export(self, timeTracker, exportFormat, serverIds, startDate=None, endDate=None) -> tuple[list[str], int]:
+        async def export():
+            exportFile, numRows = await export_online_times(timeTracker, exportFormat, serverIds, startDate, endDate)
+            with exportFile:
+                return gzip.decompress(exportFile.read()).decode("utf-8").splitlines(), numRows
+        return asyncio.run(export())
+
+    def test_csv(self):
+        lines, numRows = self.export(self.timeTracker, "csv", {FIRST_SERVER, SECOND_SERVER})
+
+        self.assertEqual(numRows, 3)
+        self.assertEqual(lines, [
+            "date,server_id,player,minutes",
+            "2024-04-30,0,Player 1,5",
+            "2024-04-30,1,Spieler Ä,3",
+            "2024-05-01,0,Player 1,7"])
+
+    def test_ndjsonWithFilters(self):
+        lines, numRows = self.export(self.timeTracker, "ndjson", {FIRST_SERVER}, startDate=TODAY)
+
+        self.assertEqual(numRows, 1)
+        self.assertEqual(
+            [json.loads(line) for line in lines],
+            [{"date": "2024-05-01", "server_id": FIRST_SERVER, "player": "Player 1", "minutes": 7}])
+
+    def test_changesDuringExportAreNotIncluded(self):
+        async def export_while_changing():
+            task = asyncio.create_task(export_online_times(self.timeTracker, "csv", {FIRST_SERVER, SECOND_SERVER}))
+            await asyncio.sleep(0)  # The export takes its snapshot and waits for the worker thread
+            # A new day starts and new online times are credited
+            self.timeTracker.add_online_time(FIRST_SERVER, "Player 1", 11, TODAY + datetime.timedelta(days=1))
+            exportFile, numRows = await task
+            with exportFile:
+                return gzip.decompress(exportFile.read()).decode("utf-8").splitlines(), numRows
+
+        lines, numRows = asyncio.run(export_while_changing())
+
+        self.assertEqual(numRows, 3)
+        self.assertEqual(lines[1:], ["2024-04-30,0,Player 1,5", "2024-04-30,1,Spieler Ä,3", "2024-05-01,0,Player 1,7"])
+
+    def test_database(self):
+        with tempfile.TemporaryDirectory() as folder:
+            database = SqliteTimeTracker(os.path.join(folder, "fssb.sqlite"))
+            try:
+                database.import_tracker(self.timeTracker)
+
+                lines, numRows = self.export(database, "csv", {SECOND_SERVER}, endDate=YESTERDAY)
+            finally:
+                database.close()
+
+        self.assertEqual(lines, ["date,server_id,player,minutes", "2024-04-30,1,Spieler Ä,3"])
+
+    def test_invalidFormat(self):
+        with self.assertRaises(ValueError):
+            self.export(self.timeTracker, "xml", {FIRST_SERVER})
+
+
+if __name__ == '__main__':
+    unittest.main()
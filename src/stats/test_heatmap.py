@@ -0,0 +1,74 @@
+from stats.heatmap import Heatmap, HeatmapTracker, render_heatmap, get_hour_of_week
+import datetime
+import unittest
+
+FIRST_GUILD = 100
+FIRST_SERVER = 0
+SECOND_SERVER = 1
+MONDAY = datetime.datetime(2024, 4, 29, 20, 15)
+
+
+class TestHeatmap(unittest.TestCase):
+
+    def setUp(self):
+        self.sut = HeatmapTracker()
+        self.sut.update_guild_to_server_map({FIRST_GUILD: [FIRST_SERVER, SECOND_SERVER]})
+
+    def test_hourOfWeek(self):
+        self.assertEqual(get_hour_of_week(MONDAY), 20)
+        self.assertEqual(get_hour_of_week(MONDAY + datetime.timedelta(days=6, hours=3)), 167)
+
+    def test_serverAverages(self):
+        self.sut.record(FIRST_SERVER, MONDAY, 2)
+        self.sut.record(FIRST_SERVER, MONDAY, 4)
+        self.sut.record(FIRST_SERVER, MONDAY + datetime.timedelta(hours=1), 1)
+
+        averages = self.sut.servers[FIRST_SERVER].get_averages()
+
+        self.assertEqual(averages[20:22], [3.0, 1.0])
+        self.assertEqual(self.sut.servers[FIRST_SERVER].peaks[20], 4)
+
+    def test_guildConcurrency(self):
+        self.sut.record(FIRST_SERVER, MONDAY, 2)
+        self.sut.record(SECOND_SERVER, MONDAY, 3)
+        self.sut.record(FIRST_SERVER, MONDAY, 1)
+
+        guildHeatmap = self.sut.guilds[FIRST_GUILD]
+
+        self.assertEqual(guildHeatmap.peaks[20], 5)
+        self.assertEqual(guildHeatmap.sums[20], 2 + 5 + 4)
+        self.assertEqual(guildHeatmap.samples[20], 3)
+
+    def test_removeServer(self):
+        self.sut.record(FIRST_SERVER, MONDAY, 2)
+        self.sut.record(SECOND_SERVER, MONDAY, 3)
+
+        self.sut.remove_server(SECOND_SERVER)
+        self.sut.update_guild_to_server_map({FIRST_GUILD: [FIRST_SERVER]})
+        self.sut.record(FIRST_SERVER, MONDAY, 2)
+
+        self.assertNotIn(SECOND_SERVER, self.sut.servers)
+        self.assertEqual(self.sut.guildPlayerCounts[FIRST_GUILD], 2)
+
+    def test_render(self):
+        self.assertIn("Nobody has been online yet", render_heatmap(Heatmap()))
+
+        self.sut.record(FIRST_SERVER, MONDAY, 4)
+        self.sut.record(FIRST_SERVER, MONDAY + datetime.timedelta(days=1), 1)
+        lines = render_heatmap(self.sut.servers[FIRST_SERVER]).split("\n")
+
+        self.assertEqual(lines[2], "Mon " + " " * 20 + "█" + " " * 3)
+        self.assertEqual(lines[3], "Tue " + " " * 20 + "░" + " " * 3)
+        self.assertIn("Mon 20:00", lines[10])
+
+    def test_dictRoundTrip(self):
+        self.sut.record(FIRST_SERVER, MONDAY, 2)
+
+        restoredTracker = HeatmapTracker.from_dict(self.sut.to_dict())
+
+        self.assertEqual(restoredTracker.servers[FIRST_SERVER].get_averages(), self.sut.servers[FIRST_SERVER].get_averages())
+        self.assertEqual(restoredTracker.guilds[FIRST_GUILD].peaks, self.sut.guilds[FIRST_GUILD].peaks)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+from stats.journal import SessionJournal
+from stats.statstracker import OnlineTimeTracker
+import datetime
+import os
+import tempfile
+import unittest
+
+FIRST_SERVER = 0
+SECOND_SERVER = 1
+FIRST_PLAYER = "Player 1"
+SECOND_PLAYER = "Player 2"
+
+
+class TestSessionJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.filePath = os.path.join(self.folder.name, "timetracking.journal")
+        self.today = datetime.date.today()
+        self.tracker = OnlineTimeTracker.create_new()
+        self.sut = SessionJournal(self.filePath)
+
+    def tearDown(self):
+        self.sut.close()
+        self.folder.cleanup()
+
+    def add_session(self, serverId, playerName, onlineTime, date=None):
+        date = date or self.today
+        self.tracker.add_online_time(serverId, playerName, onlineTime, date)
+        self.sut.append(self.tracker.sessionCount, date, serverId, playerName, onlineTime)
+
+    def test_replay(self):
+        self.add_session(FIRST_SERVER, FIRST_PLAYER, 5, self.today - datetime.timedelta(days=1))
+        self.add_session(SECOND_SERVER, SECOND_PLAYER, 3)
+        self.sut.close()
+
+        restoredTracker = OnlineTimeTracker.create_new()
+        numReplayed = SessionJournal(self.filePath).replay(restoredTracker)
+
+        self.assertEqual(numReplayed, 2)
+        self.assertEqual(restoredTracker.to_json(), self.tracker.to_json())
+
+    def test_sessionsInSnapshotAreSkipped(self):
+        self.add_session(FIRST_SERVER, FIRST_PLAYER, 5)
+        snapshot = self.tracker.to_json()
+        self.add_session(FIRST_SERVER, SECOND_PLAYER, 3)
+        self.sut.close()
+
+        restoredTracker = OnlineTimeTracker.from_json(snapshot)
+        numReplayed = SessionJournal(self.filePath).replay(restoredTracker)
+
+        self.assertEqual(numReplayed, 1)
+        self.assertEqual(restoredTracker.get_online_time(FIRST_PLAYER), 5)
+        self.assertEqual(restoredTracker.get_online_time(SECOND_PLAYER), 3)
+
+    def test_rotatedFilesAreReplayedUntilRemoved(self):
+        self.add_session(FIRST_SERVER, FIRST_PLAYER, 5)
+        self.sut.rotate()
+        self.add_session(FIRST_SERVER, SECOND_PLAYER, 3)
+        self.sut.rotate()  # The first compaction did not finish
+        self.assertTrue(self.sut.has_records())
+
+        restoredTracker = OnlineTimeTracker.create_new()
+        self.assertEqual(SessionJournal(self.filePath).replay(restoredTracker), 2)
+
+        self.sut.remove_rotated_files(self.sut.generation)
+        self.assertFalse(self.sut.has_records())
+
+    def test_earlierSnapshotKeepsLaterRotations(self):
+        self.add_session(FIRST_SERVER, FIRST_PLAYER, 5)
+        firstGeneration = self.sut.rotate()
+        self.add_session(FIRST_SERVER, SECOND_PLAYER, 3)
+        self.sut.rotate()  # A second snapshot is requested while the first one is still being written
+        self.sut.remove_rotated_files(firstGeneration)  # The first snapshot was written, the second one was not
+        self.sut.close()
+
+        restoredTracker = OnlineTimeTracker.create_new()
+        restoredTracker.add_online_time(FIRST_SERVER, FIRST_PLAYER, 5, self.today)  # As contained in the first snapshot
+        self.assertEqual(SessionJournal(self.filePath).replay(restoredTracker), 1)
+        self.assertEqual(restoredTracker.get_online_time(SECOND_PLAYER), 3)
+
+    def test_generationsContinueAfterRestart(self):
+        self.add_session(FIRST_SERVER, FIRST_PLAYER, 5)
+        self.sut.rotate()
+        self.sut.close()
+
+        restartedJournal = SessionJournal(self.filePath)
+        self.assertEqual(restartedJournal.rotate(), self.sut.generation + 1)
+
+    def test_legacyRotatedFileIsReplayed(self):
+        self.add_session(FIRST_SERVER, FIRST_PLAYER, 5)
+        self.sut.close()
+        os.replace(self.filePath, self.filePath + ".old")
+
+        journal = SessionJournal(self.filePath)
+        self.assertEqual(journal.replay(OnlineTimeTracker.create_new()), 1)
+        journal.remove_rotated_files(journal.rotate())
+        self.assertFalse(os.path.exists(self.filePath + ".old"))
+
+    def test_incompleteRecordIsIgnored(self):
+        self.add_session(FIRST_SERVER, FIRST_PLAYER, 5)
+        self.sut.close()
+        with open(self.filePath, "a", encoding="utf-8") as file:
+            file.write('[2,"2023-')
+
+        restoredTracker = OnlineTimeTracker.create_new()
+        self.assertEqual(SessionJournal(self.filePath).replay(restoredTracker), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
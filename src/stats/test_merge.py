@@ -0,0 +1,112 @@
+from stats.merge import merge_tracker, merge_into_copy, validate_tracker, load_snapshot, parse_server_id_map, \
+    get_total_minutes, get_fingerprint
+from stats.snapshotformat import to_binary
+from stats.statstracker import OnlineTimeTracker, StatsWindows
+import datetime
+import unittest
+
+FIRST_SERVER = 0
+SECOND_SERVER = 1
+REMAPPED_SERVER = 5
+FIRST_PLAYER = "Player 1"
+SECOND_PLAYER = "Spieler Ä"
+
+
+class TestMerge(unittest.TestCase):
+
+    def setUp(self):
+        self.today = datetime.date(2024, 5, 1)
+        self.sessions = [
+            (self.today, FIRST_SERVER, FIRST_PLAYER, 7, FIRST_SERVER),
+            (self.today - datetime.timedelta(days=3), SECOND_SERVER, SECOND_PLAYER, 4, SECOND_SERVER),
+            (self.today - datetime.timedelta(days=12), FIRST_SERVER, SECOND_PLAYER, 11, REMAPPED_SERVER),
+            (self.today - datetime.timedelta(days=45), FIRST_SERVER, FIRST_PLAYER, 20, REMAPPED_SERVER),
+            (self.today - datetime.timedelta(days=200), SECOND_SERVER, FIRST_PLAYER, 9, SECOND_SERVER),
+        ]
+        # The first instance is up to date, the second one was stopped a week earlier
+        self.first = OnlineTimeTracker.create_new()
+        self.second = OnlineTimeTracker.create_new()
+        self.expected = OnlineTimeTracker.create_new()
+        for date, serverId, playerName, minutes, mergedServerId in self.sessions:
+            tracker = self.first if mergedServerId == serverId else self.second
+            tracker.add_online_time(serverId, playerName, minutes, date)
+            self.expected.add_online_time(mergedServerId, playerName, minutes, date)
+        self.second.move_to_date(self.today - datetime.timedelta(days=7))
+
+    def assert_same_stats(self, mergedTracker: OnlineTimeTracker):
+        self.assertEqual(mergedTracker.lastUpdate, self.today)
+        for window in StatsWindows.available:
+            for serverId in [FIRST_SERVER, SECOND_SERVER, REMAPPED_SERVER]:
+                self.assertEqual(
+                    mergedTracker.get_server_stats(serverId, window), self.expected.get_server_stats(serverId, window))
+            self.assertEqual(
+                mergedTracker.get_total_stats([FIRST_SERVER, SECOND_SERVER, REMAPPED_SERVER], window),
+                self.expected.get_total_stats([FIRST_SERVER, SECOND_SERVER, REMAPPED_SERVER], window))
+
+    def test_mergeAlignsByLastUpdate(self):
+        for sources in [[self.first, self.second], [self.second, self.first]]:
+            mergedTracker = OnlineTimeTracker.create_new()
+            numMinutes = 0
+            for source in sources:
+                serverIdMap = {FIRST_SERVER: REMAPPED_SERVER} if source is self.second else None
+                numMinutes += merge_tracker(mergedTracker, source, serverIdMap)
+
+            self.assert_same_stats(mergedTracker)
+            self.assertEqual(numMinutes, sum(session[3] for session in self.sessions))
+            self.assertEqual(validate_tracker(mergedTracker, numMinutes), [])
+
+    def test_mergeSnapshots(self):
+        mergedTracker = OnlineTimeTracker.create_new()
+        merge_tracker(mergedTracker, load_snapshot(self.first.to_json().encode("utf-8")))
+        merge_tracker(mergedTracker, load_snapshot(to_binary(self.second)), parse_server_id_map("0:5"))
+
+        self.assert_same_stats(mergedTracker)
+
+    def test_mergeIntoCopy(self):
+        snapshotData = to_binary(self.first)
+        expectedMinutes = get_total_minutes(self.first) + get_total_minutes(self.second)
+
+        mergedTracker, numMinutes, problems = merge_into_copy(
+            snapshotData, self.second, {FIRST_SERVER: REMAPPED_SERVER}, expectedMinutes)
+
+        self.assert_same_stats(mergedTracker)
+        self.assertEqual(numMinutes, get_total_minutes(self.second))
+        self.assertEqual(problems, [])
+        self.assertEqual(to_binary(self.first), snapshotData, "The original tracker must not be changed")
+
+    def test_fingerprint(self):
+        fingerprint = get_fingerprint(self.first)
+
+        self.assertEqual(get_fingerprint(load_snapshot(to_binary(self.first))), fingerprint)
+        self.assertNotEqual(get_fingerprint(self.second), fingerprint)
+
+    def test_fingerprintOfSameOnlineTimes(self):
+        fingerprint = get_fingerprint(self.first)
+        # Exported again a few days later, with a different session count
+        reexported = load_snapshot(self.first.to_json().encode("utf-8"))
+        reexported.sessionCount += 10
+        reexported.move_to_date(self.today + datetime.timedelta(days=3))
+
+        self.assertEqual(get_fingerprint(reexported), fingerprint)
+        reexported.add_online_time(FIRST_SERVER, FIRST_PLAYER, 1, self.today + datetime.timedelta(days=3))
+        self.assertNotEqual(get_fingerprint(reexported), fingerprint)
+
+    def test_validateDetectsInconsistentTotals(self):
+        numMinutes = get_total_minutes(self.first)
+        self.first.days.servers[FIRST_SERVER].totals[1][0] += 1
+        self.first.allTime.combined.minutes[0] += 1
+
+        problems = validate_tracker(self.first, numMinutes)
+
+        self.assertEqual(len(problems), 3)
+        self.assertEqual(len(validate_tracker(self.first, numMinutes + 1)), 4)
+
+    def test_parseServerIdMap(self):
+        self.assertEqual(parse_server_id_map("0:3, 1:4"), {0: 3, 1: 4})
+        self.assertEqual(parse_server_id_map(""), {})
+        with self.assertRaises(ValueError):
+            parse_server_id_map("0-3")
+
+
+if __name__ == '__main__':
+    unittest.main()
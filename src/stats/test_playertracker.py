@@ -0,0 +1,260 @@
+from fs22.fs22server import FS22ServerConfig, FS22ServerStatus, FS22PlayerStatus, OnlineState
+from fs22.servertracker import ServerTracker
+from stats.playertracker import PlayerTracker, PlayerTrackerEvents, split_by_day, CREDIT_INTERVAL
+from stats.sessiontable import SESSION_TTL
+from stats.statstracker import OnlineTimeTracker, StatsWindows
+from stats.journal import SessionJournal
+import datetime
+import json
+import os
+import tempfile
+import unittest
+
+FIRST_SERVER = 0
+SECOND_SERVER = 1
+
+
+class RecordingEventBus:
+
+    def __init__(self):
+        self.events = []
+
+    def publish(self, topic: str, *args):
+        self.events.append((topic, args))
+
+
+def create_status(**onlineTimes) -> FS22ServerStatus:
+    serverData = FS22ServerStatus()
+    serverData.status = OnlineState.Online
+    for playerName, onlineTime in onlineTimes.items():
+        serverData.onlinePlayers[playerName] = FS22PlayerStatus(playerName, str(onlineTime), "false")
+    return serverData
+
+
+def mark_polled_long_ago(playerTracker: PlayerTracker, now: datetime.datetime):
+    """Lets players who are seen for the first time be credited with their whole online time"""
+    for serverId in [FIRST_SERVER, SECOND_SERVER]:
+        playerTracker.sessions.mark_polled(serverId, (now - datetime.timedelta(days=1)).timestamp())
+
+
+class TestPlayerTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.now = datetime.datetime(2024, 5, 1, 12, 0)
+        self.timeTracker = OnlineTimeTracker.create_new()
+        self.eventBus = RecordingEventBus()
+        # Credits on every poll, see TestCreditBatches for the credit interval
+        self.sut = PlayerTracker(self.timeTracker, self.eventBus, creditInterval=0)
+        mark_polled_long_ago(self.sut, self.now)
+
+    def poll(self, minutesLater: int = 0, **onlineTimes):
+        self.sut.on_updated(
+            FIRST_SERVER, create_status(**onlineTimes), self.now + datetime.timedelta(minutes=minutesLater))
+
+    def get_online_time(self, playerName: str) -> int:
+        return self.timeTracker.get_online_time(playerName, StatsWindows.allTime)
+
+    def test_creditsWhileOnline(self):
+        self.poll(0, p1=3)
+        self.poll(1, p1=4)
+        self.poll(1, p1=4)
+        self.poll(5, p1=8)
+
+        self.assertEqual(self.get_online_time("p1"), 8)
+        self.assertEqual(self.timeTracker.sessionCount, 3)
+        self.assertEqual(self.eventBus.events, [(PlayerTrackerEvents.stats_updated, (FIRST_SERVER,))] * 3)
+
+    def test_onlineTimeReset(self):
+        self.poll(0, p1=30)
+        self.poll(1, p1=2)
+
+        self.assertEqual(self.get_online_time("p1"), 32)
+
+    def test_sessionAfterOffline(self):
+        self.poll(0, p1=30)
+        self.poll(1)
+        self.poll(10, p1=5)
+
+        self.assertEqual(self.get_online_time("p1"), 35)
+
+    def test_failedPollKeepsSessions(self):
+        serverTracker = ServerTracker(FS22ServerConfig(FIRST_SERVER, "ip", 1, "code", "", "", "", 0), self.eventBus)
+        online = create_status(p1=120)
+        online.status = OnlineState.Online
+        for serverData in [online, FS22ServerStatus(), online]:
+            # A poll which timed out has an unknown state and no players
+            changes = serverTracker.get_changes(serverData)
+            serverTracker.lastknownServerData = serverData
+            self.sut.on_changes(changes)
+
+        self.assertEqual(self.get_online_time("p1"), 120)
+
+    def test_splitAtMidnight(self):
+        self.now = datetime.datetime(2024, 5, 1, 23, 50)
+        self.poll(0, p1=20)
+        self.poll(20, p1=40)
+
+        self.assertEqual(self.timeTracker.get_bucket_data(self.timeTracker.days), {
+            0: {FIRST_SERVER: {"p1": 10}},
+            1: {FIRST_SERVER: {"p1": 30}}
+        })
+
+    def test_splitByDay(self):
+        end = datetime.datetime(2024, 5, 2, 0, 30)
+
+        self.assertEqual(split_by_day(end, 10), [(datetime.date(2024, 5, 2), 10)])
+        self.assertEqual(split_by_day(end, 24 * 60 + 40), [
+            (datetime.date(2024, 4, 30), 10), (datetime.date(2024, 5, 1), 24 * 60), (datetime.date(2024, 5, 2), 30)])
+        self.assertEqual(split_by_day(datetime.datetime(2024, 5, 2), 5), [(datetime.date(2024, 5, 1), 5)])
+
+    def test_resumeFromCheckpoint(self):
+        self.poll(0, p1=30, p2=50)
+        checkpoint = json.loads(json.dumps(self.sut.get_checkpoint()))
+
+        restoredTracker = PlayerTracker(self.timeTracker, self.eventBus)
+        restoredTracker.restore_checkpoint(checkpoint)
+        # The first player stayed online, the second one reconnected while the bot was offline
+        restoredTracker.on_updated(FIRST_SERVER, create_status(p1=40, p2=55), self.now + datetime.timedelta(minutes=10))
+
+        self.assertEqual(self.get_online_time("p1"), 40)
+        self.assertEqual(self.get_online_time("p2"), 105)
+
+    def test_restartWithStaleCheckpoint(self):
+        self.poll(0, p1=30)
+        checkpoint = json.loads(json.dumps(self.sut.get_checkpoint()))
+        # Credited after the checkpoint was written, but before the bot crashed
+        self.poll(20, p1=50, p2=10)
+
+        restoredTracker = PlayerTracker(self.timeTracker, self.eventBus, creditInterval=0)
+        restoredTracker.restore_checkpoint(checkpoint)
+        restoredTracker.on_updated(
+            FIRST_SERVER, create_status(p1=60, p2=20, p3=15), self.now + datetime.timedelta(minutes=30))
+
+        # The minutes since the checkpoint are credited again at most, rather than every session as a whole
+        self.assertEqual(self.get_online_time("p1"), 50 + 30)
+        self.assertEqual(self.get_online_time("p2"), 10 + 20)
+        self.assertEqual(self.get_online_time("p3"), 15)
+
+    def test_restartWithoutCheckpoint(self):
+        self.poll(0, p1=30)
+
+        restoredTracker = PlayerTracker(self.timeTracker, self.eventBus, creditInterval=0)
+        restoredTracker.on_updated(FIRST_SERVER, create_status(p1=40), self.now + datetime.timedelta(minutes=10))
+        restoredTracker.on_updated(FIRST_SERVER, create_status(p1=41), self.now + datetime.timedelta(minutes=11))
+
+        self.assertEqual(self.get_online_time("p1"), 31, "The session must continue from the observed online time")
+
+    def test_failedPollIsNoBaseline(self):
+        self.poll(0)
+        self.sut.on_updated(FIRST_SERVER, FS22ServerStatus(), self.now + datetime.timedelta(minutes=20))
+        self.poll(25, p1=15)
+
+        self.assertEqual(self.get_online_time("p1"), 15)
+
+    def test_creditsAreJournaledImmediately(self):
+        with tempfile.TemporaryDirectory() as folder:
+            journal = SessionJournal(os.path.join(folder, "timetracking.journal"))
+            self.sut.journal = journal
+            self.poll(0, p1=30, p2=5)
+            self.poll(5, p1=35, p2=10)
+            journal.close()
+
+            # No event was processed, as if the bot crashed right after the poll
+            restoredTracker = OnlineTimeTracker.create_new()
+            SessionJournal(journal.filePath).replay(restoredTracker)
+
+        self.assertEqual(restoredTracker.get_online_time("p1", StatsWindows.allTime), 35)
+        self.assertEqual(restoredTracker.get_online_time("p2", StatsWindows.allTime), 10)
+        self.assertEqual(restoredTracker.sessionCount, self.timeTracker.sessionCount)
+
+    def test_replaceTimeTrackerKeepsRecordedCredits(self):
+        self.poll(0, p1=30)
+        copiedTracker = OnlineTimeTracker.from_json(self.timeTracker.to_json())
+        self.sut.start_recording_credits()
+        self.poll(5, p1=35)  # Credited while the copy is being changed
+
+        self.sut.replace_time_tracker(copiedTracker)
+        self.poll(10, p1=40)
+
+        self.assertIs(self.sut.timeTracker, copiedTracker)
+        self.assertEqual(copiedTracker.get_online_time("p1", StatsWindows.allTime), 40)
+        self.assertEqual(copiedTracker.sessionCount, 3, "Every credit must count a session, as in the journal")
+        self.assertIsNone(self.sut.recordedCredits)
+
+
+class TestCreditBatches(unittest.TestCase):
+
+    def setUp(self):
+        self.now = datetime.datetime(2024, 5, 1, 12, 0)
+        self.timeTracker = OnlineTimeTracker.create_new()
+        self.eventBus = RecordingEventBus()
+        self.sut = PlayerTracker(self.timeTracker, self.eventBus)
+        mark_polled_long_ago(self.sut, self.now)
+
+    def poll(self, minutesLater: int, serverId: int = FIRST_SERVER, **onlineTimes):
+        self.sut.on_updated(serverId, create_status(**onlineTimes), self.now + datetime.timedelta(minutes=minutesLater))
+
+    def get_online_time(self, playerName: str) -> int:
+        return self.timeTracker.get_online_time(playerName, StatsWindows.allTime)
+
+    def test_creditedOncePerInterval(self):
+        for minute in range(0, CREDIT_INTERVAL // 60 * 2 + 1):
+            self.poll(minute, p1=30 + minute, p2=5 + minute)
+
+        # The first poll, and one poll per interval afterwards
+        self.assertEqual(self.get_online_time("p1"), 30 + 20)
+        self.assertEqual(self.get_online_time("p2"), 5 + 20)
+        self.assertEqual(self.timeTracker.sessionCount, 6)
+        self.assertEqual(self.eventBus.events, [(PlayerTrackerEvents.stats_updated, (FIRST_SERVER,))] * 3)
+
+    def test_creditedWhenLeaving(self):
+        self.poll(0, p1=30, p2=5)
+        self.poll(1, p1=31, p2=6)
+        self.poll(2, p1=32)
+
+        self.assertEqual(self.get_online_time("p1"), 30)
+        self.assertEqual(self.get_online_time("p2"), 6)
+        self.assertEqual(len(self.eventBus.events), 2)
+
+    def test_serversAreCreditedSeparately(self):
+        self.poll(0, FIRST_SERVER, p1=30)
+        self.poll(1, FIRST_SERVER, p1=31)
+        self.poll(1, SECOND_SERVER, p1=2)
+
+        self.assertEqual(self.timeTracker.get_total_stats([FIRST_SERVER], StatsWindows.allTime), {"p1": 30})
+        self.assertEqual(self.timeTracker.get_total_stats([SECOND_SERVER], StatsWindows.allTime), {"p1": 2})
+        self.assertEqual([args for topic, args in self.eventBus.events], [(FIRST_SERVER,), (SECOND_SERVER,)])
+
+    def test_creditPendingSessions(self):
+        self.poll(0, p1=30)
+        self.poll(5, p1=35)
+
+        self.sut.credit_pending_sessions()
+        self.sut.credit_pending_sessions()
+
+        self.assertEqual(self.get_online_time("p1"), 35)
+        self.assertEqual(self.timeTracker.sessionCount, 2)
+
+    def test_pendingMinutesAreCheckpointed(self):
+        self.poll(0, p1=30)
+        self.poll(5, p1=35)
+        checkpoint = json.loads(json.dumps(self.sut.get_checkpoint()))
+
+        restoredTracker = PlayerTracker(self.timeTracker, self.eventBus)
+        restoredTracker.restore_checkpoint(checkpoint)
+        restoredTracker.on_updated(FIRST_SERVER, create_status(p1=40), self.now + datetime.timedelta(minutes=10))
+
+        self.assertEqual(self.get_online_time("p1"), 40)
+
+    def test_expiredSessionsAreCredited(self):
+        self.poll(0, FIRST_SERVER, p1=30)
+        self.poll(5, FIRST_SERVER, p1=35)
+        # The first server is no longer polled, e.g. because it was removed
+        self.poll(SESSION_TTL // 60 + 10, SECOND_SERVER)
+
+        self.assertEqual(self.get_online_time("p1"), 35)
+        self.assertEqual(self.timeTracker.get_bucket_data(self.timeTracker.days), {0: {FIRST_SERVER: {"p1": 35}}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+from stats.sessiontable import SessionTable
+import unittest
+
+FIRST_SERVER = 0
+SECOND_SERVER = 1
+FIRST_PLAYER = "Player 1"
+TTL = 600
+
+
+class TestSessionTable(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 1_700_000_000.0
+        self.sut = SessionTable(TTL)
+        # Players who are seen for the first time can only be credited for the time since the previous poll
+        self.sut.mark_polled(FIRST_SERVER, self.now - 24 * 60 * 60)
+        self.sut.mark_polled(SECOND_SERVER, self.now - 24 * 60 * 60)
+
+    def test_sessionsPerServer(self):
+        self.assertEqual(self.sut.update(FIRST_SERVER, FIRST_PLAYER, 30, self.now), 30)
+        self.assertEqual(self.sut.update(SECOND_SERVER, FIRST_PLAYER, 2, self.now), 2)
+        self.assertEqual(self.sut.update(FIRST_SERVER, FIRST_PLAYER, 31, self.now + 60), 1)
+        self.assertEqual(self.sut.update(SECOND_SERVER, FIRST_PLAYER, 3, self.now + 60), 1)
+
+        self.sut.remove(FIRST_SERVER, FIRST_PLAYER)
+
+        self.assertIsNone(self.sut.get(FIRST_SERVER, FIRST_PLAYER))
+        self.assertEqual(self.sut.get(SECOND_SERVER, FIRST_PLAYER).onlineTime, 3)
+        self.assertEqual(len(self.sut), 1)
+
+    def test_restartWhileNotSeen(self):
+        self.sut.update(FIRST_SERVER, FIRST_PLAYER, 30, self.now)
+
+        # Ten minutes passed, but the online time only grew by five, so the player must have reconnected
+        self.assertEqual(self.sut.update(FIRST_SERVER, FIRST_PLAYER, 35, self.now + 600), 35)
+        # A poll which failed for a few minutes does not restart the session though
+        self.assertEqual(self.sut.update(FIRST_SERVER, FIRST_PLAYER, 40, self.now + 900), 5)
+
+    def test_sweep(self):
+        self.sut.update(FIRST_SERVER, FIRST_PLAYER, 30, self.now)
+        self.sut.update(SECOND_SERVER, FIRST_PLAYER, 30, self.now + TTL)
+
+        expired = self.sut.sweep(self.now + TTL + 1)
+        self.assertEqual([(serverId, playerName) for serverId, playerName, session in expired], [(FIRST_SERVER, FIRST_PLAYER)])
+        self.assertEqual(expired[0][2].pendingMinutes, 30)
+        self.assertIsNone(self.sut.get(FIRST_SERVER, FIRST_PLAYER))
+        self.assertIsNotNone(self.sut.get(SECOND_SERVER, FIRST_PLAYER))
+        # Sweeps are rate limited
+        self.assertEqual(len(self.sut.sweep(self.now + 2 * TTL + 1 - TTL // 2)), 0)
+        self.assertEqual(len(self.sut.sweep(self.now + 2 * TTL + 1)), 1)
+
+    def test_pendingMinutes(self):
+        self.sut.update(FIRST_SERVER, FIRST_PLAYER, 30, self.now)
+        self.sut.update(FIRST_SERVER, FIRST_PLAYER, 31, self.now + 60)
+        self.sut.update(SECOND_SERVER, FIRST_PLAYER, 2, self.now + 60)
+
+        self.assertEqual(self.sut.get(FIRST_SERVER, FIRST_PLAYER).pendingMinutes, 31)
+        self.assertEqual(len(self.sut.get_pending_sessions()), 2)
+        self.assertEqual([(serverId, session.pendingMinutes) for serverId, playerName, session
+                          in self.sut.get_pending_sessions(SECOND_SERVER)], [(SECOND_SERVER, 2)])
+
+    def test_firstSightingIsCappedByLastPoll(self):
+        table = SessionTable(TTL)
+        self.assertEqual(table.update(FIRST_SERVER, FIRST_PLAYER, 300, self.now), 0, "The server was never polled")
+        self.assertEqual(table.get(FIRST_SERVER, FIRST_PLAYER).onlineTime, 300)
+
+        table.mark_polled(SECOND_SERVER, self.now - 290)
+        self.assertEqual(table.update(SECOND_SERVER, FIRST_PLAYER, 300, self.now), 5)
+        self.assertEqual(table.update(SECOND_SERVER, "Player 2", 2, self.now), 2)
+
+    def test_legacyCheckpoint(self):
+        restoredTable = SessionTable(TTL)
+        restoredTable.restore_checkpoint({"sessions": [[FIRST_SERVER, FIRST_PLAYER, 30, self.now]]})
+
+        self.assertEqual(restoredTable.lastPolls, {FIRST_SERVER: self.now})
+        self.assertEqual(restoredTable.get(FIRST_SERVER, FIRST_PLAYER).pendingMinutes, 0)
+        self.assertEqual(restoredTable.update(FIRST_SERVER, "Player 2", 300, self.now + 600), 10)
+
+    def test_checkpoint(self):
+        self.sut.update(FIRST_SERVER, FIRST_PLAYER, 30, self.now)
+
+        restoredTable = SessionTable(TTL)
+        restoredTable.restore_checkpoint(self.sut.to_checkpoint())
+
+        self.assertEqual(restoredTable.update(FIRST_SERVER, FIRST_PLAYER, 32, self.now + 120), 2)
+        self.assertEqual(restoredTable.lastPolls, self.sut.lastPolls)
+
+
+if __name__ == '__main__':
+    unittest.main()
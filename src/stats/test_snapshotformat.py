@@ -0,0 +1,146 @@
+from stats.snapshotformat import to_binary, from_binary, json_to_binary, binary_to_json, is_binary_snapshot, \
+    write_varint, write_array, MAGIC, RING_NAMES, V1_WINDOWS
+from stats.statstracker import OnlineTimeTracker, StatsWindows
+from array import array
+from unittest import mock
+import datetime
+import io
+import json
+import unittest
+
+FIRST_SERVER = 0
+SECOND_SERVER = 1
+FIRST_PLAYER = "Player 1"
+SECOND_PLAYER = "Spieler Ä"
+
+
+def write_legacy_columns(payload: bytearray, ring, serverColumns, windows: list[int]):
+    """Writes the slots, minutes and totals of a server as versions 1 and 2 did"""
+    numSlots = len(serverColumns.playerIndices)
+    write_varint(payload, numSlots)
+    write_array(payload, serverColumns.playerIndices)
+    write_array(payload, array("I", [
+        serverColumns.get_minutes(slot, column) for slot in range(numSlots) for column in range(ring.numBuckets)]))
+    for window in windows:
+        write_array(payload, array("I", [
+            sum(serverColumns.get_minutes(slot, ring.get_column(bucket)) for bucket in range(window))
+            for slot in range(numSlots)]))
+
+
+def to_legacy_binary(timeTracker: OnlineTimeTracker, version: int, windows: dict[str, list[int]] = V1_WINDOWS) -> bytes:
+    """Writes an uncompressed snapshot as versions 1 and 2 did, with the slots and totals stored per ring.
+    Version 1 did not store the windows of the rings."""
+    payload = bytearray()
+    for value in [timeTracker.lastUpdate.toordinal(), timeTracker.sessionCount, timeTracker.numDays,
+                  len(timeTracker.playerNames)]:
+        write_varint(payload, value)
+    for playerName in timeTracker.playerNames:
+        write_varint(payload, len(playerName.encode("utf-8")))
+        payload += playerName.encode("utf-8")
+    for ringName in RING_NAMES:
+        ring = getattr(timeTracker, ringName)
+        ringWindows = sorted({min(window, ring.numBuckets) for window in windows[ringName]} | {ring.numBuckets})
+        write_varint(payload, ring.numBuckets)
+        write_varint(payload, ring.head)
+        if version >= 2:
+            write_varint(payload, len(ringWindows))
+            for window in ringWindows:
+                write_varint(payload, window)
+        write_varint(payload, len(ring.servers))
+        for serverId, serverColumns in ring.servers.items():
+            write_varint(payload, serverId)
+            write_legacy_columns(payload, ring, serverColumns, ringWindows)
+        write_legacy_columns(payload, ring, ring.combined, ringWindows)
+    return MAGIC + bytes([version, 0]) + payload
+
+
+class TestSnapshotFormat(unittest.TestCase):
+
+    def setUp(self):
+        self.today = datetime.date(2024, 5, 1)
+        self.tracker = OnlineTimeTracker.create_new()
+        self.tracker.add_online_time(FIRST_SERVER, FIRST_PLAYER, 5, self.today - datetime.timedelta(days=40))
+        self.tracker.add_online_time(FIRST_SERVER, SECOND_PLAYER, 3, self.today - datetime.timedelta(days=10))
+        self.tracker.add_online_time(SECOND_SERVER, FIRST_PLAYER, 7, self.today)
+
+    def assert_same_stats(self, restoredTracker: OnlineTimeTracker):
+        self.assertEqual(restoredTracker.lastUpdate, self.tracker.lastUpdate)
+        self.assertEqual(restoredTracker.sessionCount, self.tracker.sessionCount)
+        for window in StatsWindows.available:
+            self.assertEqual(
+                restoredTracker.get_total_stats([FIRST_SERVER, SECOND_SERVER], window),
+                self.tracker.get_total_stats([FIRST_SERVER, SECOND_SERVER], window))
+            self.assertEqual(
+                restoredTracker.get_server_stats(FIRST_SERVER, window),
+                self.tracker.get_server_stats(FIRST_SERVER, window))
+
+    def test_roundTrip(self):
+        for compress in [True, False]:
+            data = to_binary(self.tracker, compress)
+
+            self.assertTrue(is_binary_snapshot(data))
+            self.assert_same_stats(from_binary(data))
+
+    def test_streamedInSmallChunks(self):
+        for compress in [True, False]:
+            stream = io.BytesIO(to_binary(self.tracker, compress))
+
+            # Values which span several chunks must be read across their boundaries
+            with mock.patch("stats.snapshotformat.CHUNK_SIZE", 3):
+                self.assert_same_stats(from_binary(stream))
+
+    def test_addAfterLoad(self):
+        restoredTracker = from_binary(to_binary(self.tracker))
+
+        restoredTracker.add_online_time(FIRST_SERVER, SECOND_PLAYER, 4, self.today)
+        self.tracker.add_online_time(FIRST_SERVER, SECOND_PLAYER, 4, self.today)
+
+        self.assert_same_stats(restoredTracker)
+
+    def test_jsonConversion(self):
+        data = json_to_binary(self.tracker.to_json())
+
+        self.assertEqual(json.loads(binary_to_json(data)), json.loads(self.tracker.to_json()))
+
+    def test_version1(self):
+        self.tracker.move_to_date(self.today + datetime.timedelta(days=3))  # Moves the head of the days
+
+        self.assert_same_stats(from_binary(to_legacy_binary(self.tracker, 1)))
+
+    def test_version2WithOtherWindows(self):
+        # Pretend the snapshot was written while the last 7 days were no window, but the last 3 days were
+        windows = dict(V1_WINDOWS, days=[1, 3, 14, 30])
+        restoredTracker = from_binary(to_legacy_binary(self.tracker, 2, windows))
+
+        self.assertEqual(restoredTracker.days.windows, [1, 7, 14, 30])
+        self.assert_same_stats(restoredTracker)
+        self.assertEqual(
+            restoredTracker.get_total_stats([FIRST_SERVER, SECOND_SERVER], StatsWindows.lastWeek), {FIRST_PLAYER: 7})
+        self.assertEqual(restoredTracker.get_server_stats(FIRST_SERVER, StatsWindows.lastTwoWeeks), {SECOND_PLAYER: 3})
+
+    def test_slotsAreSharedByRings(self):
+        restoredTracker = from_binary(to_binary(self.tracker))
+
+        for ringName in RING_NAMES:
+            ring = getattr(restoredTracker, ringName)
+            self.assertIs(ring.combined.playerSlots, restoredTracker.combinedSlots)
+            for serverId, serverColumns in ring.servers.items():
+                self.assertIs(serverColumns.playerSlots, restoredTracker.serverSlots[serverId])
+        self.assertEqual(restoredTracker.weeks.servers[FIRST_SERVER].columns[restoredTracker.weeks.head], {})
+
+    def test_invalidData(self):
+        data = to_binary(self.tracker)
+
+        self.assertFalse(is_binary_snapshot(self.tracker.to_json().encode()))
+        with self.assertRaises(ValueError):
+            from_binary(b"XXXX" + data[4:])
+        with self.assertRaises(ValueError):
+            from_binary(data[:len(data) // 2])
+        with self.assertRaises(ValueError):
+            from_binary(to_binary(self.tracker, compress=False)[:-1])
+        with self.assertRaises(ValueError):
+            from_binary(data[:5])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+from stats.sqlitetracker import SqliteTimeTracker
+from stats.statstracker import DailyStats, OnlineTimeTracker, StatsWindows
+import datetime
+import os
+import tempfile
+import unittest
+
+FIRST_SERVER = 0
+SECOND_SERVER = 1
+FIRST_PLAYER = "Player 1"
+SECOND_PLAYER = "Player 2"
+
+
+class TestSqliteTimeTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.today = datetime.date(2023, 5, 1)
+        self.sut = SqliteTimeTracker(os.path.join(self.folder.name, "fssb.sqlite"))
+        self.sut.add_online_time(FIRST_SERVER, FIRST_PLAYER, 5, self.today)
+        self.sut.add_online_time(FIRST_SERVER, FIRST_PLAYER, 2, self.today - datetime.timedelta(days=1))
+        self.sut.add_online_time(SECOND_SERVER, SECOND_PLAYER, 3, self.today - datetime.timedelta(days=1))
+        self.sut.add_online_time(FIRST_SERVER, SECOND_PLAYER, 7, self.today - datetime.timedelta(days=20))
+        self.sut.add_online_time(SECOND_SERVER, FIRST_PLAYER, 11, self.today - datetime.timedelta(days=35))
+        self.sut.flush()
+
+    def tearDown(self):
+        self.sut.close()
+        self.folder.cleanup()
+
+    def test_windows(self):
+        self.assertEqual(self.sut.get_online_time(FIRST_PLAYER, StatsWindows.today, self.today), 5)
+        self.assertEqual(self.sut.get_online_time(FIRST_PLAYER, StatsWindows.lastWeek, self.today), 5+2)
+        self.assertEqual(self.sut.get_online_time(FIRST_PLAYER, StatsWindows.lastQuarter, self.today), 5+2+11)
+        self.assertEqual(self.sut.get_online_time(FIRST_PLAYER, StatsWindows.allTime, self.today), 5+2+11)
+
+    def test_totalStats(self):
+        self.assertEqual(self.sut.get_total_stats([FIRST_SERVER, SECOND_SERVER], StatsWindows.lastMonth, self.today), {
+            FIRST_PLAYER: 5+2, SECOND_PLAYER: 3+7})
+        self.assertEqual(self.sut.get_server_stats(SECOND_SERVER, StatsWindows.lastYear, self.today), {
+            FIRST_PLAYER: 11, SECOND_PLAYER: 3})
+
+    def test_sameResultsAsInMemoryTracker(self):
+        inMemoryTracker = self.sut.to_tracker()
+        for window in StatsWindows.available:
+            self.assertEqual(
+                self.sut.get_total_stats([FIRST_SERVER, SECOND_SERVER], window, self.today),
+                inMemoryTracker.get_total_stats([FIRST_SERVER, SECOND_SERVER], window),
+                window.name)
+
+    def test_import(self):
+        stats: dict[int, DailyStats] = {i: DailyStats() for i in range(30)}
+        stats[0].add_online_time(FIRST_SERVER, FIRST_PLAYER, 4)
+        stats[2].add_online_time(SECOND_SERVER, SECOND_PLAYER, 6)
+        timeTracker = OnlineTimeTracker(stats, self.today)
+        timeTracker.allTime.add_minutes(0, FIRST_SERVER, timeTracker.intern_player(FIRST_PLAYER), 100)
+
+        database = SqliteTimeTracker(os.path.join(self.folder.name, "imported.sqlite"))
+        self.assertTrue(database.is_empty())
+        database.import_tracker(timeTracker)
+
+        self.assertEqual(database.get_total_stats([FIRST_SERVER, SECOND_SERVER], StatsWindows.lastMonth, self.today), {
+            FIRST_PLAYER: 4, SECOND_PLAYER: 6})
+        self.assertEqual(database.get_online_time(FIRST_PLAYER, StatsWindows.allTime, self.today), 104)
+        database.close()
+
+    def test_importKeepsWeeksAndMonths(self):
+        timeTracker = OnlineTimeTracker.create_new()
+        firstDate = self.today - datetime.timedelta(days=300)
+        for day in range(0, 301, 3):
+            date = firstDate + datetime.timedelta(days=day)
+            timeTracker.add_online_time(FIRST_SERVER, FIRST_PLAYER, day % 7 + 1, date)
+            timeTracker.add_online_time(SECOND_SERVER, SECOND_PLAYER, day % 5 + 2, date)
+            timeTracker.add_online_time(SECOND_SERVER, FIRST_PLAYER, 3, date)
+        serverIds = [FIRST_SERVER, SECOND_SERVER]
+        self.assertEqual(timeTracker.lastUpdate, self.today)
+
+        database = SqliteTimeTracker(os.path.join(self.folder.name, "migrated.sqlite"))
+        database.import_tracker(timeTracker)
+
+        for window in StatsWindows.available:
+            self.assertEqual(
+                database.get_total_stats(serverIds, window, self.today), timeTracker.get_total_stats(serverIds, window),
+                window.name)
+            self.assertEqual(
+                database.get_server_stats(SECOND_SERVER, window, self.today),
+                timeTracker.get_server_stats(SECOND_SERVER, window), window.name)
+            self.assertEqual(
+                database.get_online_time(FIRST_PLAYER, window, self.today),
+                timeTracker.get_online_time(FIRST_PLAYER, window), window.name)
+        exportedTracker = database.to_tracker()
+        for window in StatsWindows.available:
+            self.assertEqual(
+                exportedTracker.get_total_stats(serverIds, window), timeTracker.get_total_stats(serverIds, window),
+                window.name)
+        database.close()
+
+    def test_failedImportLeavesNothingBehind(self):
+        rows = [(FIRST_SERVER, self.today.toordinal(), "Imported", 5), (FIRST_SERVER, self.today.toordinal(), None, 5)]
+
+        with self.assertRaises(Exception):
+            self.sut.add_rows(rows)
+
+        self.assertEqual(self.sut.get_online_time("Imported", StatsWindows.allTime, self.today), 0)
+        self.assertEqual(self.sut.get_online_time(FIRST_PLAYER, StatsWindows.allTime, self.today), 5+2+11)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+from stats.statsreporter import StatsReporter, StatsEmbedConfig, get_leaderboard_page, build_leaderboard_text
+from stats.statstracker import OnlineTimeTracker
+import asyncio
+import datetime
+import unittest
+
+HEADER = "Online times:\r\n"
+FIRST_GUILD = 100
+FIRST_SERVER = 0
+SECOND_SERVER = 1
+
+
+class TestLeaderboard(unittest.TestCase):
+
+    def setUp(self):
+        self.onlineTimes = {f"Player {index}": index * 10 for index in range(1, 101)}
+        self.onlineTimes["Another player"] = 1000
+
+    def test_pages(self):
+        firstPage = get_leaderboard_page(self.onlineTimes, 10, 0)
+        secondPage = get_leaderboard_page(self.onlineTimes, 10, 1)
+        lastPage = get_leaderboard_page(self.onlineTimes, 10, 10)
+
+        self.assertEqual(firstPage[:3], [("Another player", 1000), ("Player 100", 1000), ("Player 99", 990)])
+        self.assertEqual(secondPage[0], ("Player 91", 910))
+        self.assertEqual(lastPage, [("Player 1", 10)])
+        self.assertEqual(get_leaderboard_page(self.onlineTimes, 10, 11), [])
+
+    def test_text(self):
+        text = build_leaderboard_text(HEADER, [("Player 2", 20), ("Player 1", 10)], 11)
+
+        self.assertEqual(text, HEADER + "\r\n    11. **Player 2**: 20 minutes\r\n    12. **Player 1**: 10 minutes")
+
+    def test_textIsTruncated(self):
+        entries = get_leaderboard_page(self.onlineTimes, 101, 0)
+
+        text = build_leaderboard_text(HEADER, entries, 1, limit=500)
+
+        self.assertLessEqual(len(text.encode()), 500)
+        self.assertRegex(text, r"\.\.\. and \d+ more$")
+        self.assertEqual(len(build_leaderboard_text(HEADER, entries, 1).split("**: ")), 102)
+
+
+class TestStatsCache(unittest.TestCase):
+
+    def setUp(self):
+        self.timeTracker = OnlineTimeTracker.create_new()
+        self.timeTracker.add_online_time(FIRST_SERVER, "Player 1", 10)
+        self.sut = StatsReporter(None)
+        self.sut.set_time_tracker(self.timeTracker)
+        self.sut.update_guild_to_server_map({FIRST_GUILD: [FIRST_SERVER]})
+        self.embedConfig = StatsEmbedConfig(1, 2)
+
+    def render(self) -> str:
+        async def render():
+            embed, view = await self.sut.render_embed(self.embedConfig, [FIRST_SERVER])
+            return embed.description
+        return asyncio.run(render())
+
+    def test_cachedUntilUpdated(self):
+        self.assertIn("10 minutes", self.render())
+
+        self.timeTracker.add_online_time(FIRST_SERVER, "Player 1", 5)
+        self.assertIn("10 minutes", self.render())
+        self.sut.on_stats_updated(SECOND_SERVER)
+        self.assertIn("10 minutes", self.render())
+
+        self.sut.on_stats_updated(FIRST_SERVER)
+        self.assertIn("15 minutes", self.render())
+
+    def test_invalidatedByDayRotation(self):
+        self.render()
+        self.timeTracker.add_online_time(FIRST_SERVER, "Player 1", 5)
+
+        for cacheEntry in self.sut.statsCache.values():
+            cacheEntry.date -= datetime.timedelta(days=1)
+
+        self.assertIn("15 minutes", self.render())
+
+    def test_renderedContent(self):
+        self.render()
+        renderedContent = self.embedConfig.renderedContent
+        self.sut.on_stats_updated(FIRST_SERVER)
+        self.render()
+
+        self.assertEqual(self.embedConfig.renderedContent, renderedContent)
+
+
+if __name__ == '__main__':
+    unittest.main()
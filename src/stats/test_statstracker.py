@@ -1,4 +1,4 @@
-from statstracker import PlayerServerStats, ServerPlayerStats, DailyStats, OnlineTimeTracker, HelperFuncs
+from statstracker import PlayerServerStats, ServerPlayerStats, DailyStats, OnlineTimeTracker, HelperFuncs, StatsWindows, NUM_WEEKS
 import unittest
 import datetime
 import json
@@ -133,6 +133,24 @@ class TestOnlineTimeTracker(unittest.TestCase):
         self.assertEqual(self.sut.get_online_time(FIRST_PLAYER), 0)
         self.assertEqual(self.sut.get_online_time(SECOND_PLAYER), 0)
 
+    def test_longDowntime(self):
+
+        self.sut.lastUpdate = datetime.date.today() - datetime.timedelta(days=365)
+        self.sut.add_online_time(SECOND_SERVER, SECOND_PLAYER, 7)
+
+        self.assertEqual(self.sut.get_online_time(FIRST_PLAYER), 0)
+        self.assertEqual(self.sut.get_online_time(SECOND_PLAYER), 7)
+        self.assertEqual(self.sut.stats[MOST_RECENT_DAY].get_server_stats(SECOND_SERVER), {SECOND_PLAYER: 7})
+
+    def test_ringBufferSerialization(self):
+        self.sut.add_online_time(FIRST_SERVER, FIRST_PLAYER, 10)
+        self.assertNotEqual(self.sut.days.head, 0)
+
+        j = self.sut.to_json()
+        j2 = OnlineTimeTracker.from_json(j).to_json()
+        self.assertEqual(j, j2)
+        self.assertEqual(self.sut.stats[ONE_DAY_BEFORE].get_online_time(FIRST_PLAYER), 5+4)
+
     def test_emptyStatsTracker(self):
         numDays = 42
         sut2 = OnlineTimeTracker.create_new(numDays)
@@ -146,5 +164,92 @@ class TestOnlineTimeTracker(unittest.TestCase):
         j2 = OnlineTimeTracker.from_json(j).to_json()
         self.assertEqual(j, j2)
 
+    def test_serializationIsIndependentOfInsertionOrder(self):
+        stats: dict[int, DailyStats] = {i : DailyStats() for i in range(self.numDays)}
+        stats[TWO_DAYS_BEFORE].add_online_time(FIRST_SERVER, SECOND_PLAYER, 5)
+        stats[ONE_DAY_BEFORE].add_online_time(FIRST_SERVER, FIRST_PLAYER, 2)
+        stats[MOST_RECENT_DAY].add_online_time(SECOND_SERVER, FIRST_PLAYER, 4)
+        stats[MOST_RECENT_DAY].add_online_time(FIRST_SERVER, SECOND_PLAYER, 3)
+        stats[MOST_RECENT_DAY].add_online_time(FIRST_SERVER, FIRST_PLAYER, 5)
+        reorderedTracker = OnlineTimeTracker(stats, self.lastUpdate)
+
+        self.assertEqual(reorderedTracker.to_json(), self.sut.to_json())
+
+    def test_totalsFollowDayRotation(self):
+        self.sut.shift_entries(2)
+        self.assertEqual(self.sut.get_total_stats([FIRST_SERVER, SECOND_SERVER]), {FIRST_PLAYER: 5+4, SECOND_PLAYER: 3})
+        self.sut.shift_entries(1)
+        self.assertEqual(self.sut.get_total_stats([FIRST_SERVER, SECOND_SERVER]), {})
+        self.sut.add_minutes(MOST_RECENT_DAY, FIRST_SERVER, SECOND_PLAYER, 7)
+        self.assertEqual(self.sut.get_server_stats(FIRST_SERVER), {SECOND_PLAYER: 7})
+
+    def test_playerNamesAreInterned(self):
+        self.assertEqual(self.sut.playerNames, [FIRST_PLAYER, SECOND_PLAYER])
+        self.sut.add_online_time(SECOND_SERVER, SECOND_PLAYER, 1)
+        self.assertEqual(len(self.sut.playerNames), 2)
+
+
+class TestStatsWindows(unittest.TestCase):
+
+    def setUp(self):
+        # A monday, so the last day of the previous week and month is one day before
+        self.lastUpdate = datetime.date(2023, 5, 1)
+        self.stats: dict[int, DailyStats] = {i : DailyStats() for i in range(40)}
+        self.stats[MOST_RECENT_DAY].add_online_time(FIRST_SERVER, FIRST_PLAYER, 5)
+        self.stats[ONE_DAY_BEFORE].add_online_time(FIRST_SERVER, FIRST_PLAYER, 2)
+        self.stats[ONE_DAY_BEFORE].add_online_time(SECOND_SERVER, SECOND_PLAYER, 3)
+        self.stats[20].add_online_time(FIRST_SERVER, SECOND_PLAYER, 7)
+        self.stats[35].add_online_time(SECOND_SERVER, FIRST_PLAYER, 11)
+        self.sut = OnlineTimeTracker(self.stats, self.lastUpdate)
+
+    def test_dailyWindows(self):
+        self.assertEqual(self.sut.get_online_time(FIRST_PLAYER, StatsWindows.today), 5)
+        self.assertEqual(self.sut.get_total_stats([FIRST_SERVER, SECOND_SERVER], StatsWindows.lastWeek), {
+            FIRST_PLAYER: 5+2, SECOND_PLAYER: 3})
+        self.assertEqual(self.sut.get_server_stats(FIRST_SERVER, StatsWindows.lastMonth), {
+            FIRST_PLAYER: 5+2, SECOND_PLAYER: 7})
+
+    def test_rollups(self):
+        self.assertEqual(self.sut.get_online_time(FIRST_PLAYER, StatsWindows.lastQuarter), 5+2+11)
+        self.assertEqual(self.sut.get_online_time(FIRST_PLAYER, StatsWindows.allTime), 5+2+11)
+        self.assertEqual(self.sut.get_total_stats([FIRST_SERVER, SECOND_SERVER], StatsWindows.lastYear), {
+            FIRST_PLAYER: 5+2+11, SECOND_PLAYER: 3+7})
+
+    def test_rollupsExpire(self):
+        self.sut.move_to_date(self.lastUpdate + datetime.timedelta(weeks=NUM_WEEKS))
+        self.assertEqual(self.sut.get_online_time(FIRST_PLAYER, StatsWindows.lastQuarter), 0)
+        self.assertEqual(self.sut.get_online_time(FIRST_PLAYER, StatsWindows.lastYear), 5+2+11)
+
+        self.sut.move_to_date(datetime.date(2024, 5, 1))
+        self.assertEqual(self.sut.get_online_time(FIRST_PLAYER, StatsWindows.lastYear), 0)
+        self.assertEqual(self.sut.get_online_time(FIRST_PLAYER, StatsWindows.allTime), 5+2+11)
+
+    def test_serialization(self):
+        self.sut.move_to_date(self.lastUpdate + datetime.timedelta(days=45))
+        j = self.sut.to_json()
+        sut2 = OnlineTimeTracker.from_json(j)
+        self.assertEqual(sut2.to_json(), j)
+        self.assertEqual(sut2.get_online_time(FIRST_PLAYER, StatsWindows.lastMonth), 0)
+        self.assertEqual(sut2.get_online_time(FIRST_PLAYER, StatsWindows.allTime), 5+2+11)
+
+    def test_ringsShareSlots(self):
+        serverSlots = self.sut.serverSlots[FIRST_SERVER]
+        for ring in [self.sut.days, self.sut.weeks, self.sut.months, self.sut.allTime]:
+            self.assertIs(ring.servers[FIRST_SERVER].playerSlots, serverSlots)
+        self.assertEqual(len(serverSlots.playerIndices), 2)
+        # Weeks only store the players who were online in a week
+        weekColumns = self.sut.weeks.servers[FIRST_SERVER].columns
+        self.assertEqual([len(columnMinutes) for columnMinutes in weekColumns if columnMinutes], [1, 1, 1])
+
+    def test_dailyOnlyDataIsExtended(self):
+        tmpDict = json.loads(self.sut.to_json())
+        for level in ["weeks", "months", "allTime"]:
+            del tmpDict[level]
+        sut2 = OnlineTimeTracker.from_json(json.dumps(tmpDict), numDays=50)
+
+        self.assertEqual(sut2.numDays, 50)
+        self.assertEqual(json.loads(sut2.to_json())["allTime"], json.loads(self.sut.to_json())["allTime"])
+
+
 if __name__ == "__main__":
     unittest.main()
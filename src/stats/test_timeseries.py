@@ -0,0 +1,65 @@
+from stats.timeseries import TimeSeriesStore, RoundRobinArchive
+import unittest
+
+FIRST_SERVER = 0
+SECOND_SERVER = 1
+START = 1_700_000_000
+
+
+def to_tuples(points) -> list[tuple]:
+    return [(point.timestamp, point.minPlayers, point.maxPlayers, point.avgPlayers, point.availability) for point in points]
+
+
+class TestTimeSeries(unittest.TestCase):
+
+    def setUp(self):
+        self.sut = TimeSeriesStore()
+
+    def test_bucketSummary(self):
+        for index, playerCount in enumerate([3, 1, 5, 3]):
+            self.sut.record(FIRST_SERVER, START + index * 5, playerCount, index != 1)
+
+        points = self.sut.get_points(FIRST_SERVER, 86400, START + 60)
+
+        self.assertEqual(len(points), 1)
+        self.assertEqual((points[0].minPlayers, points[0].maxPlayers), (1, 5))
+        self.assertEqual(points[0].avgPlayers, 3)
+        self.assertEqual(points[0].availability, 0.75)
+
+    def test_finestArchive(self):
+        for index in range(120):
+            self.sut.record(FIRST_SERVER, START + index * 5, index % 4, True)
+        end = START + 600
+
+        self.assertEqual(len(self.sut.get_points(FIRST_SERVER, 3600, end)), 120)
+        self.assertEqual(len(self.sut.get_points(FIRST_SERVER, 86400, end)), 11)
+        self.assertEqual(self.sut.get_points(SECOND_SERVER, 3600, end), [])
+
+    def test_bucketsAreReused(self):
+        archive = RoundRobinArchive(5, 4)
+        archive.record(START, 10, True)
+        archive.record(START + 20, 2, False)
+
+        points = archive.get_points(START - 100, START + 20)
+
+        self.assertEqual([(point.timestamp, point.maxPlayers) for point in points], [(START + 20, 2)])
+
+    def test_binaryRoundTrip(self):
+        for index in range(1000):
+            self.sut.record(FIRST_SERVER, START + index * 30, index % 7, index % 10 != 0)
+        self.sut.record(SECOND_SERVER, START, 1, True)
+        end = START + 30000
+
+        restoredStore = TimeSeriesStore.from_binary(self.sut.to_binary())
+
+        self.assertEqual(restoredStore.servers.keys(), self.sut.servers.keys())
+        for duration in [3600, 86400, 30 * 86400, 365 * 86400]:
+            self.assertEqual(
+                to_tuples(restoredStore.get_points(FIRST_SERVER, duration, end)),
+                to_tuples(self.sut.get_points(FIRST_SERVER, duration, end)))
+        with self.assertRaises(ValueError):
+            TimeSeriesStore.from_binary(self.sut.to_binary()[:1000])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+"""Round robin archives of the player count of each server, similar to RRDtool.
+
+Every server has one archive per resolution. Each archive is a ring of buckets, and each bucket summarizes the polls
+within its time span by the minimum, maximum and sum of the player count, the number of polls, and the number of polls
+in which the server was online. A bucket is reset when it is reused for a newer time span, so memory is constant per
+server and recording a poll costs the same for every archive, no matter how long the bot has been running.
+"""
+from fs22.fs22server import OnlineState
+from fs22.servertracker import ServerStatusChanges
+from array import array
+import struct
+import sys
+import time
+
+# Seconds per bucket and number of buckets: five seconds for an hour, a minute for a day, 15 minutes for a month,
+# and an hour for a year
+ARCHIVES = [(5, 720), (60, 1440), (900, 2880), (3600, 8760)]
+
+MAGIC = b"FSTS"
+VERSION = 1
+HEADER = struct.Struct("<4sBI")  # magic, version, number of servers
+SERVER_HEADER = struct.Struct("<iI")  # server ID, number of archives
+ARCHIVE_HEADER = struct.Struct("<II")  # seconds per bucket, number of buckets
+
+
+class TimeSeriesPoint:
+    """Summarizes the polls within a single bucket"""
+    __slots__ = ("timestamp", "minPlayers", "maxPlayers", "avgPlayers", "availability")
+
+    def __init__(self, timestamp: int, minPlayers: int, maxPlayers: int, avgPlayers: float, availability: float):
+        self.timestamp = timestamp  # Start of the bucket in seconds since the epoch
+        self.minPlayers = minPlayers
+        self.maxPlayers = maxPlayers
+        self.avgPlayers = avgPlayers
+        self.availability = availability  # Share of the polls in which the server was online
+
+
+class RoundRobinArchive:
+    """A ring of buckets with a fixed resolution"""
+
+    def __init__(self, step: int, numBuckets: int):
+        self.step = step
+        self.numBuckets = numBuckets
+        self.periods = array("q", [-1]) * numBuckets  # The time span of each bucket, in steps since the epoch
+        self.minPlayers = array("H", [0]) * numBuckets
+        self.maxPlayers = array("H", [0]) * numBuckets
+        self.sumPlayers = array("I", [0]) * numBuckets
+        self.samples = array("H", [0]) * numBuckets
+        self.onlineSamples = array("H", [0]) * numBuckets
+
+    def get_arrays(self) -> list[array]:
+        return [self.periods, self.minPlayers, self.maxPlayers, self.sumPlayers, self.samples, self.onlineSamples]
+
+    def record(self, timestamp: float, playerCount: int, isOnline: bool):
+        period = int(timestamp) // self.step
+        bucket = period % self.numBuckets
+        if self.periods[bucket] != period:
+            self.periods[bucket] = period
+            self.minPlayers[bucket] = playerCount
+            self.maxPlayers[bucket] = playerCount
+            self.sumPlayers[bucket] = 0
+            self.samples[bucket] = 0
+            self.onlineSamples[bucket] = 0
+        elif playerCount < self.minPlayers[bucket]:
+            self.minPlayers[bucket] = playerCount
+        elif playerCount > self.maxPlayers[bucket]:
+            self.maxPlayers[bucket] = playerCount
+        self.sumPlayers[bucket] += playerCount
+        self.samples[bucket] += 1
+        if isOnline:
+            self.onlineSamples[bucket] += 1
+
+    def get_points(self, start: float, end: float) -> list[TimeSeriesPoint]:
+        """Returns the buckets within the given time span which contain polls, oldest first"""
+        firstPeriod = max(int(start) // self.step, int(end) // self.step - self.numBuckets + 1)
+        points = []
+        for period in range(firstPeriod, int(end) // self.step + 1):
+            bucket = period % self.numBuckets
+            if self.periods[bucket] != period or self.samples[bucket] == 0:
+                continue
+            samples = self.samples[bucket]
+            points.append(TimeSeriesPoint(
+                period * self.step, self.minPlayers[bucket], self.maxPlayers[bucket],
+                self.sumPlayers[bucket] / samples, self.onlineSamples[bucket] / samples))
+        return points
+
+
+class ServerTimeSeries:
+    """The archives of a single server"""
+
+    def __init__(self):
+        self.archives = [RoundRobinArchive(step, numBuckets) for step, numBuckets in ARCHIVES]
+
+    def record(self, timestamp: float, playerCount: int, isOnline: bool):
+        for archive in self.archives:
+            archive.record(timestamp, playerCount, isOnline)
+
+    def get_points(self, duration: float, end: float = None) -> list[TimeSeriesPoint]:
+        """Returns the points of the finest archive which covers the given amount of seconds"""
+        end = end or time.time()
+        archive = next(
+            (archive for archive in self.archives if archive.step * archive.numBuckets >= duration), self.archives[-1])
+        return archive.get_points(end - duration, end)
+
+
+class TimeSeriesStore:
+    """Records the player count and online state of every server on every poll"""
+
+    def __init__(self):
+        self.servers: dict[int, ServerTimeSeries] = {}
+
+    def on_changes(self, changes: ServerStatusChanges):
+        self.record(changes.serverId, time.time(), changes.playerCount, changes.serverData.status == OnlineState.Online)
+
+    def record(self, serverId: int, timestamp: float, playerCount: int, isOnline: bool):
+        if serverId not in self.servers:
+            self.servers[serverId] = ServerTimeSeries()
+        self.servers[serverId].record(timestamp, playerCount, isOnline)
+
+    def get_points(self, serverId: int, duration: float, end: float = None) -> list[TimeSeriesPoint]:
+        if serverId not in self.servers:
+            return []
+        return self.servers[serverId].get_points(duration, end)
+
+    def remove_server(self, serverId: int):
+        self.servers.pop(serverId, None)
+
+    ### Persistence ###
+
+    def to_binary(self) -> bytes:
+        """Serializes all archives. The arrays are written as they are kept in memory, in little endian byte order."""
+        chunks = [HEADER.pack(MAGIC, VERSION, len(self.servers))]
+        for serverId, serverTimeSeries in self.servers.items():
+            chunks.append(SERVER_HEADER.pack(serverId, len(serverTimeSeries.archives)))
+            for archive in serverTimeSeries.archives:
+                chunks.append(ARCHIVE_HEADER.pack(archive.step, archive.numBuckets))
+                for values in archive.get_arrays():
+                    if sys.byteorder == "big":
+                        values = array(values.typecode, values)
+                        values.byteswap()
+                    chunks.append(values.tobytes())
+        return b"".join(chunks)
+
+    @classmethod
+    def from_binary(cls, data: bytes):
+        """Restores the archives. Archives with a different resolution than the current ones are dropped."""
+        magic, version, numServers = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("The data are not a supported time series snapshot")
+        offset = HEADER.size
+        result = cls()
+        for _ in range(numServers):
+            serverId, numArchives = SERVER_HEADER.unpack_from(data, offset)
+            offset += SERVER_HEADER.size
+            serverTimeSeries = ServerTimeSeries()
+            archivesByResolution = {
+                (archive.step, archive.numBuckets): archive for archive in serverTimeSeries.archives}
+            for _ in range(numArchives):
+                step, numBuckets = ARCHIVE_HEADER.unpack_from(data, offset)
+                offset += ARCHIVE_HEADER.size
+                archive = archivesByResolution.get((step, numBuckets), RoundRobinArchive(step, numBuckets))
+                for values in archive.get_arrays():
+                    length = values.itemsize * numBuckets
+                    if offset + length > len(data):
+                        raise ValueError("The time series snapshot is truncated")
+                    values[:] = array(values.typecode, data[offset:offset + length])
+                    if sys.byteorder == "big":
+                        values.byteswap()
+                    offset += length
+            result.servers[serverId] = serverTimeSeries
+        return result
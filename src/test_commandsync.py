@@ -0,0 +1,115 @@
+from commandsync import get_command_fingerprint, sync_command_tree
+from discord import app_commands
+import discord
+import os
+import subprocess
+import sys
+import unittest
+
+
+def create_tree(description: str = "Displays the stats", choices: list[str] = None) -> app_commands.CommandTree:
+    """Registers the same commands on every call, as the bot does on every start"""
+    tree = app_commands.CommandTree(discord.Client(intents=discord.Intents.default()))
+    windowChoices = [app_commands.Choice(name=choice, value=choice) for choice in (choices or ["14d", "13w"])]
+
+    @tree.command(name="fssb_stats", description=description)
+    @app_commands.describe(window="The period of time")
+    @app_commands.choices(window=windowChoices)
+    async def fssb_stats(interaction, window: str):
+        pass
+
+    @tree.command(name="fssb_remove_server", description="Removes a server")
+    async def fssb_remove_server(interaction, id: int):
+        pass
+    return tree
+
+
+class CommandTreeStub:
+    """Counts the syncs instead of contacting discord"""
+
+    def __init__(self, tree: app_commands.CommandTree, fails: bool = False):
+        self.tree = tree
+        self.fails = fails
+        self.numSyncs = 0
+
+    def get_commands(self):
+        return self.tree.get_commands()
+
+    async def sync(self):
+        self.numSyncs += 1
+        if self.fails:
+            raise RuntimeError("Discord is unreachable")
+
+
+class PersistenceStub:
+
+    def __init__(self, fingerprint: str = None):
+        self.fingerprint = fingerprint
+
+    def load_command_fingerprint(self) -> str:
+        return self.fingerprint
+
+    def store_command_fingerprint(self, fingerprint: str):
+        self.fingerprint = fingerprint
+
+
+class TestCommandFingerprint(unittest.TestCase):
+
+    def test_stableAcrossRuns(self):
+        fingerprint = get_command_fingerprint(create_tree())
+
+        self.assertEqual(get_command_fingerprint(create_tree()), fingerprint)
+        # Another process with a different hash seed stands in for the next start of the bot
+        output = subprocess.run(
+            [sys.executable, "-c", "from test_commandsync import create_tree; from commandsync import "
+                                   "get_command_fingerprint; print(get_command_fingerprint(create_tree()))"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), env={**os.environ, "PYTHONHASHSEED": "1234"},
+            capture_output=True, text=True, check=True).stdout
+        self.assertEqual(output.strip(), fingerprint)
+
+    def test_changedDescription(self):
+        self.assertNotEqual(
+            get_command_fingerprint(create_tree()), get_command_fingerprint(create_tree(description="Shows the stats")))
+
+    def test_changedChoice(self):
+        self.assertNotEqual(
+            get_command_fingerprint(create_tree()), get_command_fingerprint(create_tree(choices=["14d", "12m"])))
+
+
+class TestSyncCommandTree(unittest.IsolatedAsyncioTestCase):
+
+    async def test_unchangedCommandsAreNotSynced(self):
+        tree = CommandTreeStub(create_tree())
+        persistence = PersistenceStub(get_command_fingerprint(create_tree()))
+
+        self.assertTrue(await sync_command_tree(tree, persistence))
+        self.assertEqual(tree.numSyncs, 0)
+
+    async def test_changedCommandsAreSynced(self):
+        tree = CommandTreeStub(create_tree(description="Shows the stats"))
+        persistence = PersistenceStub(get_command_fingerprint(create_tree()))
+
+        self.assertTrue(await sync_command_tree(tree, persistence))
+        self.assertEqual(tree.numSyncs, 1)
+        self.assertEqual(persistence.fingerprint, get_command_fingerprint(tree))
+
+        self.assertTrue(await sync_command_tree(tree, persistence))
+        self.assertEqual(tree.numSyncs, 1, "The stored fingerprint must skip the next sync")
+
+    async def test_forcedSync(self):
+        tree = CommandTreeStub(create_tree())
+        persistence = PersistenceStub(get_command_fingerprint(create_tree()))
+
+        self.assertTrue(await sync_command_tree(tree, persistence, force=True))
+        self.assertEqual(tree.numSyncs, 1)
+
+    async def test_failedSyncKeepsFingerprint(self):
+        tree = CommandTreeStub(create_tree(description="Shows the stats"), fails=True)
+        persistence = PersistenceStub("previous")
+
+        self.assertFalse(await sync_command_tree(tree, persistence))
+        self.assertEqual(persistence.fingerprint, "previous", "The sync must be retried on the next start")
+
+
+if __name__ == '__main__':
+    unittest.main()
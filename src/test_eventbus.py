@@ -0,0 +1,92 @@
+from eventbus import EventBus
+import asyncio
+import unittest
+
+FIRST_TOPIC = "first"
+SECOND_TOPIC = "second"
+
+
+class TestEventBus(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.sut = EventBus()
+        self.received = []
+        self.subscriber = self.sut.create_subscriber("Test", maxQueueSize=3)
+        self.subscriber.subscribe(FIRST_TOPIC, lambda value: self.received.append(value))
+
+    async def asyncTearDown(self):
+        self.sut.stop()
+        await self.sut.wait_for_completion()
+
+    async def test_publish(self):
+        self.sut.start()
+        self.sut.publish(FIRST_TOPIC, 1)
+        self.sut.publish(SECOND_TOPIC, 2)
+        self.sut.publish(FIRST_TOPIC, 3)
+        await self.sut.drain()
+
+        self.assertEqual(self.received, [1, 3])
+        self.assertEqual(self.subscriber.metrics.received, 2)
+        self.assertEqual(self.subscriber.metrics.processed, 2)
+
+    async def test_publishBeforeStart(self):
+        self.sut.publish(FIRST_TOPIC, 1)
+        self.assertEqual(self.received, [], "Events must not be processed by the publisher")
+
+        self.sut.start()
+        await self.sut.drain()
+        self.assertEqual(self.received, [1])
+
+    async def test_fullQueueDropsOldestEvent(self):
+        for value in range(5):
+            self.sut.publish(FIRST_TOPIC, value)
+        self.sut.start()
+        await self.sut.drain()
+
+        self.assertEqual(self.received, [2, 3, 4])
+        self.assertEqual(self.subscriber.metrics.dropped, 2)
+
+    async def test_losslessSubscriberKeepsEveryEvent(self):
+        received = []
+        losslessSubscriber = self.sut.create_subscriber("Lossless", maxQueueSize=3, lossless=True)
+        losslessSubscriber.subscribe(FIRST_TOPIC, received.append)
+        for value in range(5):
+            self.sut.publish(FIRST_TOPIC, value)
+        self.sut.start()
+        await self.sut.drain()
+
+        self.assertEqual(received, [0, 1, 2, 3, 4])
+        self.assertEqual(losslessSubscriber.metrics.dropped, 0)
+        self.assertEqual(losslessSubscriber.metrics.maxQueued, 5)
+        self.assertEqual(self.received, [2, 3, 4], "Other subscribers shall still drop events")
+
+    async def test_failingSubscriberIsIsolated(self):
+        def fail(value):
+            raise ValueError(value)
+        failingSubscriber = self.sut.create_subscriber("Failing")
+        failingSubscriber.subscribe(FIRST_TOPIC, fail)
+        self.sut.start()
+
+        self.sut.publish(FIRST_TOPIC, 1)
+        self.sut.publish(FIRST_TOPIC, 2)
+        await self.sut.drain()
+
+        self.assertEqual(self.received, [1, 2])
+        self.assertEqual(failingSubscriber.metrics.failed, 2)
+        self.assertEqual(self.subscriber.metrics.failed, 0)
+
+    async def test_coroutineCallback(self):
+        async def handle(value):
+            await asyncio.sleep(0)
+            self.received.append(value * 10)
+        self.subscriber.subscribe(SECOND_TOPIC, handle)
+        self.sut.start()
+
+        self.sut.publish(SECOND_TOPIC, 4)
+        await self.sut.drain()
+
+        self.assertEqual(self.received, [40])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+from fs22.fs22server import FS22ServerStatus, FS22PlayerStatus, OnlineState
+from persistence import PersistenceDataMapper
+import os
+import tempfile
+import unittest
+
+
+class CommandHandlerStub:
+    """Provides the server status to the persistence and receives the restored one"""
+
+    def __init__(self, statusPerServer: dict[int, FS22ServerStatus]):
+        self.statusPerServer = statusPerServer
+        self.warmedUpStatus: dict[int, FS22ServerStatus] = None
+
+    def get_last_known_status(self) -> dict[int, FS22ServerStatus]:
+        return self.statusPerServer
+
+    def warm_up_handlers(self, statusPerServer: dict[int, FS22ServerStatus]):
+        self.warmedUpStatus = statusPerServer
+
+
+def create_status() -> FS22ServerStatus:
+    status = FS22ServerStatus()
+    status.status = OnlineState.Online
+    status.serverName = "Server"
+    status.mapName = "Elmcreek"
+    status.maxPlayers = "16"
+    status.dayTime = "49502364"
+    status.version = "1.14.0.0"
+    status.onlinePlayers = {
+        "Farmer": FS22PlayerStatus("Farmer", "486", "true"),
+        "Bäuerin": FS22PlayerStatus("Bäuerin", "12", "false")
+    }
+    return status
+
+
+class TestStatusSnapshot(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.commandHandler = CommandHandlerStub({1: create_status(), 2: FS22ServerStatus()})
+        self.sut = PersistenceDataMapper(self.commandHandler, self.folder.name)
+
+    async def asyncTearDown(self):
+        self.folder.cleanup()
+
+    def get_snapshot_file(self) -> str:
+        return self.sut.get_status_snapshot_file(self.sut.get_config_folder())
+
+    def assertStatusEqual(self, actual: FS22ServerStatus, expected: FS22ServerStatus):
+        self.assertEqual(actual.status, expected.status)
+        self.assertEqual(actual.serverName, expected.serverName)
+        self.assertEqual(actual.mapName, expected.mapName)
+        self.assertEqual(actual.maxPlayers, expected.maxPlayers)
+        self.assertEqual(actual.dayTime, expected.dayTime)
+        self.assertEqual(actual.version, expected.version)
+        self.assertEqual(
+            [(player.playerName, player.onlineTime, player.isAdmin) for player in actual.onlinePlayers.values()],
+            [(player.playerName, player.onlineTime, player.isAdmin) for player in expected.onlinePlayers.values()])
+
+    async def test_roundTrip(self):
+        self.sut.store_status_snapshot()
+        await self.sut.writer.flush()
+        self.sut.restore_status_snapshot()
+
+        restored = self.commandHandler.warmedUpStatus
+        self.assertEqual(list(restored), [1, 2])
+        self.assertStatusEqual(restored[1], self.commandHandler.statusPerServer[1])
+        self.assertStatusEqual(restored[2], self.commandHandler.statusPerServer[2])
+
+    async def test_unchangedStatusIsNotWrittenAgain(self):
+        self.sut.store_status_snapshot()
+        await self.sut.writer.flush()
+        self.sut.store_status_snapshot()
+        await self.sut.writer.flush()
+
+        self.assertEqual(self.sut.writer.metrics.requests, 1)
+
+    async def test_missingSnapshot(self):
+        self.sut.restore_status_snapshot()
+
+        self.assertIsNone(self.commandHandler.warmedUpStatus)
+
+    async def test_corruptSnapshot(self):
+        os.mkdir(self.sut.get_config_folder())
+        with open(self.get_snapshot_file(), "w") as file:
+            file.write('{"version":1,"servers":{"1":{"status":"online","serverName"')
+
+        self.sut.restore_status_snapshot()
+
+        self.assertIsNone(self.commandHandler.warmedUpStatus, "The handlers must start without a status instead")
+
+
+class TestImportedSnapshots(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.commandHandler = CommandHandlerStub({})
+        self.commandHandler.importedSnapshots = {"b" * 64, "a" * 64}
+        self.sut = PersistenceDataMapper(self.commandHandler, self.folder.name)
+        os.mkdir(self.sut.get_config_folder())
+
+    async def asyncTearDown(self):
+        self.folder.cleanup()
+
+    async def test_survivesRestart(self):
+        self.sut.store_imported_snapshots()
+        await self.sut.writer.flush()
+
+        restarted = PersistenceDataMapper(CommandHandlerStub({}), self.folder.name)
+        self.assertEqual(restarted.load_imported_snapshots(), {"a" * 64, "b" * 64})
+
+    async def test_nothingImported(self):
+        self.assertEqual(self.sut.load_imported_snapshots(), set())
+
+
+if __name__ == '__main__':
+    unittest.main()
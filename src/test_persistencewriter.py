@@ -0,0 +1,83 @@
+from persistencewriter import PersistenceWriter, write_atomically
+import asyncio
+import os
+import tempfile
+import threading
+import unittest
+
+
+class TestPersistenceWriter(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.filePath = os.path.join(self.folder.name, "data.json")
+        self.backupFilePath = os.path.join(self.folder.name, "data_backup.json")
+        self.sut = PersistenceWriter(interval=0.01)
+
+    async def asyncTearDown(self):
+        self.sut.stop()
+        await self.sut.wait_for_completion()
+        self.folder.cleanup()
+
+    def read(self, filePath):
+        with open(filePath, "r") as file:
+            return file.read()
+
+    async def test_requestsAreCoalesced(self):
+        retrievals = []
+
+        def get_data(value):
+            retrievals.append(value)
+            return value
+        for value in ["1", "2", "3"]:
+            self.sut.request_write(self.filePath, lambda value=value: get_data(value))
+        await self.sut.flush()
+
+        self.assertEqual(self.read(self.filePath), "3")
+        self.assertEqual(retrievals, ["3"], "Only the most recent data shall be retrieved")
+        self.assertEqual(self.sut.metrics.requests, 3)
+        self.assertEqual(self.sut.metrics.writes, 1)
+
+    async def test_periodicWrite(self):
+        written = []
+        self.sut.start()
+        self.sut.request_write(self.filePath, lambda: "data", onWritten=lambda: written.append(True))
+        for _ in range(100):
+            if written:
+                break
+            await asyncio.sleep(0.01)
+
+        self.assertEqual(self.read(self.filePath), "data")
+        self.assertEqual(self.sut.metrics.flushes, 1)
+
+    async def test_backup(self):
+        write_atomically(self.filePath, "old")
+        self.sut.request_write(self.filePath, lambda: "new", backupFilePath=self.backupFilePath)
+        await self.sut.flush()
+
+        self.assertEqual(self.read(self.filePath), "new")
+        self.assertEqual(self.read(self.backupFilePath), "old")
+
+    async def test_onWrittenIsCalledOnEventLoop(self):
+        threadIds = []
+        self.sut.request_write(self.filePath, lambda: "data", onWritten=lambda: threadIds.append(threading.get_ident()))
+        await self.sut.flush()
+
+        self.assertEqual(threadIds, [threading.get_ident()])
+
+    async def test_failedRetrievalKeepsFile(self):
+        write_atomically(self.filePath, "old")
+        written = []
+
+        def fail():
+            raise ValueError()
+        self.sut.request_write(self.filePath, fail, onWritten=lambda: written.append(True))
+        await self.sut.flush()
+
+        self.assertEqual(self.read(self.filePath), "old")
+        self.assertEqual(written, [])
+        self.assertEqual(self.sut.metrics.failed, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()